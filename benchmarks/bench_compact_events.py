@@ -0,0 +1,70 @@
+"""
+Compares memory held by an aggregate result of many rows, stored as a list of dictionaries as polled,
+and stored as CompactEvents, measured with tracemalloc.
+Memory held by the values themselves is the same in both cases, only the per-row containers differ.
+The peak while building is reported as well, which CompactEvents does not lower, as a polled segment is decoded in full first.
+
+Usage: python benchmarks/bench_compact_events.py [--rows N]
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from humiolib.CompactEvents import CompactEvents
+
+
+def polled_events(rows):
+    """
+    Decodes rows the way a polled segment is decoded, from one JSON document
+    """
+    document = json.dumps({"events": [
+        {
+            "host": "server-{}".format(i % 5000),
+            "service": "service-{}".format(i % 40),
+            "_count": str(i % 1000),
+            "_avg": str(i / 7),
+            "_max": str(i % 977),
+            "_min": "0",
+        }
+        for i in range(rows)
+    ]})
+    return json.loads(document)["events"]
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, held, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+
+    events, dict_bytes, dict_peak = measure(lambda: polled_events(args.rows))
+    del events
+    compact, compact_bytes, compact_peak = measure(lambda: CompactEvents.consume(polled_events(args.rows)))
+
+    start = time.perf_counter()
+    for _ in compact:
+        pass
+    iteration = time.perf_counter() - start
+
+    print("rows:               {:12d}".format(len(compact)))
+    print("list of dicts:      {:12.1f} MB".format(dict_bytes / 2 ** 20))
+    print("CompactEvents:      {:12.1f} MB".format(compact_bytes / 2 ** 20))
+    print("reduction:          {:12.2f}x".format(dict_bytes / compact_bytes))
+    print("peak, dicts:        {:12.1f} MB".format(dict_peak / 2 ** 20))
+    print("peak, compact:      {:12.1f} MB".format(compact_peak / 2 ** 20))
+    print("materialize all:    {:12.2f} s".format(iteration))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Measures bytes on the wire and CPU cost per MB of ingest request bodies for typical event shapes,
+with compression disabled, gzip and zstd (when the zstandard package is installed).
+
+Usage: python benchmarks/bench_compression.py [--events N]
+"""
+import argparse
+import random
+import time
+
+from humiolib.HumioClient import HumioIngestClient, zstandard
+
+
+def access_log_messages(count):
+    return [{"messages": [
+        '192.168.1.{} - user{} [02/Nov/2017:13:48:{:02d} +0000] "POST /humio/api/v1/ingest/elastic-bulk HTTP/1.1" '
+        '200 {} "-" "useragent" 0.0{} 657 0.014'.format(
+            random.randint(1, 254), random.randint(1, 50), i % 60, random.randint(0, 5000), random.randint(10, 99))
+        for i in range(count)
+    ], "tags": {"host": "server1", "source": "access.log"}}]
+
+
+def structured_events(count):
+    return [{"tags": {"host": "server1", "source": "application.log"}, "events": [
+        {
+            "timestamp": "2020-03-23T00:00:{:02d}+00:00".format(i % 60),
+            "attributes": {
+                "level": random.choice(["INFO", "WARN", "ERROR"]),
+                "logger": "com.example.service.Handler",
+                "thread": "worker-{}".format(random.randint(1, 32)),
+                "request_id": "%032x" % random.getrandbits(128),
+                "duration_ms": random.randint(1, 2000),
+                "message": "Handled request for customer {}".format(random.randint(1, 10000)),
+            },
+        }
+        for i in range(count)
+    ]}]
+
+
+def measure(compression, payload, repetitions=5):
+    client = HumioIngestClient(ingest_token="token", compression=compression, compression_threshold=0)
+    start = time.process_time()
+    for _ in range(repetitions):
+        body = client._encode_ingest_body(payload, {})
+    cpu = (time.process_time() - start) / repetitions
+    return len(body), cpu
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=50000)
+    args = parser.parse_args()
+
+    algorithms = [None, "gzip"] + (["zstd"] if zstandard is not None else [])
+    for name, payload in [("access log messages", access_log_messages(args.events)),
+                          ("structured events", structured_events(args.events))]:
+        raw_size = measure(None, payload)[0]
+        print("{} ({:.1f} MB uncompressed)".format(name, raw_size / 1e6))
+        for compression in algorithms:
+            size, cpu = measure(compression, payload)
+            print("  {:<6} {:>12,d} bytes  ratio {:5.1f}x  {:7.1f} ms CPU/MB".format(
+                str(compression), size, raw_size / size, cpu * 1000 / (raw_size / 1e6)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Compares peak memory of downloading and uploading files of increasing size,
+buffered in memory as get_file and multipart `files=` uploads do, and streamed by download_file and upload_file.
+Peak memory is measured with tracemalloc. The local stand-in for Humio runs in its own process,
+so the request bodies it reads and the files it serves are not counted.
+
+Usage: python benchmarks/bench_file_transfer.py [--sizes 16,64,256] (in MB)
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+import tempfile
+import tracemalloc
+
+from humiolib.HumioClient import HumioClient
+from stubserver import StubServer
+
+
+def serve(address, size):
+    with StubServer(get_response_body=os.urandom(1024) * (size // 1024)) as server:
+        address.put(server.base_url)
+        multiprocessing.Event().wait()
+
+
+def peak_memory(func):
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+def measure(size, directory):
+    address = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(address, size), daemon=True)
+    server.start()
+    client = HumioClient("sandbox", "token", base_url=address.get())
+
+    path = os.path.join(directory, "upload.csv")
+    with open(path, "wb") as f:
+        for _ in range(size // (1024 * 1024)):
+            f.write(os.urandom(1024 * 1024))
+
+    def buffered_upload():
+        with open(path, "rb") as f:
+            client.webcaller.call_rest("post", "dataspaces/sandbox/files", files={"file": f})
+
+    results = {
+        "get_file": peak_memory(lambda: client.get_file("lookup.csv")),
+        "download_file": peak_memory(lambda: client.download_file("lookup.csv", os.path.join(directory, "download.csv"))),
+        "files= upload": peak_memory(buffered_upload),
+        "upload_file": peak_memory(lambda: client.upload_file(path)),
+    }
+    client.close()
+    server.terminate()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="16,64,256")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in (int(s) for s in args.sizes.split(",")):
+            results = measure(size * 1024 * 1024, directory)
+            print("{:4d} MB file: ".format(size) + ", ".join(
+                "{} peak {:7.1f} MB".format(name, peak) for name, peak in results.items()
+            ))
+
+
+if __name__ == "__main__":
+    main()
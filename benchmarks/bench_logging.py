@@ -0,0 +1,53 @@
+"""
+Compares the time a logging call takes on the calling thread with a plain StreamHandler writing to a file,
+and with HumioLoggingHandler shipping records to a local stand-in for Humio.
+
+Usage: python benchmarks/bench_logging.py [--records N]
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from humiolib.HumioLoggingHandler import HumioLoggingHandler
+from stubserver import StubServer
+
+
+def measure(handler, records):
+    logger = logging.getLogger("bench_logging")
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    start = time.perf_counter()
+    for i in range(records):
+        logger.info("Handled request %d for customer %s", i, "customer-42")
+    return (time.perf_counter() - start) / records * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "bench.log"), "w") as stream:
+            handler = logging.StreamHandler(stream)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+            stream_cost = measure(handler, args.records)
+
+    with StubServer() as server:
+        handler = HumioLoggingHandler("token", base_url=server.base_url, queue_size=args.records, block=True)
+        humio_cost = measure(handler, args.records)
+        start = time.perf_counter()
+        handler.close()
+        drain = time.perf_counter() - start
+
+    print("StreamHandler:       {:8.2f} us per call".format(stream_cost))
+    print("HumioLoggingHandler: {:8.2f} us per call".format(humio_cost))
+    print("background drain:    {:8.2f} s after the last call, {} records sent".format(drain, handler.sent_records))
+
+
+if __name__ == "__main__":
+    main()
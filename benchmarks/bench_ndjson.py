@@ -0,0 +1,88 @@
+"""
+Measures decoding throughput in events/sec of streaming query results.
+The line by line decoding that streaming_query used before is compared with the chunked decoder
+for each installed JSON backend. The NDJSON body can be a recorded streaming query response,
+otherwise a body shaped like Humio search results is generated.
+
+Usage: python benchmarks/bench_ndjson.py [--events N] [--body recorded.ndjson]
+"""
+import argparse
+import io
+import json
+import random
+import time
+
+import requests
+
+from humiolib.JsonSerializer import JsonSerializer, orjson, ujson
+from humiolib.WebCaller import WebStreamer
+
+
+def generate_body(count):
+    lines = []
+    for i in range(count):
+        lines.append(json.dumps({
+            "@timestamp": 1585000000000 + i,
+            "@id": "%032x" % random.getrandbits(128),
+            "@rawstring": '192.168.1.{} - user{} [02/Nov/2017:13:48:33 +0000] "POST /api/v1/ingest HTTP/1.1" 200 {}'.format(
+                random.randint(1, 254), random.randint(1, 50), random.randint(0, 5000)),
+            "#repo": "sandbox",
+            "#type": "accesslog",
+            "method": "POST",
+            "statuscode": "200",
+            "client": "192.168.1.{}".format(random.randint(1, 254)),
+        }))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def response_for(body):
+    response = requests.models.Response()
+    response.raw = io.BytesIO(body)
+    response.status_code = 200
+    return response
+
+
+def line_by_line(body):
+    count = 0
+    for line in WebStreamer(response_for(body)):
+        json.loads(line.decode("utf-8"))
+        count += 1
+    return count
+
+
+def chunked(body, serializer):
+    count = 0
+    for events in WebStreamer(response_for(body)).iter_event_batches(serializer):
+        count += len(events)
+    return count
+
+
+def measure(name, decode, body):
+    start = time.perf_counter()
+    count = decode(body)
+    elapsed = time.perf_counter() - start
+    print("{:<24} {:>12,.0f} events/sec".format(name, count / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=500000)
+    parser.add_argument("--body", default=None, help="File with a recorded NDJSON streaming query response")
+    args = parser.parse_args()
+
+    if args.body:
+        with open(args.body, "rb") as f:
+            body = f.read()
+    else:
+        body = generate_body(args.events)
+    print("body: {:.1f} MB".format(len(body) / 1e6))
+
+    measure("line by line (json)", line_by_line, body)
+    for backend, module in [("json", True), ("ujson", ujson), ("orjson", orjson)]:
+        if module:
+            serializer = JsonSerializer(backend)
+            measure("chunked ({})".format(backend), lambda b: chunked(b, serializer), body)
+
+
+if __name__ == "__main__":
+    main()
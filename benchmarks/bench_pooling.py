@@ -0,0 +1,44 @@
+"""
+Compares requests/sec of unpooled requests, as humiolib made them before WebCaller owned a session,
+with requests made through the pooled WebCaller session.
+
+Usage: python benchmarks/bench_pooling.py [--requests N] [--threads N]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from humiolib.WebCaller import WebCaller
+from stubserver import StubServer
+
+
+def run(call, total, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda _: call(), range(total)))
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    with StubServer() as server:
+        url = server.base_url + "/api/v1/status"
+        unpooled = run(lambda: requests.request("get", url), args.requests, args.threads)
+
+        webcaller = WebCaller(server.base_url, pool_maxsize=args.threads)
+        pooled = run(lambda: webcaller.call_rest("get", "status"), args.requests, args.threads)
+        webcaller.close()
+
+    print("unpooled: {:10.1f} requests/sec".format(unpooled))
+    print("pooled:   {:10.1f} requests/sec".format(pooled))
+    print("speedup:  {:10.2f}x".format(pooled / unpooled))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Measures events/sec of bulk ingest of newline delimited JSON events with a single HumioIngestClient,
+and with ProcessPoolIngestClient at an increasing number of worker processes.
+The local stand-in for Humio runs in its own process, so it does not compete for the interpreter lock of the benchmark.
+
+Usage: python benchmarks/bench_process_ingest.py [--events N] [--chunk-events N] [--processes 1,2,4]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+
+from humiolib.HumioClient import HumioIngestClient
+from humiolib.ProcessPoolIngestClient import ProcessPoolIngestClient
+from stubserver import StubServer
+
+
+def serve(address):
+    with StubServer() as server:
+        address.put(server.base_url)
+        multiprocessing.Event().wait()
+
+
+def make_chunks(events, chunk_events):
+    lines = [
+        json.dumps({
+            "timestamp": "2020-03-23T00:00:{:02d}+00:00".format(i % 60),
+            "attributes": {"level": "INFO", "request_id": "%032x" % i, "duration_ms": i % 2000,
+                           "message": "Handled request for customer {}".format(i % 10000)},
+        }).encode()
+        for i in range(events)
+    ]
+    return [b"\n".join(lines[i:i + chunk_events]) for i in range(0, events, chunk_events)]
+
+
+def single_process(base_url, chunks):
+    client = HumioIngestClient("token", base_url)
+    start = time.perf_counter()
+    for chunk in chunks:
+        client.ingest_json_data([{"events": client.serializer.loads_ndjson(chunk)}])
+    elapsed = time.perf_counter() - start
+    client.close()
+    return elapsed
+
+
+def process_pool(base_url, chunks, processes):
+    with ProcessPoolIngestClient("token", base_url, processes=processes) as client:
+        start = time.perf_counter()
+        for chunk in chunks:
+            client.ingest_events(chunk)
+        client.flush()
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=400000)
+    parser.add_argument("--chunk-events", type=int, default=5000)
+    parser.add_argument("--processes", default=",".join(str(2 ** i) for i in range((os.cpu_count() or 1).bit_length())))
+    args = parser.parse_args()
+
+    address = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(address,), daemon=True)
+    server.start()
+    base_url = address.get()
+
+    chunks = make_chunks(args.events, args.chunk_events)
+    baseline = args.events / single_process(base_url, chunks)
+    print("single process: {:10.0f} events/sec".format(baseline))
+    for processes in (int(p) for p in args.processes.split(",")):
+        rate = args.events / process_pool(base_url, chunks, processes)
+        print("{:2d} processes:   {:10.0f} events/sec ({:.2f}x)".format(processes, rate, rate / baseline))
+
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
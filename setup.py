@@ -80,6 +80,10 @@ setup(
         # eg:
         #   'rst': ['docutils>=0.11'],
         #   ':python_version=="2.6"': ['argparse'],
+        "zstd": ["zstandard"],
+        "async": ["aiohttp"],
+        "fastjson": ["orjson"],
+        "arrow": ["pyarrow"],
     },
     entry_points={"console_scripts": ["humiocli = humiolib.cli:main"]},
 )
@@ -0,0 +1,217 @@
+import warnings
+from humiolib.JsonSerializer import JsonSerializer
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # columnar results are an optional feature
+    pyarrow = None
+
+
+def infer_schema(events):
+    """
+    Infers an Arrow schema from a sample of events.
+    Fields are ordered by first appearance. Fields holding only booleans, integers or numbers get a matching type,
+    integer @timestamp fields become UTC timestamps and every other field becomes a string.
+
+    :param events: Sample of events.
+    :type events: list(dict)
+
+    :return: Schema fitting the sample
+    :rtype: pyarrow.Schema
+    """
+    kinds = {}
+    for event in events:
+        for name, value in event.items():
+            if value is not None:
+                kinds.setdefault(name, set()).add(type(value))
+            else:
+                kinds.setdefault(name, set())
+
+    fields = []
+    for name, types in kinds.items():
+        if types and types <= {bool}:
+            arrow_type = pyarrow.bool_()
+        elif types and types <= {int}:
+            arrow_type = pyarrow.timestamp("ms", tz="UTC") if name == "@timestamp" else pyarrow.int64()
+        elif types and types <= {int, float}:
+            arrow_type = pyarrow.float64()
+        else:
+            arrow_type = pyarrow.string()
+        fields.append(pyarrow.field(name, arrow_type))
+    return pyarrow.schema(fields)
+
+
+class ArrowResults():
+    """
+    Turns query results into Arrow record batches of a bounded number of rows, one column per field.
+
+    The schema is inferred from the first events, unless one is given.
+    Fields first seen after that are added to the end of the schema, starting with the record batch they appear in,
+    so earlier record batches lack them. Tables fill those columns of earlier rows with nulls.
+    As a Parquet file has a single schema, fields added after its first record batch was written are left out of it.
+    Without widening, fields left out are recorded in unknown_fields, and a warning is issued.
+    Values that cannot be converted to the type of their column become nulls, and are counted in conversion_errors.
+    Only the rows of the batch being built are held as python objects, so iterating the batches,
+    or writing them to Parquet, keeps memory bounded by the batch size.
+
+    Results are consumed as they are converted, so they can only be iterated, or collected, once.
+    """
+
+    def __init__(self, event_batches, batch_size=65536, sample_size=1000, schema=None, serializer=None, widen_schema=True):
+        """
+        :param event_batches: Lists of events, as returned by streaming_query with a batch_size, or events of poll results.
+        :type event_batches: Iterable(list(dict))
+        :param batch_size: Maximum number of rows of a record batch.
+        :type batch_size: int, optional
+        :param sample_size: Number of events the schema is inferred from.
+        :type sample_size: int, optional
+        :param schema: Schema of the record batches, inferred when None.
+        :type schema: pyarrow.Schema, optional
+        :param serializer: Serializer used to turn nested values into strings.
+        :type serializer: JsonSerializer, optional
+        :param widen_schema: Whether fields first seen after the schema was inferred or given are added to it, rather than left out.
+        :type widen_schema: bool, optional
+        """
+        if pyarrow is None:
+            raise ImportError("Columnar results require the pyarrow package, install it with: pip install humiolib[arrow]")
+        self.event_batches = event_batches
+        self.batch_size = batch_size
+        self.sample_size = sample_size
+        self.schema = schema
+        self.serializer = serializer if serializer is not None else JsonSerializer()
+        self.widen_schema = widen_schema
+        self.unknown_fields = set()
+        self.conversion_errors = 0
+        self.rows = 0
+        self._iterated = False
+
+    def __iter__(self):
+        """
+        :return: A generator that returns record batches of at most batch_size rows
+        :rtype: Generator
+        :raises RuntimeError: When the results have already been iterated
+        """
+        if self._iterated:
+            raise RuntimeError("ArrowResults can only be iterated once")
+        self._iterated = True
+        return self._record_batches()
+
+    def _record_batches(self):
+        rows = []
+        for events in self.event_batches:
+            rows.extend(events)
+            if self.schema is None:
+                if len(rows) < self.sample_size:
+                    continue
+                self.schema = infer_schema(rows[:self.sample_size])
+            while len(rows) >= self.batch_size:
+                yield self._to_record_batch(rows[:self.batch_size])
+                del rows[:self.batch_size]
+        if rows:
+            if self.schema is None:
+                self.schema = infer_schema(rows)
+            yield self._to_record_batch(rows)
+
+    def _to_record_batch(self, rows):
+        new_fields = set().union(*rows).difference(self.schema.names)
+        if new_fields and self.widen_schema:
+            extension = infer_schema([{name: row[name] for name in row if name in new_fields} for row in rows])
+            self.schema = pyarrow.schema(list(self.schema) + list(extension))
+        elif new_fields.difference(self.unknown_fields):
+            warnings.warn("Fields {} are not in the schema of the results and are left out".format(
+                sorted(new_fields.difference(self.unknown_fields))))
+            self.unknown_fields.update(new_fields)
+        columns = [self._to_array([row.get(field.name) for row in rows], field.type) for field in self.schema]
+        self.rows += len(rows)
+        return pyarrow.RecordBatch.from_arrays(columns, schema=self.schema)
+
+    def _to_array(self, values, arrow_type):
+        """
+        Converts the values of a column, coercing values that do not fit the column type
+        """
+        try:
+            return pyarrow.array(values, type=arrow_type)
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError, OverflowError):
+            pass
+
+        if pyarrow.types.is_string(arrow_type):
+            values = [value if value is None or type(value) is str else self._to_string(value) for value in values]
+            return pyarrow.array(values, type=arrow_type)
+
+        coerced = []
+        for value in values:
+            try:
+                coerced.append(pyarrow.scalar(value, type=arrow_type))
+            except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError, OverflowError, TypeError, ValueError):
+                coerced.append(None)
+                self.conversion_errors += 1
+        return pyarrow.array([None if value is None else value.as_py() for value in coerced], type=arrow_type)
+
+    def _to_string(self, value):
+        if isinstance(value, (dict, list)):
+            return self.serializer.dumps(value).decode("utf-8")
+        return str(value)
+
+    def to_table(self):
+        """
+        Collects all results into a table
+
+        :return: Table holding all results
+        :rtype: pyarrow.Table
+        """
+        batches = list(self)
+        if not batches:
+            return pyarrow.table({}) if self.schema is None else self.schema.empty_table()
+        return pyarrow.Table.from_batches([self._conform(batch, self.schema) for batch in batches], schema=self.schema)
+
+    def _conform(self, batch, schema):
+        """
+        Gives a record batch the columns of a schema, leaving out its other columns and filling missing columns with nulls
+        """
+        if batch.schema.equals(schema):
+            return batch
+        names = set(batch.schema.names)
+        columns = [
+            batch.column(field.name) if field.name in names else pyarrow.nulls(batch.num_rows, field.type) for field in schema
+        ]
+        return pyarrow.RecordBatch.from_arrays(columns, schema=schema)
+
+    def to_pandas(self):
+        """
+        Collects all results into a pandas DataFrame, converted from the record batches without an intermediate list of dicts
+
+        :return: DataFrame holding all results
+        :rtype: pandas.DataFrame
+        """
+        return self.to_table().to_pandas()
+
+    def to_parquet(self, path, compression="zstd"):
+        """
+        Writes the results to a Parquet file one record batch at a time
+
+        :param path: Path of Parquet file.
+        :type path: str
+        :param compression: Compression codec of the Parquet file.
+        :type compression: str, optional
+
+        :return: Number of rows written
+        :rtype: int
+        """
+        writer = None
+        try:
+            for batch in self:
+                if writer is None:
+                    writer = pyarrow.parquet.ParquetWriter(path, batch.schema, compression=compression)
+                left_out = set(batch.schema.names).difference(writer.schema.names, self.unknown_fields)
+                if left_out:
+                    warnings.warn("Fields {} first seen after the Parquet schema was written are left out".format(
+                        sorted(left_out)))
+                    self.unknown_fields.update(left_out)
+                writer.write_batch(self._conform(batch, writer.schema))
+            if writer is None and self.schema is not None:
+                writer = pyarrow.parquet.ParquetWriter(path, self.schema, compression=compression)
+        finally:
+            if writer is not None:
+                writer.close()
+        return self.rows
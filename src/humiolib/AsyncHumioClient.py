@@ -0,0 +1,359 @@
+from humiolib.AsyncWebCaller import AsyncWebCaller
+from humiolib.AsyncQueryJob import AsyncStaticQueryJob, AsyncLiveQueryJob
+from humiolib.HumioClient import BaseHumioClient
+
+
+class AsyncBaseHumioClient(BaseHumioClient):
+    """
+    Base class for asynchronous client types, is not meant to be instantiated
+    """
+
+    def __init__(self, base_url, webcaller=None, compression=None, compression_threshold=1024, serializer=None):
+        if webcaller is None:
+            webcaller = AsyncWebCaller(base_url, serializer=serializer)
+        super().__init__(base_url, webcaller, compression, compression_threshold)
+
+    async def close(self):
+        """
+        Closes the pooled connections held by this client
+        """
+        await self.webcaller.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+
+class AsyncHumioClient(AsyncBaseHumioClient):
+    """
+    An asynchronous Humio client for querying and ingesting data from asyncio applications.
+    It mirrors the query and ingest methods of HumioClient as coroutines.
+    """
+
+    def __init__(
+        self,
+        repository,
+        user_token,
+        base_url="http://localhost:3000",
+        webcaller=None,
+        compression=None,
+        compression_threshold=1024,
+        serializer=None,
+    ):
+        """
+        :param repository: Repository associated with client
+        :type repository: str
+        :param user_token: User token to get access to repository
+        :type user_token: str
+        :param base_url: Url of Humio instance
+        :type repository: str
+        :param webcaller: AsyncWebCaller to make requests through, allows several clients to share one connection pool
+        :type webcaller: AsyncWebCaller, optional
+        :param compression: Compression of ingest request bodies, either "gzip" or "zstd". Disabled when None.
+        :type compression: str, optional
+        :param compression_threshold: Size in bytes below which ingest request bodies are sent uncompressed.
+        :type compression_threshold: int, optional
+        :param serializer: Serializer used for request and response bodies, when no webcaller is given.
+        :type serializer: JsonSerializer, optional
+        """
+        super().__init__(base_url, webcaller, compression, compression_threshold, serializer)
+        self.repository = repository
+        self.user_token = user_token
+
+    @property
+    def _default_user_headers(self):
+        """
+        :return: Default headers used for web requests
+        :rtype: dict
+        """
+        return {
+            "Content-Type": "application/json",
+            "Authorization": "Bearer {}".format(self.user_token),
+        }
+
+    async def streaming_query(
+        self,
+        query_string,
+        start=None,
+        end=None,
+        is_live=None,
+        timezone_offset_minutes=None,
+        arguments=None,
+        raw_data=None,
+        **kwargs
+    ):
+        """
+        Humio Query type that opens up a streaming socket connection to Humio.
+        This is the preferred way to do static queries with large result sizes.
+
+        :param query_string: Humio query
+        :type query_string: str
+        :param start: Starting time of query
+        :type start: Union[int, str], optional
+        :param end: Ending time of query
+        :type end: Union[int, str], optional
+        :param is_live: Ending time of query
+        :type is_live: bool, optional
+        :param timezone_offset_minutes: Timezone offset in minutes
+        :type timezone_offset_minutes: int, optional
+        :param argument: Arguments specified in query
+        :type argument: dict(string->string), optional
+        :param raw_data: Additional arguments to add to POST body under other keys
+        :type raw_data: dict(string->string), optional
+
+        :return: An asynchronous generator that returns query results as python objects
+        :rtype: AsyncGenerator
+        """
+        endpoint = "dataspaces/{}/query".format(self.repository)
+
+        headers = self._default_user_headers
+        headers["Accept"] = "application/x-ndjson"
+        headers.update(kwargs.pop("headers", {}))
+
+        data = self._create_query_data_object(
+            query_string, start, end, is_live, timezone_offset_minutes, arguments, raw_data
+        )
+
+        stream = await self.webcaller.call_rest(
+            "post", endpoint, data=self.serializer.dumps(data), headers=headers, stream=True, **kwargs
+        )
+
+        async for event in stream:
+            yield self.serializer.loads(event)
+
+    async def create_queryjob(
+        self,
+        query_string,
+        start=None,
+        end=None,
+        is_live=None,
+        timezone_offset_minutes=None,
+        arguments=None,
+        raw_data=None,
+        compact_events=False,
+        **kwargs
+    ):
+        """
+        Creates a queryjob on Humio, which executes asynchronously of the calling code.
+
+        :param query_string: Humio query
+        :type query_string: str
+        :param start: Starting time of query
+        :type start: Union[int, str], optional
+        :param end: Ending time of query
+        :type end: Union[int, str], optional
+        :param is_live: Ending time of query
+        :type is_live: bool, optional
+        :param timezone_offset_minutes: Timezone offset in minutes
+        :type timezone_offset_minutes: int, optional
+        :param argument: Arguments specified in query
+        :type argument: dict(string->string), optional
+        :param raw_data: Additional arguments to add to POST body under other keys
+        :type raw_data: dict(string->string), optional
+        :param compact_events: Whether polled events are stored as CompactEvents, which take far less memory for large results
+        :type compact_events: bool, optional
+
+        :return:  An instance that grants access to the created queryjob and associated results
+        :rtype: AsyncBaseQueryJob
+        """
+        endpoint = "dataspaces/{}/queryjobs".format(self.repository)
+
+        headers = self._default_user_headers
+        headers.update(kwargs.pop("headers", {}))
+
+        data = self._create_query_data_object(
+            query_string, start, end, is_live, timezone_offset_minutes, arguments, raw_data
+        )
+
+        response = await self.webcaller.call_rest(
+            "post", endpoint, data=self.serializer.dumps(data), headers=headers, **kwargs
+        )
+        query_id = self.webcaller.parse_json(response)["id"]
+
+        if is_live:
+            return AsyncLiveQueryJob(
+                query_id, self.base_url, self.repository, self.user_token, self.webcaller, compact_events
+            )
+        else:
+            return AsyncStaticQueryJob(
+                query_id, self.base_url, self.repository, self.user_token, self.webcaller, compact_events
+            )
+
+    async def _ingest_json_data(self, json_elements=None, **kwargs):
+        """
+        Ingest structured json data to repository.
+        Structure of ingested data is discussed in: https://docs.humio.com/reference/api/ingest/#structured-data
+
+        :param json_elements: Structured data that can be parsed to a json string.
+        :type json_elements: list(dict), optional
+
+        :return: Response to web request
+        :rtype: AsyncResponse
+        """
+        if json_elements is None:
+            json_elements = []
+
+        headers = self._default_user_headers
+        headers.update(kwargs.pop("headers", {}))
+
+        endpoint = "dataspaces/{}/ingest".format(self.repository)
+
+        return await self.webcaller.call_rest(
+            "post", endpoint, data=self._encode_ingest_body(json_elements, headers), headers=headers, **kwargs
+        )
+
+    # Wrap method to be pythonic
+    ingest_json_data = AsyncWebCaller.response_as_json(_ingest_json_data)
+
+    async def _ingest_messages(self, messages=None, parser=None, fields=None, tags=None, **kwargs):
+        """
+        Ingest unstructred messages to repository.
+        Structure of ingested data is discussed in: https://docs.humio.com/reference/api/ingest/#parser
+
+        :param messages: A list of event strings.
+        :type messages: list(string), optional
+        :param parser:  Name of parser to use on messages.
+        :type parser: string, optional
+        :param fields:  Fields that should be added to events after parsing.
+        :type fields: dict(string->string), optional
+        :param tags:  Tags to associate with the messages.
+        :type tags: dict(string->string), optional
+
+        :return: Response to web request
+        :rtype: AsyncResponse
+        """
+        if messages is None:
+            messages = []
+
+        headers = self._default_user_headers
+        headers.update(kwargs.pop("headers", {}))
+
+        endpoint = "dataspaces/{}/ingest-messages".format(self.repository)
+
+        obj = self._create_unstructured_data_object(
+            messages, parser=parser, fields=fields, tags=tags
+        )
+
+        return await self.webcaller.call_rest(
+            "post", endpoint, data=self._encode_ingest_body([obj], headers), headers=headers, **kwargs
+        )
+
+    # Wrap method to be pythonic
+    ingest_messages = AsyncWebCaller.response_as_json(_ingest_messages)
+
+    async def _get_status(self, **kwargs):
+        """
+        Gets status of Humio instance
+
+        :return: Response to web request
+        :rtype: AsyncResponse
+        """
+        return await self.webcaller.call_rest("get", "status", **kwargs)
+
+    # Wrap method to be pythonic
+    get_status = AsyncWebCaller.response_as_json(_get_status)
+
+
+class AsyncHumioIngestClient(AsyncBaseHumioClient):
+    """
+    An asynchronous Humio client that is used exclusivly for ingesting data
+    """
+
+    def __init__(
+        self,
+        ingest_token,
+        base_url="http://localhost:3000",
+        webcaller=None,
+        compression=None,
+        compression_threshold=1024,
+        serializer=None,
+    ):
+        """
+        :param ingest_token: Ingest token to access ingest.
+        :type ingest_token: string
+        :param base_url: Url of Humio instance.
+        :type base_url: string
+        :param webcaller: AsyncWebCaller to make requests through, allows several clients to share one connection pool
+        :type webcaller: AsyncWebCaller, optional
+        :param compression: Compression of ingest request bodies, either "gzip" or "zstd". Disabled when None.
+        :type compression: str, optional
+        :param compression_threshold: Size in bytes below which ingest request bodies are sent uncompressed.
+        :type compression_threshold: int, optional
+        :param serializer: Serializer used for request and response bodies, when no webcaller is given.
+        :type serializer: JsonSerializer, optional
+        """
+        super().__init__(base_url, webcaller, compression, compression_threshold, serializer)
+        self.ingest_token = ingest_token
+
+    @property
+    def _default_ingest_headers(self):
+        """
+        :return: Default headers used for web requests
+        :rtype: dict
+        """
+        return {
+            "Content-Type": "application/json",
+            "Authorization": "Bearer {}".format(self.ingest_token),
+        }
+
+    async def _ingest_json_data(self, json_elements=None, **kwargs):
+        """
+        Ingest structured json data to repository.
+        Structure of ingested data is discussed in: https://docs.humio.com/reference/api/ingest/#structured-data
+
+        :param json_elements: Structured data that can be parsed to a json string.
+        :type json_elements: list(dict), optional
+
+        :return: Response to web request
+        :rtype: AsyncResponse
+        """
+        if json_elements is None:
+            json_elements = []
+
+        headers = self._default_ingest_headers
+        headers.update(kwargs.pop("headers", {}))
+
+        return await self.webcaller.call_rest(
+            "post", "ingest/humio-structured", data=self._encode_ingest_body(json_elements, headers),
+            headers=headers, **kwargs
+        )
+
+    # Wrap method to be pythonic
+    ingest_json_data = AsyncWebCaller.response_as_json(_ingest_json_data)
+
+    async def _ingest_messages(self, messages=None, parser=None, fields=None, tags=None, **kwargs):
+        """
+        Ingest unstructred messages to repository.
+        Structure of ingested data is discussed in: https://docs.humio.com/reference/api/ingest/#parser
+
+        :param messages: A list of event strings.
+        :type messages: list(string), optional
+        :param parser:  Name of parser to use on messages.
+        :type parser: string, optional
+        :param fields:  Fields that should be added to events after parsing.
+        :type fields: dict(string->string), optional
+        :param tags:  Tags to associate with the messages.
+        :type tags: dict(string->string), optional
+
+        :return: Response to web request
+        :rtype: AsyncResponse
+        """
+        if messages is None:
+            messages = []
+
+        headers = self._default_ingest_headers
+        headers.update(kwargs.pop("headers", {}))
+
+        obj = self._create_unstructured_data_object(
+            messages, parser=parser, fields=fields, tags=tags
+        )
+
+        return await self.webcaller.call_rest(
+            "post", "ingest/humio-unstructured", data=self._encode_ingest_body([obj], headers),
+            headers=headers, **kwargs
+        )
+
+    # Wrap method to be pythonic
+    ingest_messages = AsyncWebCaller.response_as_json(_ingest_messages)
@@ -0,0 +1,119 @@
+import asyncio
+from humiolib.HumioExceptions import HumioQueryJobExhaustedException, HumioHTTPException
+from humiolib.QueryJob import BaseQueryJob
+
+
+class AsyncBaseQueryJob(BaseQueryJob):
+    """
+    Base class for asynchronous queryjobs, not meant to be instantiated.
+    Waiting between polls is done with asyncio.sleep, so many queryjobs can be polled on one event loop.
+    """
+    def __init__(self, query_id, base_url, repository, user_token, webcaller, compact_events=False):
+        """
+        :param query_id: Id of queryjob.
+        :type query_id: str
+        :param base_url: Url of Humio instance.
+        :type base_url: str
+        :param repository:  Repository being queried.
+        :type repository: str
+        :param user_token: Token used to access resource.
+        :type user_token: str
+        :param webcaller: AsyncWebCaller to poll through, typically shared with the client that created the queryjob.
+        :type webcaller: AsyncWebCaller
+        :param compact_events: Whether polled events are stored as CompactEvents rather than a list of dictionaries.
+        :type compact_events: bool, optional
+        """
+        super().__init__(query_id, base_url, repository, user_token, webcaller, compact_events)
+
+    async def _fetch_next_segment(self, link, headers, **kwargs):
+        """
+        Polls the queryjob for the next segment of data.
+        Waits without blocking the event loop, if the queryjob is not ready to be polled again.
+
+        :param link: url to access queryjob.
+        :type link: str
+        :param headers: headers used for web request.
+        :type headers: list(dict)
+
+        :return: A data object that contains events of the polled segment and metadata about the poll
+        :rtype: PollResult
+        """
+        wait_time = self._time_until_next_poll()
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+
+        try:
+            response = self.webcaller.parse_json(await self.webcaller.call_rest("get", link, headers=headers, **kwargs))
+        except HumioHTTPException as e:
+            raise self._translate_poll_exception(e)
+
+        return self._handle_segment_response(response)
+
+    async def poll(self, **kwargs):
+        """
+        Polls the queryjob for the next segment of data, and handles edge cases for data polled
+
+        :return: A data object that contains events of the polled segment and metadata about the poll
+        :rtype: PollResult
+        """
+        headers = self._default_user_headers
+        headers.update(kwargs.pop("headers", {}))
+
+        poll_result = await self._fetch_next_segment(self._link, headers, **kwargs)
+        while not self.segment_is_done: # In case the segment hasn't been completed, we poll until is is
+            poll_result = await self._fetch_next_segment(self._link, headers, **kwargs)
+
+        self._update_more_segments_can_be_polled(poll_result)
+        return poll_result
+
+
+class AsyncStaticQueryJob(AsyncBaseQueryJob):
+    """
+    Manages a static queryjob asynchronously
+    """
+    async def poll(self, **kwargs):
+        """
+        Polls next segment of result
+
+        :return: A data object that contains events of the polled segment and metadata about the poll
+        :rtype: PollResult
+        """
+        if not self.more_segments_can_be_polled:
+            raise HumioQueryJobExhaustedException()
+
+        return await super().poll(**kwargs)
+
+    async def poll_until_done(self, **kwargs):
+        """
+        Create asynchronous generator for yielding poll results
+
+        :return: An asynchronous generator for query results
+        :rtype: AsyncGenerator
+        """
+        yield await self.poll(**kwargs)
+        while self.more_segments_can_be_polled:
+            yield await self.poll(**kwargs)
+
+
+class AsyncLiveQueryJob(AsyncBaseQueryJob):
+    """
+    Manages a live queryjob asynchronously.
+    As coroutines cannot be run when an object is deconstructed,
+    live queryjobs should be deleted with delete, or by using the queryjob as an asynchronous context manager.
+    """
+    async def delete(self):
+        """
+        Delete queryjob on Humio.
+        As live queryjobs are kept around for 1 hours after last query,
+        it'd be best to delete them when not in use.
+        """
+        try:
+            await self.webcaller.call_rest("delete", self._link, headers=self._default_user_headers)
+        except HumioHTTPException: # If the queryjob doesn't exists anymore, we don't want to halt on the exception
+            pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.delete()
@@ -0,0 +1,215 @@
+import asyncio
+import functools
+import aiohttp
+from humiolib.JsonSerializer import JsonSerializer
+from humiolib.HumioExceptions import HumioConnectionException, HumioHTTPException, HumioTimeoutException, HumioConnectionDroppedException
+
+
+class AsyncResponse():
+    """
+    Fully read response to a web request made by the AsyncWebCaller
+    """
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+
+class AsyncWebCaller:
+    """
+    Object used for abstracting asynchronous calls to the Humio API.
+    All requests made through one AsyncWebCaller share a single pool of keep-alive connections,
+    so any number of concurrent requests can run on one event loop.
+    There is no limit on the total duration of a request, as streaming queries may run for hours.
+    """
+    version_number_humio = "v1"
+
+    def __init__(self, base_url, limit=100, limit_per_host=0, keepalive_timeout=15, serializer=None, connect_timeout=30, read_timeout=None):
+        """
+        :param base_url: URL of Humio instance.
+        :type base_url: string
+        :param limit: Maximum number of simultaneous connections, unlimited when 0.
+        :type limit: int, optional
+        :param limit_per_host: Maximum number of simultaneous connections per host, unlimited when 0.
+        :type limit_per_host: int, optional
+        :param keepalive_timeout: Seconds an idle connection is kept open.
+        :type keepalive_timeout: float, optional
+        :param serializer: Serializer used for request and response bodies, the fastest installed JSON backend is used when None.
+        :type serializer: JsonSerializer, optional
+        :param connect_timeout: Seconds to wait for a connection to be established, no limit when None.
+        :type connect_timeout: float, optional
+        :param read_timeout: Seconds to wait for the next bytes of a response, no limit when None.
+        :type read_timeout: float, optional
+        """
+        self.base_url = base_url
+        self.rest_url = "{}/api/{}/".format(self.base_url, self.version_number_humio)
+        self.graphql_url = "{}/graphql".format(self.base_url)
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.serializer = serializer if serializer is not None else JsonSerializer()
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._session = None
+
+    @property
+    def session(self):
+        """
+        The session is created lazily, as it must be created from within a running event loop
+
+        :return: A pooled http session
+        :rtype: aiohttp.ClientSession
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.connect_timeout, sock_read=self.read_timeout)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+    async def close(self):
+        """
+        Closes all pooled connections
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def call_rest(self, verb, endpoint, headers=None, data=None, stream=False, **kwargs):
+        """
+        Call one of Humio's REST endpoints
+
+        :param verb: Http verb
+        :type verb: str
+        :param endpoint: Called Humio endpoint
+        :type endpoint: str
+        :param headers: Http headers
+        :type headers: dict, optional
+        :param data: Post request body
+        :type data: dict, optional
+        :param stream: Indicates whether a stream request should be made
+        :type stream: bool, optional
+
+        :return: Response to web request, or an open AsyncWebStreamer if stream is set
+        :rtype: Union[AsyncResponse, AsyncWebStreamer]
+        """
+        link = self.rest_url + endpoint
+        return await self._make_request(verb, link, headers, data, stream, **kwargs)
+
+    async def call_graphql(self, headers=None, data=None, **kwargs):
+        """
+        Call Humio's GraphQL endpoint
+
+        :param headers: Http headers
+        :type headers: dict, optional
+        :param data: Post request body for GraphQL
+        :type data: dict, optional
+
+        :return: Response to web request
+        :rtype: AsyncResponse
+        """
+        return await self._make_request("post", self.graphql_url, headers, data, **kwargs)
+
+    async def _make_request(self, verb, link, headers=None, data=None, stream=False, **kwargs):
+        """
+        Make a webrequest, translating errors of the http library to Humio exceptions,
+        in the same manner as the synchronous WebCaller.
+
+        :return: Response to web request, or an open AsyncWebStreamer if stream is set
+        :rtype: Union[AsyncResponse, AsyncWebStreamer]
+        """
+        try:
+            response = await self.session.request(verb, link, data=data, headers=headers, **kwargs)
+            if response.status >= 400:
+                text = (await response.read()).decode("utf-8", errors="replace")
+                response.release()
+                raise HumioHTTPException(text, response.status)
+            if stream:
+                return AsyncWebStreamer(response)
+            content = await response.read()
+            response.release()
+        except aiohttp.ClientConnectionError as e:
+            raise HumioConnectionException(e)
+        except asyncio.TimeoutError as e:
+            raise HumioTimeoutException(e)
+
+        return AsyncResponse(response.status, response.headers, content)
+
+    def parse_json(self, response):
+        """
+        Parse the body of a response with the serializer of this AsyncWebCaller
+
+        :param response: Response to web request
+        :type response: AsyncResponse
+
+        :return: Body of response, parsed into python objects from json
+        :rtype: dict
+        """
+        return self.serializer.loads(response.content)
+
+    @staticmethod
+    def response_as_json(func):
+        """
+        Wrapper to take the raw responses of a client coroutine and turn them into json,
+        using the serializer of the client's AsyncWebCaller
+
+        :param func: Coroutine function to be wrapped.
+        :type func: Function
+
+        :return: Result of function, parsed into python objects from json
+        :rtype: dict
+        """
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            resp = await func(self, *args, **kwargs)
+            return self.webcaller.parse_json(resp)
+
+        return wrapper
+
+
+class AsyncWebStreamer():
+    """
+    Wrapper for an asynchronous web request stream.
+    Its main purpose is to split the stream into lines and raise errors during the stream as custom Humio exceptions.
+    """
+    def __init__(self, response, chunk_size=64 * 1024):
+        """
+        :param response: Open response created by http library.
+        :type response: aiohttp.ClientResponse
+        :param chunk_size: Maximum number of bytes read from the connection at a time.
+        :type chunk_size: int, optional
+        """
+        self.response = response
+        self.chunk_size = chunk_size
+
+    async def __aiter__(self):
+        buffer = b""
+        try:
+            async for chunk in self.response.content.iter_chunked(self.chunk_size):
+                lines = (buffer + chunk).split(b"\n")
+                buffer = lines.pop()
+                for line in lines:
+                    if line:
+                        yield line
+            if buffer:
+                yield buffer
+        # This error occurs during live queries, when data hasn't been streamed in a while
+        except (aiohttp.ClientPayloadError, aiohttp.ClientConnectionError):
+            raise HumioConnectionDroppedException("Connection to streaming socket was lost")
+        except asyncio.TimeoutError as e:
+            raise HumioTimeoutException(e)
+        finally:
+            self.response.release()
@@ -0,0 +1,161 @@
+import collections
+import queue
+import threading
+import time
+
+
+class _Flush():
+    """
+    Marker put on the queue by flush and close
+    """
+    def __init__(self, close=False):
+        self.close = close
+        self.taken = None  # Number of items taken off the queue ahead of the marker, set once the marker is reached
+
+
+class BatchingQueue():
+    """
+    Bounded queue whose items are collected into batches on a background thread.
+    A batch is handed on when it is full, when its oldest item has waited max_linger seconds, or when the queue is flushed.
+
+    How items are added to a batch and what is done with a full batch is up to the owner of the queue.
+    Every item put on the queue must be marked as done through task_done once its batch has been handled,
+    which is what flush waits for.
+
+    Putting an item takes no lock. The background thread is only woken when it has no batch open,
+    when wake_size items are waiting, or when the queue is full, rather than for every item.
+    The bound on the queue is approximate, as threads putting items at the same time may overshoot it by one item each.
+    """
+
+    def __init__(self, maxsize, max_linger, new_batch, add, is_full, submit, drop, name, wake_size=1):
+        """
+        :param maxsize: Maximum number of items waiting to be batched, putting items blocks or fails when the queue is full.
+        :type maxsize: int
+        :param max_linger: Maximum number of seconds an item waits in a batch before the batch is handed on.
+        :type max_linger: float
+        :param new_batch: Returns a new, empty batch.
+        :type new_batch: Function
+        :param add: Adds an item to a batch.
+        :type add: Function
+        :param is_full: Returns whether a batch is to be handed on right away.
+        :type is_full: Function
+        :param submit: Handles a batch, which may be empty.
+        :type submit: Function
+        :param drop: Called with the raised exception and the number of lost items, when an item cannot be added to a batch.
+        :type drop: Function
+        :param name: Name of the background thread.
+        :type name: str
+        :param wake_size: Number of waiting items at which the background thread is woken, usually the maximum size of a batch.
+        :type wake_size: int, optional
+        """
+        self.maxsize = maxsize
+        self.max_linger = max_linger
+        self.new_batch = new_batch
+        self.add = add
+        self.is_full = is_full
+        self.submit = submit
+        self.drop = drop
+        self.wake_size = wake_size
+        self._items = collections.deque()
+        self._idle = True  # Whether the background thread has no batch open, and so no deadline to wake up at
+        self._wakeup = threading.Event()
+        self._not_full = threading.Condition()
+        self._done = threading.Condition()
+        self._taken = 0
+        self._handled = 0
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def put(self, item, block=True, timeout=None):
+        """
+        :raises queue.Full: When the queue is full and no room was made in time
+        """
+        if len(self._items) >= self.maxsize:
+            self._wait_for_room(block, timeout)
+        self._items.append(item)
+        if (self._idle or len(self._items) >= self.wake_size) and not self._wakeup.is_set():
+            self._wakeup.set()
+
+    def task_done(self, count=1):
+        """
+        Marks items as handled
+        """
+        with self._done:
+            self._handled += count
+            self._done.notify_all()
+
+    def flush(self):
+        """
+        Hand on the current batch and block until all items put so far have been handled
+        """
+        marker = _Flush()
+        self._items.append(marker)
+        self._wakeup.set()
+        with self._done:
+            self._done.wait_for(lambda: marker.taken is not None and self._handled >= marker.taken)
+
+    def close(self):
+        """
+        Hand on the current batch and stop the background thread
+        """
+        self._items.append(_Flush(close=True))
+        self._wakeup.set()
+        self.thread.join()
+
+    def _wait_for_room(self, block, timeout):
+        self._wakeup.set()
+        if not block:
+            raise queue.Full
+        with self._not_full:
+            if not self._not_full.wait_for(lambda: len(self._items) < self.maxsize, timeout):
+                raise queue.Full
+
+    def _made_room(self):
+        with self._not_full:
+            self._not_full.notify_all()
+
+    def _run(self):
+        batch = self.new_batch()
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0, deadline - time.monotonic())
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+            while self._items:
+                item = self._items.popleft()
+                if isinstance(item, _Flush):
+                    self.submit(batch)
+                    batch, deadline = self.new_batch(), None
+                    with self._done:
+                        item.taken = self._taken
+                        self._done.notify_all()
+                    if item.close:
+                        return
+                    continue
+
+                self._taken += 1
+                try:
+                    self.add(batch, item)
+                except Exception as e:
+                    # A single bad item must not stop the background thread, which every other item depends on
+                    self.drop(e, 1)
+                    self.task_done()
+                    continue
+
+                if deadline is None:
+                    deadline = time.monotonic() + self.max_linger
+                    self._idle = False
+                if self.is_full(batch):
+                    self.submit(batch)
+                    batch, deadline = self.new_batch(), None
+                    self._made_room()
+            self._made_room()
+
+            if deadline is not None and time.monotonic() >= deadline:
+                self.submit(batch)
+                batch, deadline = self.new_batch(), None
+            if deadline is None:
+                self._idle = True
+                if self._items:  # Put after the queue was drained, but before the thread was marked idle
+                    self._wakeup.set()
@@ -0,0 +1,333 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from humiolib.BatchingQueue import BatchingQueue
+from humiolib.HumioClient import HumioIngestClient
+from humiolib.HumioExceptions import (
+    HumioException,
+    HumioConnectionException,
+    HumioHTTPException,
+    HumioTimeoutException,
+)
+
+def _freeze(mapping):
+    """
+    Turns a dictionary of tags or fields into a hashable value, so that it can be used to group events
+
+    :param mapping: Dictionary to freeze.
+    :type mapping: dict, optional
+
+    :return: Hashable representation of the dictionary
+    :rtype: tuple
+    :raises TypeError: When a value of the dictionary is not hashable
+    """
+    if not mapping:
+        return None
+    frozen = tuple(sorted(mapping.items()))
+    hash(frozen)
+    return frozen
+
+
+class _Batch():
+    """
+    Events accumulated for a single flush.
+    Events are grouped by what they have in common, so that each group is only described once in the request payload.
+    Structured events are kept as they were serialized when added.
+    """
+    def __init__(self):
+        self.structured = OrderedDict()
+        self.unstructured = OrderedDict()
+        self.count = 0
+        self.size = 0
+
+    def add_event(self, event, tags, key, size):
+        if key not in self.structured:
+            self.structured[key] = (tags, [])
+        self.structured[key][1].append(event)
+        self.count += 1
+        self.size += size
+
+    def add_message(self, message, parser, fields, tags, key, size):
+        if key not in self.unstructured:
+            self.unstructured[key] = (parser, fields, tags, [])
+        self.unstructured[key][3].append(message)
+        self.count += 1
+        self.size += size
+
+
+class BufferedIngestClient(HumioIngestClient):
+    """
+    A Humio ingest client that buffers events in memory and ships them to Humio in batches from background threads.
+    Events that share the same tags, or the same parser, fields and tags, are merged into one entry in the request payload.
+
+    Ingest happens asynchronously of the calling code, so errors cannot be raised to the caller.
+    Instead they are passed to the error callback, if one is given.
+    Failures replaying requests from the spool are passed with None as the number of events, which is not known for spooled requests.
+    If a spool is given, batches failing because Humio cannot be reached are written to disk instead of being dropped,
+    and are replayed from a background thread once Humio is reachable again.
+    """
+
+    def __init__(
+        self,
+        ingest_token,
+        base_url="http://localhost:3000",
+        webcaller=None,
+        compression=None,
+        compression_threshold=1024,
+        serializer=None,
+        max_batch_size=500,
+        max_batch_bytes=1024 * 1024,
+        max_linger=1.0,
+        queue_size=10000,
+        workers=2,
+        error_callback=None,
+        spool=None,
+        spool_max_bytes_per_second=None,
+    ):
+        """
+        :param ingest_token: Ingest token to access ingest.
+        :type ingest_token: string
+        :param base_url: Url of Humio instance.
+        :type base_url: string
+        :param webcaller: WebCaller to make requests through, allows several clients to share one connection pool
+        :type webcaller: WebCaller, optional
+        :param compression: Compression of ingest request bodies, either "gzip" or "zstd". Disabled when None.
+        :type compression: str, optional
+        :param compression_threshold: Size in bytes below which ingest request bodies are sent uncompressed.
+        :type compression_threshold: int, optional
+        :param serializer: Serializer used for request and response bodies, when no webcaller is given.
+        :type serializer: JsonSerializer, optional
+        :param max_batch_size: Maximum number of events sent in one request.
+        :type max_batch_size: int, optional
+        :param max_batch_bytes: Approximate maximum number of bytes of events sent in one request.
+        :type max_batch_bytes: int, optional
+        :param max_linger: Maximum number of seconds an event is buffered before it is sent.
+        :type max_linger: float, optional
+        :param queue_size: Maximum number of events waiting to be batched, adding events blocks when the queue is full.
+        :type queue_size: int, optional
+        :param workers: Number of threads sending batches to Humio concurrently.
+        :type workers: int, optional
+        :param error_callback: Called with the raised exception and the number of lost events, when a batch fails to be sent.
+        :type error_callback: Function, optional
+        :param spool: Spool keeping batches on disk while Humio cannot be reached. It is drained and closed by the client.
+        :type spool: IngestSpool, optional
+        :param spool_max_bytes_per_second: Upper bound on the number of bytes replayed from the spool per second.
+        :type spool_max_bytes_per_second: int, optional
+        """
+        super().__init__(ingest_token, base_url, webcaller, compression, compression_threshold, serializer)
+        self.max_batch_size = max_batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.max_linger = max_linger
+        self.error_callback = error_callback
+        self.sent_events = 0
+        self.dropped_events = 0
+        self.spooled_events = 0
+        self.spool = spool
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._in_flight = threading.BoundedSemaphore(workers)
+        self._counter_lock = threading.Lock()
+        self._queue = BatchingQueue(
+            queue_size,
+            max_linger,
+            new_batch=_Batch,
+            add=self._add_to_batch,
+            is_full=lambda batch: batch.count >= self.max_batch_size or batch.size >= self.max_batch_bytes,
+            submit=self._submit,
+            drop=self._drop,
+            name="humiolib-ingest-dispatcher",
+            wake_size=max_batch_size,
+        )
+        if spool is not None:
+            spool.start_drainer(self._post_ingest_body, spool_max_bytes_per_second, error_callback=self._spool_error)
+
+    def add_event(self, event, tags=None, block=True, timeout=None):
+        """
+        Buffer a structured event.
+        Structure of events is discussed in: https://docs.humio.com/reference/api/ingest/#structured-data
+        The event and its tags are serialized right away, so events that cannot be sent raise here rather than on the background threads.
+
+        :param event: Event with a timestamp and optionally attributes, timezone and rawstring.
+        :type event: dict
+        :param tags: Tags to associate with the event.
+        :type tags: dict(string->string), optional
+        :param block: Whether to wait for room in the queue, if it is full.
+        :type block: bool, optional
+        :param timeout: Maximum number of seconds to wait for room in the queue.
+        :type timeout: float, optional
+        """
+        encoded = self.serializer.dumps(event)
+        key = _freeze(tags)
+        if tags:
+            self.serializer.dumps(tags)
+        self._put(("structured", encoded, tags, key, len(encoded)), block, timeout)
+
+    def add_message(self, message, parser=None, fields=None, tags=None, block=True, timeout=None):
+        """
+        Buffer an unstructured message.
+        Its fields and tags are serialized right away, so messages that cannot be sent raise here rather than on the background threads.
+
+        :param message: Event string.
+        :type message: string
+        :param parser:  Name of parser to use on message.
+        :type parser: string, optional
+        :param fields:  Fields that should be added to event after parsing.
+        :type fields: dict(string->string), optional
+        :param tags:  Tags to associate with the message.
+        :type tags: dict(string->string), optional
+        :param block: Whether to wait for room in the queue, if it is full.
+        :type block: bool, optional
+        :param timeout: Maximum number of seconds to wait for room in the queue.
+        :type timeout: float, optional
+        """
+        key = (parser, _freeze(fields), _freeze(tags))
+        self.serializer.dumps([message, parser, fields, tags])
+        self._put(("unstructured", message, parser, fields, tags, key, len(message)), block, timeout)
+
+    def _put(self, item, block, timeout):
+        if self._closed:
+            raise HumioException("Cannot add events to a closed client")
+        self._queue.put(item, block, timeout)
+
+    def flush(self):
+        """
+        Block until all events added so far have been sent to Humio
+        """
+        if self._closed:
+            return
+        self._queue.flush()
+
+    def close(self):
+        """
+        Send all buffered events, stop the background threads, close the spool and close the pooled connections.
+        Requests left in the spool stay on disk, to be replayed by the next client using it.
+        """
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._queue.close()
+        self._executor.shutdown(wait=True)
+        if self.spool is not None:
+            self.spool.close()
+        super().close()
+
+    @staticmethod
+    def _add_to_batch(batch, item):
+        """
+        Runs on the dispatcher thread, adding an event or message from the queue to the batch being accumulated
+        """
+        if item[0] == "structured":
+            batch.add_event(*item[1:])
+        else:
+            batch.add_message(*item[1:])
+
+    def _submit(self, batch):
+        """
+        Hands a batch to a worker, blocking while all workers are busy.
+        Blocking here lets the queue fill up, which in turn applies backpressure to the code adding events.
+        """
+        if batch.count == 0:
+            return
+        self._in_flight.acquire()
+        self._executor.submit(self._send, batch)
+
+    def _send(self, batch):
+        """
+        Runs on a worker thread, sending a batch to Humio
+        """
+        try:
+            if batch.structured:
+                self._encode_and_send(
+                    "ingest/humio-structured",
+                    lambda: self._encode_structured_data_objects(batch),
+                    sum(len(events) for _, events in batch.structured.values()),
+                )
+            if batch.unstructured:
+                self._encode_and_send(
+                    "ingest/humio-unstructured",
+                    lambda: self.serializer.dumps([
+                        self._create_unstructured_data_object(messages, parser=parser, fields=fields, tags=tags)
+                        for parser, fields, tags, messages in batch.unstructured.values()
+                    ]),
+                    sum(len(messages) for _, _, _, messages in batch.unstructured.values()),
+                )
+        finally:
+            self._in_flight.release()
+            self._queue.task_done(batch.count)
+
+    def _encode_and_send(self, endpoint, encode, count):
+        """
+        Encodes and sends one ingest request, dropping its events if it cannot be encoded
+        """
+        try:
+            body = encode()
+        except Exception as e:  # Nothing inspects the future of a worker, so errors must be reported here or be lost
+            self._drop(e, count)
+            return
+        self._send_request(endpoint, body, count)
+
+    def _send_request(self, endpoint, body, count):
+        """
+        Posts a serialized ingest request, spooling it if Humio cannot be reached and dropping it on other errors
+        """
+        try:
+            self._post_ingest_body(endpoint, body)
+            with self._counter_lock:
+                self.sent_events += count
+        except HumioException as e:
+            if self.spool is not None and self._is_spoolable(e):
+                try:
+                    self.spool.append(endpoint, body)
+                    with self._counter_lock:
+                        self.spooled_events += count
+                    return
+                except OSError:
+                    pass
+            self._drop(e, count)
+        except Exception as e:  # Such as errors of the http library that are not translated to Humio exceptions
+            self._drop(e, count)
+
+    def _drop(self, e, count):
+        """
+        Counts lost events and reports them to the error callback
+        """
+        with self._counter_lock:
+            self.dropped_events += count
+        if self.error_callback is not None:
+            self.error_callback(e, count)
+
+    def _spool_error(self, e):
+        """
+        Reports a request that failed to be replayed from the spool, or that was moved to its dead-letter file
+        """
+        if self.error_callback is not None:
+            self.error_callback(e, None)
+
+    @staticmethod
+    def _is_spoolable(e):
+        """
+        :return: Whether a failed request is worth sending again later, because Humio could not be reached or was unavailable
+        :rtype: bool
+        """
+        if isinstance(e, (HumioConnectionException, HumioTimeoutException)):
+            return True
+        if isinstance(e, HumioHTTPException):
+            return e.status_code is None or e.status_code == 429 or e.status_code >= 500
+        return False
+
+    def _encode_structured_data_objects(self, batch):
+        """
+        Creates the payload for Humio's structured ingest endpoint, with one entry per distinct set of tags.
+        Events were serialized as they were added, so their encodings are joined rather than serialized again.
+
+        :return: A payload fit to be sent to the structured ingest endpoint
+        :rtype: bytes
+        """
+        data_objects = []
+        for tags, events in batch.structured.values():
+            obj = b'{"events":[' + b",".join(events) + b"]"
+            if tags:
+                obj += b',"tags":' + self.serializer.dumps(tags)
+            data_objects.append(obj + b"}")
+        return b"[" + b",".join(data_objects) + b"]"
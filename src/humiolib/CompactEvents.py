@@ -0,0 +1,115 @@
+import sys
+from array import array
+from collections.abc import Sequence
+
+
+class CompactEvents(Sequence):
+    """
+    Memory efficient, read-only container of query result events.
+
+    Rather than one dictionary per event, every event is stored as a tuple of its values,
+    next to a table of the distinct field name tuples the events share.
+    Aggregate results typically have a single set of field names, which is then stored once for all rows.
+
+    Accessing or iterating over events materializes a new dictionary per event, so the container
+    can be used wherever a list of events is expected. Changes made to a materialized event are not kept.
+
+    The saving is in the memory held once events are stored, not in the peak memory of a poll:
+    a polled segment is decoded into dictionaries in full before its events can be stored.
+    Storing them through consume releases every dictionary as soon as its event is stored,
+    so that the conversion does not raise the peak any further.
+    """
+    __slots__ = ("_key_tables", "_key_table_ids", "_rows", "_row_key_tables")
+
+    def __init__(self, events=()):
+        """
+        :param events: Events to store.
+        :type events: Iterable(dict), optional
+        """
+        self._key_tables = []
+        self._key_table_ids = {}
+        self._rows = []
+        self._row_key_tables = array("I")
+        self.extend(events)
+
+    def extend(self, events):
+        """
+        Store further events
+
+        :param events: Events to store.
+        :type events: Iterable(dict)
+        """
+        key_table_ids = self._key_table_ids
+        rows = self._rows
+        row_key_tables = self._row_key_tables
+        for event in events:
+            keys = tuple(event)
+            key_table_id = key_table_ids.get(keys)
+            if key_table_id is None:
+                key_table_id = len(self._key_tables)
+                keys = tuple(sys.intern(key) for key in keys)
+                key_table_ids[keys] = key_table_id
+                self._key_tables.append(keys)
+            rows.append(tuple(event.values()))
+            row_key_tables.append(key_table_id)
+
+    @classmethod
+    def consume(cls, events):
+        """
+        Store the events of a list, emptying the list as its events are stored
+
+        :param events: Events to store, the list is left empty.
+        :type events: list(dict)
+
+        :return: The stored events
+        :rtype: CompactEvents
+        """
+        def take():
+            for index in range(len(events)):
+                event = events[index]
+                events[index] = None
+                yield event
+        compact = cls(take())
+        events.clear()
+        return compact
+
+    @property
+    def key_tables(self):
+        """
+        :return: The distinct tuples of field names of the stored events
+        :rtype: list(tuple(str))
+        """
+        return list(self._key_tables)
+
+    def row(self, index):
+        """
+        Get an event without materializing it as a dictionary
+
+        :param index: Position of event.
+        :type index: int
+
+        :return: Field names and values of the event
+        :rtype: tuple(tuple(str), tuple)
+        """
+        return self._key_tables[self._row_key_tables[index]], self._rows[index]
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return dict(zip(self._key_tables[self._row_key_tables[index]], self._rows[index]))
+
+    def __iter__(self):
+        key_tables = self._key_tables
+        for key_table_id, values in zip(self._row_key_tables, self._rows):
+            yield dict(zip(key_tables[key_table_id], values))
+
+    def __eq__(self, other):
+        if isinstance(other, (CompactEvents, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return "CompactEvents({} events, {} key tables)".format(len(self), len(self._key_tables))
@@ -0,0 +1,120 @@
+class ResultDelta():
+    """
+    Difference between two consecutive results of a live query
+    """
+    __slots__ = ("added", "changed", "removed", "metadata")
+
+    def __init__(self, added, changed, removed, metadata=None):
+        """
+        :param added: Rows that were not in the previous result.
+        :type added: list(dict)
+        :param changed: Rows whose values changed, as tuples of the previous and the current row.
+        :type changed: list(tuple(dict, dict))
+        :param removed: Rows of the previous result that are no longer in the result.
+        :type removed: list(dict)
+        :param metadata: Metadata of the poll the delta was computed from.
+        :type metadata: dict, optional
+        """
+        self.added = added
+        self.changed = changed
+        self.removed = removed
+        self.metadata = metadata
+
+    def __bool__(self):
+        """
+        :return: Whether anything changed
+        :rtype: bool
+        """
+        return bool(self.added or self.changed or self.removed)
+
+    def __repr__(self):
+        return "ResultDelta(added={}, changed={}, removed={})".format(
+            len(self.added), len(self.changed), len(self.removed)
+        )
+
+
+class DeltaTracker():
+    """
+    Tracks the result of a live query between polls, turning every new result into the rows that were added, changed and removed.
+
+    Rows are matched by key. For aggregates, the key should be the group-by fields. Without key fields,
+    rows are matched by their @id, and rows without one by their whole content, so that a changed row shows up as removed and added.
+    Rows sharing a key are matched in the order they appear in the result, the first with the first and so on,
+    so identical rows are counted rather than collapsed into one.
+
+    A result equal to the previous one is detected by comparing the two results before any row is keyed.
+    The comparison still looks at every row, but stops at the first difference and builds nothing.
+    """
+
+    def __init__(self, key_fields=None):
+        """
+        :param key_fields: Fields identifying a row, such as the group-by fields of an aggregate.
+        :type key_fields: list(str), optional
+        """
+        self.key_fields = tuple(key_fields) if key_fields else None
+        self.unchanged_polls = 0
+        self.changed_polls = 0
+        self._events = None
+        self._rows = {}
+
+    def _key(self, event):
+        if self.key_fields is not None:
+            if len(self.key_fields) == 1:
+                return event.get(self.key_fields[0])
+            return tuple(event.get(field) for field in self.key_fields)
+        key = event.get("@id")
+        if key is None:
+            return tuple(sorted(event.items(), key=lambda item: item[0]))
+        return key
+
+    def update(self, events, metadata=None):
+        """
+        Compares a new result with the previous one
+
+        :param events: Current result of the live query.
+        :type events: list(dict)
+        :param metadata: Metadata of the poll, passed on with the delta.
+        :type metadata: dict, optional
+
+        :return: Rows added, changed and removed since the previous result, everything is added on the first update
+        :rtype: ResultDelta
+        """
+        if not isinstance(events, list):
+            events = list(events)
+        if events == self._events:
+            self.unchanged_polls += 1
+            return ResultDelta([], [], [], metadata)
+
+        rows = {}
+        occurrences = {}
+        for event in events:
+            key = self._key(event)
+            occurrence = occurrences[key] = occurrences.get(key, 0) + 1
+            rows[(key, occurrence)] = event
+
+        previous = self._rows
+        added = []
+        changed = []
+        for key, event in rows.items():
+            old = previous.get(key)
+            if old is None:
+                added.append(event)
+            elif old != event:
+                changed.append((old, event))
+        removed = [event for key, event in previous.items() if key not in rows]
+
+        self._events = events
+        self._rows = rows
+        delta = ResultDelta(added, changed, removed, metadata)
+        if delta:
+            self.changed_polls += 1
+        else:  # Same rows in a different order
+            self.unchanged_polls += 1
+        return delta
+
+    def reset(self):
+        """
+        Forget the previous result, so that the next update reports every row as added
+        """
+        self._events = None
+        self._rows = {}
@@ -0,0 +1,273 @@
+import re
+
+_VARIABLE = re.compile(r"\$(\w+)")
+
+
+class GraphQLOperation():
+    """
+    A GraphQL operation with a single root field, compiled once into the document sent to Humio.
+    Values are always passed as variables, so documents never have to be formatted per call.
+
+    Besides its own document, an operation is compiled into a template with its variables renamed per index,
+    so that many operations can be merged into one aliased document.
+    """
+
+    def __init__(self, operation_type, variables, selection):
+        """
+        :param operation_type: Either "query" or "mutation".
+        :type operation_type: str
+        :param variables: Names and GraphQL types of the variables of the operation.
+        :type variables: dict(str->str)
+        :param selection: Root field of the operation, with its arguments and selected subfields.
+        :type selection: str
+        """
+        if operation_type not in ("query", "mutation"):
+            raise ValueError("Unsupported operation type '{}'".format(operation_type))
+        self.operation_type = operation_type
+        self.variables = dict(variables)
+        self.selection = selection
+        self.root_field = re.match(r"\s*(\w+)", selection).group(1)
+        self.document = "{}{}{{{}}}".format(operation_type, self._definitions(""), selection)
+
+        escaped = selection.replace("{", "{{").replace("}", "}}")
+        self._aliased_selection = _VARIABLE.sub(r"$\1_{index}", escaped)
+        self._aliased_definitions = ", ".join(
+            "${}_{{index}}: {}".format(name, variable_type) for name, variable_type in self.variables.items()
+        )
+
+    def _definitions(self, suffix):
+        if not self.variables:
+            return ""
+        return "(" + ", ".join(
+            "${}{}: {}".format(name, suffix, variable_type) for name, variable_type in self.variables.items()
+        ) + ")"
+
+    def request(self, variables=None):
+        """
+        :param variables: Values of the variables of the operation.
+        :type variables: dict, optional
+
+        :return: Body of a request performing the operation on its own
+        :rtype: dict
+        """
+        return {"query": self.document, "variables": variables}
+
+    def aliased(self, index, variables=None):
+        """
+        :param index: Position of the operation in a merged document, used in its alias and variable names.
+        :type index: int
+        :param variables: Values of the variables of the operation.
+        :type variables: dict, optional
+
+        :return: Aliased selection, variable definitions and renamed variables of the operation
+        :rtype: tuple(str, str, dict)
+        """
+        alias = GraphQLBatch.alias(index)
+        selection = "{}: {}".format(alias, self._aliased_selection.format(index=index))
+        definitions = self._aliased_definitions.format(index=index)
+        renamed = {"{}_{}".format(name, index): value for name, value in (variables or {}).items()}
+        return selection, definitions, renamed
+
+    def __repr__(self):
+        return "GraphQLOperation({!r})".format(self.document)
+
+
+class GraphQLResult():
+    """
+    Result of a single operation of a batch
+    """
+    __slots__ = ("data", "errors", "exception")
+
+    def __init__(self, data, errors, exception=None):
+        """
+        :param data: Value of the root field of the operation, None if it failed.
+        :type data: dict
+        :param errors: GraphQL errors raised by the operation.
+        :type errors: list(dict)
+        :param exception: Exception raised while sending the request holding the operation.
+        :type exception: Exception, optional
+        """
+        self.data = data
+        self.errors = errors
+        self.exception = exception
+
+    @property
+    def ok(self):
+        """
+        :return: Whether the operation succeeded
+        :rtype: bool
+        """
+        return not self.errors and self.exception is None
+
+    def __repr__(self):
+        if self.exception is not None:
+            return "GraphQLResult(exception={!r})".format(self.exception)
+        return "GraphQLResult(data={!r}, errors={!r})".format(self.data, self.errors)
+
+
+class GraphQLBatch():
+    """
+    Sends many GraphQL operations in few requests, and splits the responses back into a result per operation.
+
+    In "alias" mode, operations of the same type are merged into one document, each under its own alias
+    and with its variables renamed, as supported by any GraphQL server.
+    Queries are sent before mutations, and mutations in a document are executed in order.
+    In "array" mode, the requests of the operations are sent as one JSON array, for servers accepting batched requests.
+    Either way, at most max_batch_size operations are sent per request.
+    """
+
+    modes = ("alias", "array")
+
+    def __init__(self, send, max_batch_size=100, mode="alias"):
+        """
+        :param send: Sends a request body, returning the parsed response.
+        :type send: Function
+        :param max_batch_size: Maximum number of operations per request.
+        :type max_batch_size: int, optional
+        :param mode: Either "alias" or "array".
+        :type mode: str, optional
+        """
+        if mode not in self.modes:
+            raise ValueError("Unsupported batch mode '{}', use one of {}".format(mode, self.modes))
+        self.send = send
+        self.max_batch_size = max_batch_size
+        self.mode = mode
+        self.requests = 0
+        self._operations = []
+
+    @staticmethod
+    def alias(index):
+        return "op{}".format(index)
+
+    def add(self, operation, variables=None):
+        """
+        Adds an operation to the batch
+
+        :param operation: Operation to perform.
+        :type operation: GraphQLOperation
+        :param variables: Values of the variables of the operation.
+        :type variables: dict, optional
+
+        :return: Position of the operation, and of its result
+        :rtype: int
+        """
+        self._operations.append((operation, variables))
+        return len(self._operations) - 1
+
+    def __len__(self):
+        return len(self._operations)
+
+    def execute(self):
+        """
+        Sends all operations added to the batch, which is then emptied
+
+        :return: Results in the order the operations were added
+        :rtype: list(GraphQLResult)
+        """
+        operations, self._operations = self._operations, []
+        results = [None] * len(operations)
+
+        if self.mode == "array":
+            for start in range(0, len(operations), self.max_batch_size):
+                chunk = operations[start:start + self.max_batch_size]
+                responses = self.send([operation.request(variables) for operation, variables in chunk])
+                self.requests += 1
+                if not isinstance(responses, list) or len(responses) != len(chunk):
+                    # Servers without support for batched requests answer with a single error, which fails every operation
+                    errors = responses.get("errors") if isinstance(responses, dict) else None
+                    errors = errors or [{"message": "Expected a list of {} results in response to a batched request".format(len(chunk))}]
+                    for offset in range(len(chunk)):
+                        results[start + offset] = GraphQLResult(None, errors)
+                    continue
+                for offset, ((operation, _), response) in enumerate(zip(chunk, responses)):
+                    data = (response.get("data") or {}).get(operation.root_field)
+                    results[start + offset] = GraphQLResult(data, response.get("errors") or [])
+            return results
+
+        for operation_type in ("query", "mutation"):
+            positions = [i for i, (operation, _) in enumerate(operations) if operation.operation_type == operation_type]
+            for start in range(0, len(positions), self.max_batch_size):
+                chunk = positions[start:start + self.max_batch_size]
+                response = self.send(self._merge(operation_type, [(i, operations[i]) for i in chunk]))
+                self.requests += 1
+                data = response.get("data") or {}
+                errors = {}
+                for error in response.get("errors") or []:
+                    path = error.get("path") or [None]
+                    errors.setdefault(path[0], []).append(error)
+                for i in chunk:
+                    alias = self.alias(i)
+                    result_errors = errors.get(alias, [])
+                    if alias not in data and not result_errors:
+                        # An error not attributable to an operation, such as a syntax error, fails them all
+                        result_errors = errors.get(None, [])
+                    results[i] = GraphQLResult(data.get(alias), result_errors)
+        return results
+
+    @staticmethod
+    def _merge(operation_type, indexed_operations):
+        """
+        :return: Body of a request performing all given operations under their aliases
+        :rtype: dict
+        """
+        selections = []
+        definitions = []
+        variables = {}
+        for index, (operation, operation_variables) in indexed_operations:
+            selection, definition, renamed = operation.aliased(index, operation_variables)
+            selections.append(selection)
+            if definition:
+                definitions.append(definition)
+            variables.update(renamed)
+        document = "{}{}{{{}}}".format(
+            operation_type, "({})".format(", ".join(definitions)) if definitions else "", " ".join(selections)
+        )
+        return {"query": document, "variables": variables}
+
+
+LIST_ORGANIZATIONS = GraphQLOperation("query", {}, "organizations{id, name, description}")
+CREATE_ORGANIZATION = GraphQLOperation(
+    "mutation", {"name": "String!", "description": "String!"},
+    "createOrganization(name: $name, description: $description){organization{id}}",
+)
+CREATE_FILE = GraphQLOperation(
+    "mutation", {"fileName": "String!", "repo": "String!"},
+    "newFile(fileName: $fileName, name: $repo){nameAndPath { name, path}}",
+)
+LIST_FILES = GraphQLOperation(
+    "query", {"name": "String!"},
+    "searchDomain(name: $name){files {nameAndPath {path, name} } }",
+)
+GET_FILE_CONTENT = GraphQLOperation(
+    "query", {"name": "String!", "fileName": "String!", "offset": "Int", "limit": "Int", "filterString": "String"},
+    "getFileContent(name: $name, fileName: $fileName, offset: $offset, limit: $limit, filterString: $filterString) { "
+    "totalLinesCount, limit, offset, headers, lines}",
+)
+DELETE_FILE = GraphQLOperation(
+    "mutation", {"fileName": "String!", "repo": "String!"},
+    "removeFile(fileName: $fileName, name: $repo){ __typename}",
+)
+UPDATE_FILE = GraphQLOperation(
+    "mutation",
+    {"fileName": "String!", "name": "String!", "changedRows": "[[String!]!]!", "headers": "[String!]!",
+     "columnChanges": "[ColumnChange!]!", "limit": "Int", "offset": "Int"},
+    "updateFile(limit: $limit, offset: $offset, fileName: $fileName, name: $name, changedRows: $changedRows, "
+    "headers: $headers, columnChanges: $columnChanges) {offset, limit, totalLinesCount, headers, lines, "
+    "nameAndPath {name, path } }",
+)
+CREATE_SAVED_QUERY = GraphQLOperation(
+    "mutation", {"input": "CreateSavedQueryInput!"},
+    "createSavedQuery(input: $input){savedQuery{id, name}}",
+)
+LIST_SAVED_QUERIES = GraphQLOperation(
+    "query", {"name": "String!"},
+    "repository(name: $name){savedQueries { id, name, displayName, query {queryString} } }",
+)
+UPDATE_SAVED_QUERY = GraphQLOperation(
+    "mutation", {"input": "UpdateSavedQueryInput!"},
+    "updateSavedQuery(input: $input){savedQuery{id, name}}",
+)
+DELETE_SAVED_QUERY = GraphQLOperation(
+    "mutation", {"input": "DeleteSavedQueryInput!"},
+    "deleteSavedQuery(input: $input){savedQuery{id, name}}",
+)
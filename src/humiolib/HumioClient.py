@@ -1,8 +1,26 @@
 import requests
-import json
+import gzip
+import hashlib
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from humiolib.WebCaller import WebCaller, WebStreamer
-from humiolib.QueryJob import StaticQueryJob, LiveQueryJob
-from humiolib.HumioExceptions import HumioConnectionException
+from humiolib.JsonSerializer import JsonSerializer
+from humiolib.ParallelQuery import ParallelQuery, split_time_range, to_epoch_millis
+from humiolib.QueryJob import StaticQueryJob, LiveQueryJob, CachedQueryJob
+from humiolib.ArrowResults import ArrowResults
+from humiolib.ResumableExport import ExportCheckpoint, ResumableExport
+from humiolib.SingleFlight import SingleFlight
+from humiolib.MultipartFileStream import MultipartFileStream
+from humiolib.UserDirectory import UserDirectory
+from humiolib import GraphQL
+from humiolib.GraphQL import GraphQLBatch, GraphQLResult
+from humiolib.HumioExceptions import HumioConnectionException, HumioChecksumException
+
+try:
+    import zstandard
+except ImportError:  # zstd compression is an optional feature
+    zstandard = None
 
 
 class BaseHumioClient():
@@ -10,9 +28,38 @@ class BaseHumioClient():
     Base class for other client types, is not meant to be instantiated
     """
 
-    def __init__(self, base_url):
+    compression_algorithms = ("gzip", "zstd")
+
+    def __init__(self, base_url, webcaller=None, compression=None, compression_threshold=1024, serializer=None):
+        if compression is not None and compression not in self.compression_algorithms:
+            raise ValueError("Unsupported compression '{}', use one of {}".format(compression, self.compression_algorithms))
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package, install it with: pip install humiolib[zstd]")
+
         self.base_url = base_url
-        self.webcaller = WebCaller(self.base_url)
+        self.webcaller = webcaller if webcaller is not None else WebCaller(self.base_url, serializer=serializer)
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+
+    @property
+    def serializer(self):
+        """
+        :return: Serializer used for request and response bodies, shared with the WebCaller
+        :rtype: JsonSerializer
+        """
+        return self.webcaller.serializer
+
+    def close(self):
+        """
+        Closes the pooled connections held by this client
+        """
+        self.webcaller.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     @classmethod
     def _from_saved_state(cls, state_dump):
@@ -25,10 +72,95 @@ class BaseHumioClient():
         :return: An instance of this class
         :rtype: BaseHumioClient
         """
-        data = json.loads(state_dump)
+        data = JsonSerializer().loads(state_dump)
         instance = cls(**data)
         return instance
 
+    def _encode_ingest_body(self, payload, headers):
+        """
+        Serializes an ingest payload and compresses it, if compression is enabled and the body is large enough
+        to be worth compressing. The Content-Encoding header is set accordingly.
+
+        :param payload: Ingest payload.
+        :type payload: list
+        :param headers: Headers of the ingest request, updated in place.
+        :type headers: dict
+
+        :return: Request body
+        :rtype: bytes
+        """
+        return self._compress_ingest_body(self.serializer.dumps(payload), headers)
+
+    def _compress_ingest_body(self, body, headers):
+        """
+        Compresses a serialized ingest body, if compression is enabled and the body is large enough
+        to be worth compressing. The Content-Encoding header is set accordingly.
+
+        :param body: Serialized ingest payload.
+        :type body: bytes
+        :param headers: Headers of the ingest request, updated in place.
+        :type headers: dict
+
+        :return: Request body
+        :rtype: bytes
+        """
+        if self.compression is None or len(body) < self.compression_threshold:
+            return body
+
+        headers["Content-Encoding"] = self.compression
+        if self.compression == "gzip":
+            return gzip.compress(body, compresslevel=6)
+        return zstandard.ZstdCompressor().compress(body)
+
+    @staticmethod
+    def _create_query_data_object(
+        query_string,
+        start=None,
+        end=None,
+        is_live=None,
+        timezone_offset_minutes=None,
+        arguments=None,
+        raw_data=None,
+    ):
+        """
+        Creates a data object that can be sent to Humio's query endpoints
+
+        :param query_string: Humio query
+        :type query_string: str
+        :param start: Starting time of query
+        :type start: Union[int, str], optional
+        :param end: Ending time of query
+        :type end: Union[int, str], optional
+        :param is_live: Ending time of query
+        :type is_live: bool, optional
+        :param timezone_offset_minutes: Timezone offset in minutes
+        :type timezone_offset_minutes: int, optional
+        :param argument: Arguments specified in query
+        :type argument: dict(string->string), optional
+        :param raw_data: Additional arguments to add to POST body under other keys
+        :type raw_data: dict(string->string), optional
+
+        :return: A data object fit to be sent as query payload
+        :rtype: dict
+        """
+        data = dict(
+            (k, v)
+            for k, v in [
+                ("queryString", query_string),
+                ("start", start),
+                ("end", end),
+                ("isLive", is_live),
+                ("timeZoneOffsetMinutes", timezone_offset_minutes),
+                ("arguments", arguments),
+            ]
+            if v is not None
+        )
+
+        if raw_data is not None:
+            data.update(raw_data)
+
+        return data
+
     @staticmethod
     def _create_unstructured_data_object(messages, parser=None, fields=None, tags=None):
         """
@@ -70,6 +202,13 @@ class HumioClient(BaseHumioClient):
         repository,
         user_token,
         base_url="http://localhost:3000",
+        webcaller=None,
+        compression=None,
+        compression_threshold=1024,
+        serializer=None,
+        cache=None,
+        single_flight=None,
+        user_cache_ttl=None,
     ):
         """
         :param repository: Repository associated with client
@@ -78,10 +217,27 @@ class HumioClient(BaseHumioClient):
         :type user_token: str
         :param base_url: Url of Humio instance
         :type repository: str
-        """
-        super().__init__(base_url)
+        :param webcaller: WebCaller to make requests through, allows several clients to share one connection pool
+        :type webcaller: WebCaller, optional
+        :param compression: Compression of ingest request bodies, either "gzip" or "zstd". Disabled when None.
+        :type compression: str, optional
+        :param compression_threshold: Size in bytes below which ingest request bodies are sent uncompressed.
+        :type compression_threshold: int, optional
+        :param serializer: Serializer used for request and response bodies, when no webcaller is given.
+        :type serializer: JsonSerializer, optional
+        :param cache: Cache of the results of static queries over absolute time ranges, see MemoryQueryCache and DiskQueryCache.
+        :type cache: QueryCache, optional
+        :param single_flight: Coalesces concurrent identical read calls and static streaming queries into one request.
+        :type single_flight: SingleFlight, optional
+        :param user_cache_ttl: Number of seconds users looked up by email are served from a snapshot of the user list. Disabled when None.
+        :type user_cache_ttl: float, optional
+        """
+        super().__init__(base_url, webcaller, compression, compression_threshold, serializer)
         self.repository = repository
         self.user_token = user_token
+        self.cache = cache
+        self.single_flight = single_flight
+        self.user_directory = UserDirectory(self.get_users, ttl=user_cache_ttl)
 
     @property
     def _default_user_headers(self):
@@ -100,12 +256,27 @@ class HumioClient(BaseHumioClient):
         :return: State of all field variables
         :rtype: dict
         """
-        return json.dumps(
+        return self.serializer.dumps(
             {
                 "user_token": self.user_token,
                 "repository": self.repository,
                 "base_url": self.base_url,
             }
+        ).decode("utf-8")
+
+    def _cache_key(self, kind, query_string, start, end, is_live, timezone_offset_minutes, arguments, raw_data):
+        """
+        :return: Key of the query results in the cache, or None if they are not to be cached
+        :rtype: str
+        """
+        if self.cache is None:
+            return None
+        if not self.cache.is_cacheable(start, end, is_live):
+            self.cache.stats.record("bypasses")
+            return None
+        return self.cache.key(
+            self.serializer, kind, self.base_url, self.repository, self.user_token, query_string, start, end, arguments,
+            timezone_offset_minutes, raw_data,
         )
 
     def _streaming_query(
@@ -127,32 +298,18 @@ class HumioClient(BaseHumioClient):
         :rtype: Webstreamer
         """
 
-        if raw_data is None:
-            raw_data = {}
-
         endpoint = "dataspaces/{}/query".format(self.repository)
 
         headers = self._default_user_headers
         headers["Accept"] = media_type
         headers.update(kwargs.pop("headers", {}))
 
-        data = dict(
-            (k, v)
-            for k, v in [
-                ("queryString", query_string),
-                ("start", start),
-                ("end", end),
-                ("isLive", is_live),
-                ("timeZoneOffsetMinutes", timezone_offset_minutes),
-                ("arguments", arguments),
-            ]
-            if v is not None
+        data = self._create_query_data_object(
+            query_string, start, end, is_live, timezone_offset_minutes, arguments, raw_data
         )
 
-        data.update(raw_data)
-
         connection = self.webcaller.call_rest(
-            "post", endpoint, data=json.dumps(data), headers=headers, stream=True, **kwargs
+            "post", endpoint, data=self.serializer.dumps(data), headers=headers, stream=True, **kwargs
         )
 
         return WebStreamer(connection)
@@ -167,6 +324,9 @@ class HumioClient(BaseHumioClient):
         timezone_offset_minutes=None,
         arguments=None,
         raw_data=None,
+        batch_size=None,
+        chunk_size=1024 * 1024,
+        use_cache=True,
         **kwargs
     ):
         """
@@ -174,6 +334,12 @@ class HumioClient(BaseHumioClient):
         This is the preferred way to do static queries with large result sizes.
         It can be used for live queries, but not that if data is not passed back from
         Humio for a while, the connection will be lost, resulting in an error.
+        Events are decoded with orjson or ujson when installed.
+
+        When the client has a cache, the results of static queries over absolute time ranges are served from it,
+        and stored in it once fully streamed, unless they are larger than the cache.
+        When the client has a SingleFlight, identical static queries streamed concurrently share a single request,
+        and each caller gets an independent iterator over its results.
 
         :param query_string: Humio query
         :type query_string: str
@@ -189,28 +355,142 @@ class HumioClient(BaseHumioClient):
         :type argument: dict(string->string), optional
         :param raw_data: Additional arguments to add to POST body under other keys
         :type raw_data: dict(string->string), optional
-
-        :return: A generator that returns query results as python objects
+        :param batch_size: Yield lists of up to this many events rather than one event at a time
+        :type batch_size: int, optional
+        :param chunk_size: Number of bytes read from the connection at a time
+        :type chunk_size: int, optional
+        :param use_cache: Whether the cache of the client is used, if it has one
+        :type use_cache: bool, optional
+
+        :return: A generator that returns query results as python objects, or lists of them if batch_size is given
         :rtype: Generator
         """
 
         media_type = "application/x-ndjson"
-        encoding = "utf-8"
 
-        res = self._streaming_query(
-            query_string=query_string,
+        cache_key = None
+        if use_cache:
+            cache_key = self._cache_key(
+                "stream", query_string, start, end, is_live, timezone_offset_minutes, arguments, raw_data
+            )
+        cached = self.cache.get(cache_key) if cache_key is not None else None
+
+        def open_stream():
+            res = self._streaming_query(
+                query_string=query_string,
+                start=start,
+                end=end,
+                is_live=is_live,
+                timezone_offset_minutes=timezone_offset_minutes,
+                arguments=arguments,
+                media_type=media_type,
+                raw_data=raw_data,
+                **kwargs
+            )
+
+            batches = res.iter_event_batches(self.serializer, chunk_size=chunk_size)
+            if cache_key is not None:
+                batches = self._cache_event_batches(batches, cache_key)
+            return batches
+
+        if cached is not None:
+            batches = [self.serializer.loads(cached)]
+        elif self.single_flight is not None and not is_live:
+            key = self.single_flight.key(self, "streaming_query", [
+                query_string, start, end, timezone_offset_minutes, arguments, raw_data, chunk_size
+            ], kwargs)
+            batches = self.single_flight.stream(key, open_stream)
+        else:
+            batches = open_stream()
+
+        if batch_size is None:
+            for events in batches:
+                yield from events
+            return
+
+        batch = []
+        for events in batches:
+            batch.extend(events)
+            while len(batch) >= batch_size:
+                yield batch[:batch_size]
+                del batch[:batch_size]
+        if batch:
+            yield batch
+
+    def _cache_event_batches(self, batches, cache_key):
+        """
+        Passes on batches of streamed events, storing them in the cache once the stream has been fully read.
+        Batches are serialized as they pass, and storing is given up as soon as they no longer fit in the cache,
+        so that large results are never held in memory twice.
+        """
+        pieces = []
+        size = 2
+        for events in batches:
+            if pieces is not None and events:
+                piece = self.serializer.dumps(events)[1:-1]
+                size += len(piece) + 1
+                if size <= self.cache.max_bytes:
+                    pieces.append(piece)
+                else:
+                    pieces = None
+            yield events
+        if pieces is not None:
+            self.cache.set(cache_key, b"[" + b",".join(pieces) + b"]")
+
+    def streaming_query_arrow(
+        self,
+        query_string,
+        start=None,
+        end=None,
+        timezone_offset_minutes=None,
+        arguments=None,
+        raw_data=None,
+        batch_size=65536,
+        sample_size=1000,
+        schema=None,
+        widen_schema=True,
+        **kwargs
+    ):
+        """
+        Streams the results of a static query into Arrow record batches, rather than python dictionaries.
+        Requires the pyarrow package, which can be installed with: pip install humiolib[arrow]
+
+        :param query_string: Humio query
+        :type query_string: str
+        :param start: Starting time of query
+        :type start: Union[int, str], optional
+        :param end: Ending time of query
+        :type end: Union[int, str], optional
+        :param timezone_offset_minutes: Timezone offset in minutes
+        :type timezone_offset_minutes: int, optional
+        :param argument: Arguments specified in query
+        :type argument: dict(string->string), optional
+        :param raw_data: Additional arguments to add to POST body under other keys
+        :type raw_data: dict(string->string), optional
+        :param batch_size: Maximum number of rows of a record batch
+        :type batch_size: int, optional
+        :param sample_size: Number of events the schema is inferred from
+        :type sample_size: int, optional
+        :param schema: Schema of the record batches, inferred from the first events when None
+        :type schema: pyarrow.Schema, optional
+        :param widen_schema: Whether fields first seen after the schema was inferred or given are added to it, rather than left out
+        :type widen_schema: bool, optional
+
+        :return: Iterable of record batches, which can also be written to Parquet or collected into a pandas DataFrame
+        :rtype: ArrowResults
+        """
+        event_batches = self.streaming_query(
+            query_string,
             start=start,
             end=end,
-            is_live=is_live,
+            is_live=False,
             timezone_offset_minutes=timezone_offset_minutes,
             arguments=arguments,
-            media_type=media_type,
             raw_data=raw_data,
+            batch_size=batch_size,
             **kwargs
         )
-
-        for event in res:
-            yield json.loads(event.decode(encoding))
+        return ArrowResults(event_batches, batch_size, sample_size, schema, self.serializer, widen_schema)
 
     def create_queryjob(
         self,
@@ -221,6 +501,8 @@ class HumioClient(BaseHumioClient):
         timezone_offset_minutes=None,
         arguments=None,
         raw_data=None,
+        compact_events=False,
+        use_cache=True,
         **kwargs
     ):
         """
@@ -229,6 +511,10 @@ class HumioClient(BaseHumioClient):
         Queryjobs are good to use for live queries, or static queries that return smaller
         amounts of data.
 
+        When the client has a cache, static queries over absolute time ranges with cached results are not sent to Humio,
+        and a queryjob replaying the cached segments is returned. Otherwise the segments are stored in the cache
+        once the queryjob has been fully polled.
+
         :param query_string: Humio query
         :type query_string: str
         :param start: Starting time of query
@@ -243,40 +529,199 @@ class HumioClient(BaseHumioClient):
         :type argument: dict(string->string), optional
         :param raw_data: Additional arguments to add to POST body under other keys
         :type raw_data: dict(string->string), optional
+        :param compact_events: Whether polled events are stored as CompactEvents, which hold far less memory once polled
+        :type compact_events: bool, optional
+        :param use_cache: Whether the cache of the client is used, if it has one
+        :type use_cache: bool, optional
 
         :return:  An instance that grants access to the created queryjob and associated results
         :rtype: QueryJob
         """
 
+        cache_key = None
+        if use_cache:
+            cache_key = self._cache_key(
+                "queryjob", query_string, start, end, is_live, timezone_offset_minutes, arguments, raw_data
+            )
+            cached = self.cache.get(cache_key) if cache_key is not None else None
+            if cached is not None:
+                return CachedQueryJob(self.serializer.loads(cached), self.base_url, self.repository, self.user_token,
+                                      webcaller=self.webcaller, compact_events=compact_events)
+
         endpoint = "dataspaces/{}/queryjobs".format(self.repository)
 
         headers = self._default_user_headers
         headers.update(kwargs.pop("headers", {}))
 
-        data = dict(
-            (k, v)
-            for k, v in [
-                ("queryString", query_string),
-                ("start", start),
-                ("end", end),
-                ("isLive", is_live),
-                ("timeZoneOffsetMinutes", timezone_offset_minutes),
-                ("arguments", arguments),
-            ]
-            if v is not None
+        data = self._create_query_data_object(
+            query_string, start, end, is_live, timezone_offset_minutes, arguments, raw_data
         )
 
-        if raw_data is not None:
-            data.update(raw_data)
-
-        query_id = self.webcaller.call_rest(
-            "post", endpoint, data=json.dumps(data), headers=headers, **kwargs
-        ).json()['id']
+        response = self.webcaller.call_rest(
+            "post", endpoint, data=self.serializer.dumps(data), headers=headers, **kwargs
+        )
+        query_id = self.webcaller.parse_json(response)['id']
 
         if is_live:
-            return LiveQueryJob(query_id, self.base_url, self.repository, self.user_token)
+            return LiveQueryJob(query_id, self.base_url, self.repository, self.user_token, webcaller=self.webcaller,
+                                compact_events=compact_events)
         else:
-            return StaticQueryJob(query_id, self.base_url, self.repository, self.user_token)
+            queryjob = StaticQueryJob(query_id, self.base_url, self.repository, self.user_token,
+                                      webcaller=self.webcaller, compact_events=compact_events)
+            if cache_key is not None:
+                queryjob._store_results_in(self.cache, cache_key)
+            return queryjob
+
+    def parallel_query(
+        self,
+        query_string,
+        start,
+        end="now",
+        slices=8,
+        workers=4,
+        ordered=True,
+        timezone_offset_minutes=None,
+        arguments=None,
+        max_buffered_segments=16,
+        **kwargs
+    ):
+        """
+        Runs a static query over a large time range as several queryjobs in parallel.
+        The time range is split into equally long slices, each queried by its own static queryjob,
+        and the results of the slices are merged as they are polled.
+        Only non-aggregate queries can be split like this, as aggregates would be computed per slice.
+        Aggregate queries raise a HumioException, rather than returning per slice results.
+
+        :param query_string: Humio query
+        :type query_string: str
+        :param start: Starting time of query, in milliseconds since epoch or relative such as "7days"
+        :type start: Union[int, str]
+        :param end: Ending time of query, in milliseconds since epoch or relative such as "1day"
+        :type end: Union[int, str], optional
+        :param slices: Number of time slices to split the query into
+        :type slices: int, optional
+        :param workers: Number of queryjobs run concurrently
+        :type workers: int, optional
+        :param ordered: Whether results are returned slice by slice in time order, rather than as soon as they arrive
+        :type ordered: bool, optional
+        :param timezone_offset_minutes: Timezone offset in minutes
+        :type timezone_offset_minutes: int, optional
+        :param argument: Arguments specified in query
+        :type argument: dict(string->string), optional
+        :param max_buffered_segments: Maximum number of polled segments held in memory per slice
+        :type max_buffered_segments: int, optional
+
+        :return: A generator that returns query results as python objects
+        :rtype: Generator
+        """
+        now = to_epoch_millis("now")
+        time_ranges = split_time_range(to_epoch_millis(start, now), to_epoch_millis(end, now), slices)
+        # Slices of relative time ranges are never queried again, so caching them would only fill the cache
+        use_cache = isinstance(start, int) and isinstance(end, int)
+
+        def create_queryjob(slice_start, slice_end):
+            return self.create_queryjob(
+                query_string,
+                start=slice_start,
+                end=slice_end,
+                is_live=False,
+                timezone_offset_minutes=timezone_offset_minutes,
+                arguments=arguments,
+                use_cache=use_cache,
+                **kwargs
+            )
+
+        return iter(ParallelQuery(create_queryjob, time_ranges, workers, ordered, max_buffered_segments))
+
+    def resumable_export(
+        self,
+        query_string,
+        start,
+        end="now",
+        checkpoint_path=None,
+        slice_duration=60 * 60 * 1000,
+        checkpoint_every=10000,
+        max_retries=5,
+        retry_backoff=1.0,
+        timezone_offset_minutes=None,
+        arguments=None,
+        chunk_size=1024 * 1024,
+        max_slice_events=100000,
+        **kwargs
+    ):
+        """
+        Exports the results of a static query through streaming queries, resuming where it left off if the connection drops.
+        The time range is streamed in consecutive slices. When the connection drops, the current slice is queried again,
+        skipping the events that were already returned, as recognized by their @id.
+
+        If a checkpoint file is given, progress is persisted to it periodically and after every slice,
+        and an export of the same query and time range continues from it, for instance after the process was restarted.
+        Events returned after the last persisted checkpoint may then be returned again.
+
+        :param query_string: Humio query
+        :type query_string: str
+        :param start: Starting time of query, in milliseconds since epoch or relative such as "7days"
+        :type start: Union[int, str]
+        :param end: Ending time of query, in milliseconds since epoch or relative such as "1day"
+        :type end: Union[int, str], optional
+        :param checkpoint_path: File to persist progress to and continue from
+        :type checkpoint_path: str, optional
+        :param slice_duration: Maximum length in milliseconds of the time slices streamed one after another
+        :type slice_duration: int, optional
+        :param checkpoint_every: Number of events returned between persisted checkpoints
+        :type checkpoint_every: int, optional
+        :param max_retries: Maximum number of consecutive failures of a slice, before the exception is raised
+        :type max_retries: int, optional
+        :param retry_backoff: Seconds waited before the first retry of a slice, doubled for every following retry
+        :type retry_backoff: float, optional
+        :param timezone_offset_minutes: Timezone offset in minutes
+        :type timezone_offset_minutes: int, optional
+        :param argument: Arguments specified in query
+        :type argument: dict(string->string), optional
+        :param chunk_size: Number of bytes read from the connection at a time
+        :type chunk_size: int, optional
+        :param max_slice_events: Number of events in a slice above which the following slices are shortened
+        :type max_slice_events: int, optional
+
+        :return: A generator that returns query results as python objects
+        :rtype: Generator
+        """
+        checkpoint = None
+        if checkpoint_path is not None:
+            checkpoint = ExportCheckpoint.load(checkpoint_path, self.serializer)
+            if checkpoint is not None and (isinstance(start, str) or isinstance(end, str)):
+                # Relative times are resolved when the export is first started, and kept in its checkpoint
+                start, end = checkpoint.start, checkpoint.end
+            if checkpoint is not None and not checkpoint.matches(query_string, start, end):
+                raise ValueError("Checkpoint {} belongs to a different export".format(checkpoint_path))
+
+        if checkpoint is None:
+            now = to_epoch_millis("now")
+            checkpoint = ExportCheckpoint(query_string, to_epoch_millis(start, now), to_epoch_millis(end, now))
+
+        def stream_slice(slice_start, slice_end):
+            stream = self._streaming_query(
+                query_string,
+                start=slice_start,
+                end=slice_end,
+                is_live=False,
+                timezone_offset_minutes=timezone_offset_minutes,
+                arguments=arguments,
+                **kwargs
+            )
+            return stream.iter_event_batches(self.serializer, chunk_size=chunk_size)
+
+        return iter(ResumableExport(
+            stream_slice,
+            checkpoint,
+            slice_duration=slice_duration,
+            checkpoint_path=checkpoint_path,
+            checkpoint_every=checkpoint_every,
+            max_retries=max_retries,
+            retry_backoff=retry_backoff,
+            serializer=self.serializer,
+            max_slice_events=max_slice_events,
+        ))
 
     def _ingest_json_data(self, json_elements=None, **kwargs):
         """
@@ -305,7 +750,7 @@ class HumioClient(BaseHumioClient):
         endpoint = "dataspaces/{}/ingest".format(self.repository)
 
         return self.webcaller.call_rest(
-            "post", endpoint, data=json.dumps(json_elements), headers=headers, **kwargs
+            "post", endpoint, data=self._encode_ingest_body(json_elements, headers), headers=headers, retry=True, **kwargs
         )
 
     # Wrap method to be pythonic
@@ -343,12 +788,31 @@ class HumioClient(BaseHumioClient):
         )
 
         return self.webcaller.call_rest(
-            "post", endpoint, data=json.dumps([obj]), headers=headers, **kwargs
+            "post", endpoint, data=self._encode_ingest_body([obj], headers), headers=headers, retry=True, **kwargs
         )
 
     # Wrap method to be pythonic
     ingest_messages = WebCaller.response_as_json(_ingest_messages)
 
+    def graphql_batch(self, max_batch_size=100, mode="alias"):
+        """
+        Creates a batch of GraphQL operations, which are sent in as few requests as possible when executed.
+        The operations used by this client are found in the humiolib.GraphQL module.
+
+        :param max_batch_size: Maximum number of operations per request
+        :type max_batch_size: int, optional
+        :param mode: Either "alias", merging operations into one aliased document, or "array", sending a batched array of requests
+        :type mode: str, optional
+
+        :return: An empty batch, sending its requests through this client
+        :rtype: GraphQLBatch
+        """
+        def send(body):
+            response = self.webcaller.call_graphql(headers=self._default_user_headers, data=self.serializer.dumps(body))
+            return self.webcaller.parse_json(response)
+
+        return GraphQLBatch(send, max_batch_size, mode)
+
     # status
     def _get_status(self, **kwargs):
         """
@@ -361,7 +825,7 @@ class HumioClient(BaseHumioClient):
         return self.webcaller.call_rest("get", endpoint, **kwargs)
 
     # Wrap method to be pythonic
-    get_status = WebCaller.response_as_json(_get_status)
+    get_status = SingleFlight.coalesced(WebCaller.response_as_json(_get_status))
 
     # user management
     def _get_users(self):
@@ -375,7 +839,7 @@ class HumioClient(BaseHumioClient):
         return self.webcaller.call_rest("get", endpoint, headers=self._default_user_headers)
 
     # Wrap method to be pythonic
-    get_users = WebCaller.response_as_json(_get_users)
+    get_users = SingleFlight.coalesced(WebCaller.response_as_json(_get_users))
 
     def get_user_by_email(self, email):
         """
@@ -387,11 +851,7 @@ class HumioClient(BaseHumioClient):
         :return: Response to web request as json string
         :rtype: str
         """
-        user_list = self.get_users()
-        for user in user_list:
-            if email == user["email"]:
-                return user
-        return None
+        return self.user_directory.get_by_email(email)
 
     def _create_user(self, email, isRoot=False):
         """
@@ -411,11 +871,26 @@ class HumioClient(BaseHumioClient):
         data = {"email": email, "isRoot": isRoot}
 
         return self.webcaller.call_rest(
-            "post", endpoint, data=json.dumps(data), headers=self._default_user_headers
+            "post", endpoint, data=self.serializer.dumps(data), headers=self._default_user_headers
         )
 
     # Wrap method to be pythonic
-    create_user = WebCaller.response_as_json(_create_user)
+    def create_user(self, email, isRoot=False):
+        """
+        Create user on Humio instance. Method is idempotent
+
+        :param email: Email of user to create
+        :type email: str
+        :param isRoot: Indicates whether user should be root
+        :type isRoot: bool, optional
+
+        :return: Response to web request as json string
+        :rtype: str
+        """
+        try:
+            return self.webcaller.parse_json(self._create_user(email, isRoot))
+        finally:
+            self.user_directory.invalidate()
 
     def _delete_user_by_id(self, user_id):
         """
@@ -433,7 +908,20 @@ class HumioClient(BaseHumioClient):
         return self.webcaller.call_rest("delete", link, headers=self._default_user_headers)
 
     # Wrap method to be pythonic
-    delete_user_by_id = WebCaller.response_as_json(_delete_user_by_id)
+    def delete_user_by_id(self, user_id):
+        """
+        Delete user from Humio instance.
+
+        :param user_id: Id of user to delete.
+        :type user_id: string
+
+        :return: Response to web request as json string
+        :rtype: str
+        """
+        try:
+            return self.webcaller.parse_json(self._delete_user_by_id(user_id))
+        finally:
+            self.user_directory.invalidate()
 
     def delete_user_by_email(self, email):
         """
@@ -445,10 +933,39 @@ class HumioClient(BaseHumioClient):
         :return: Response to web request as json string
         :rtype: str
         """
-        for user in self.get_users():
-            if email == user["email"]:
-                return self.delete_user_by_id(user["userID"])
-        return None
+        user = self.user_directory.get_by_email(email)
+        if user is None:
+            return None
+        return self.delete_user_by_id(user["userID"])
+
+    def delete_users_by_email(self, emails):
+        """
+        Delete many users by email.
+        All emails are resolved against a single snapshot of the user list, which is only downloaded once.
+        A failing deletion does not stop the others.
+
+        :param emails: Emails of users to delete.
+        :type emails: Iterable(str)
+
+        :return: Response to the deletion of every user by email, None for emails without a user,
+        or the exception raised when the deletion failed
+        :rtype: dict
+        """
+        users_by_email, _ = self.user_directory.snapshot()
+        results = {}
+        try:
+            for email in emails:
+                user = users_by_email.get(email)
+                if user is None:
+                    results[email] = None
+                    continue
+                try:
+                    results[email] = self.webcaller.parse_json(self._delete_user_by_id(user["userID"]))
+                except Exception as e:
+                    results[email] = e
+        finally:
+            self.user_directory.invalidate()
+        return results
 
     # organizations
     def _list_organizations(self):
@@ -460,17 +977,15 @@ class HumioClient(BaseHumioClient):
         """
 
         headers = self._default_user_headers
-        request = {
-            "query": "query {organizations{id, name, description}}",
-            "variables": None,
-        }
+        request = GraphQL.LIST_ORGANIZATIONS.request()
 
-        return self.webcaller.call_graphql(headers=headers, data=json.dumps(request))
+        return self.webcaller.call_graphql(headers=headers, data=self.serializer.dumps(request))
 
     # Wrap method to be pythonic
+    @SingleFlight.coalesced
     def list_organizations(self):
         resp = self._list_organizations()
-        return resp.json()["data"]["organizations"]
+        return self.webcaller.parse_json(resp)["data"]["organizations"]
 
     def _create_organization(self, name, description):
         """
@@ -486,38 +1001,43 @@ class HumioClient(BaseHumioClient):
         """
 
         headers = self._default_user_headers
-        request = {
-            "query": "mutation($name: String!, $description: String!){createOrganization(name: $name, description: $description){organization{id}}}",
-            "variables": {"name": name, "description": description},
-        }
-        return self.webcaller.call_graphql(headers=headers, data=json.dumps(request))
+        request = GraphQL.CREATE_ORGANIZATION.request({"name": name, "description": description})
+        return self.webcaller.call_graphql(headers=headers, data=self.serializer.dumps(request))
 
     # Wrap method to be pythonic
     def create_organization(self, name, description):
         resp = self._create_organization(name, description)
-        return resp.json()["data"]
+        return self.webcaller.parse_json(resp)["data"]
 
     # files API
-    def _upload_file(self, filepath):
+    def _upload_file(self, filepath, progress_callback=None, chunk_size=1024 * 1024):
         """
-        Upload file to repository
+        Upload file to repository.
+        The multipart body is streamed from disk a chunk at a time, so memory use does not grow with the size of the file.
 
         :param filepath: Path to file.
         :type filepath: string
+        :param progress_callback: Called with the number of bytes sent so far and the size of the file, after every chunk.
+        :type progress_callback: Function, optional
+        :param chunk_size: Number of bytes of the file read and sent at a time.
+        :type chunk_size: int, optional
 
         :return: Response to web request
         :rtype: Response Object
         """
 
         endpoint = "dataspaces/{}/files".format(self.repository)
-        headers = {"Authorization": "Bearer {}".format(self.user_token)}  # Not using default headers as files are sent
-        with open(filepath, "rb") as f:
-            return self.webcaller.call_rest("post", endpoint, files={"file": f}, headers=headers)
+        body = MultipartFileStream(filepath, "file", chunk_size, progress_callback)
+        headers = {
+            "Authorization": "Bearer {}".format(self.user_token),  # Not using default headers as files are sent
+            "Content-Type": body.content_type,
+        }
+        return self.webcaller.call_rest("post", endpoint, data=body, headers=headers)
 
     # Wrap method to be pythonic
     # The uploaded files endpoint currently doesn't return JSON, thus this function doesn't attempt to cast to json.
-    def upload_file(self, filepath):
-        return self._upload_file(filepath)
+    def upload_file(self, filepath, progress_callback=None, chunk_size=1024 * 1024):
+        return self._upload_file(filepath, progress_callback, chunk_size)
 
     def _create_file(self, file_name):
         """
@@ -531,11 +1051,8 @@ class HumioClient(BaseHumioClient):
         """
 
         headers = self._default_user_headers
-        request = {
-            "query": "mutation($fileName : String!, $repo : String!){newFile(fileName: $fileName, name: $repo){nameAndPath { name, path}}}",
-            "variables": {"fileName": file_name, "repo": self.repository},
-        }
-        return self.webcaller.call_graphql(headers=headers, data=json.dumps(request))
+        request = GraphQL.CREATE_FILE.request({"fileName": file_name, "repo": self.repository})
+        return self.webcaller.call_graphql(headers=headers, data=self.serializer.dumps(request))
 
     def create_file(self, file_name):
         """
@@ -549,7 +1066,7 @@ class HumioClient(BaseHumioClient):
         """
 
         resp = self._create_file(file_name)
-        return resp.json()["data"]
+        return self.webcaller.parse_json(resp)["data"]
 
     def _list_files(self):
         """
@@ -560,14 +1077,10 @@ class HumioClient(BaseHumioClient):
         """
 
         headers = self._default_user_headers
-        request = {
-            "query": "query {{searchDomain(name: {}){{files {{nameAndPath {{path, name}} }} }} }}".format(
-                json.dumps(self.repository)
-            ),
-            "variables": None,
-        }
-        return self.webcaller.call_graphql(headers=headers, data=json.dumps(request))
+        request = GraphQL.LIST_FILES.request({"name": self.repository})
+        return self.webcaller.call_graphql(headers=headers, data=self.serializer.dumps(request))
 
+    @SingleFlight.coalesced
     def list_files(self):
         """
         List uploaded files on repository
@@ -577,7 +1090,7 @@ class HumioClient(BaseHumioClient):
         """
 
         resp = self._list_files()
-        return resp.json()["data"]["searchDomain"]["files"]
+        return self.webcaller.parse_json(resp)["data"]["searchDomain"]["files"]
 
     def _get_file_content(self, file_name, offset, limit, filter_string=None):
         """
@@ -601,25 +1114,13 @@ class HumioClient(BaseHumioClient):
 
         headers = self._default_user_headers
 
-        if filter_string is not None:
-            request = {
-                "query": "query {{"
-                            "getFileContent(name: {}, fileName: \"{}\", offset: {}, limit: {}, filterString: \"{}\") {{ "
-                                "totalLinesCount, limit, offset, headers, lines}} "
-                            "}}".format(json.dumps(self.repository), file_name, offset, limit, filter_string),
-                "variables": None,
-            }
-        else:
-            request = {
-                "query": "query {{"
-                            "getFileContent(name: {}, fileName: \"{}\", offset: {}, limit: {}) {{ "
-                                "totalLinesCount, limit, offset, headers, lines}} "
-                            "}}".format(json.dumps(self.repository), file_name, offset, limit),
-                "variables": None,
-            }
+        request = GraphQL.GET_FILE_CONTENT.request({
+            "name": self.repository, "fileName": file_name, "offset": offset, "limit": limit, "filterString": filter_string
+        })
 
-        return self.webcaller.call_graphql(headers=headers, data=json.dumps(request))
+        return self.webcaller.call_graphql(headers=headers, data=self.serializer.dumps(request))
 
+    @SingleFlight.coalesced
     def get_file_content(self, filename, offset=0, limit=200, filter_string=None):
         """
         Get the contents of a file
@@ -641,9 +1142,58 @@ class HumioClient(BaseHumioClient):
         """
 
         resp = self._get_file_content(filename, offset=offset, limit=limit, filter_string=filter_string)
-        return resp.json()["data"]
+        return self.webcaller.parse_json(resp)["data"]
+
+    def iter_file_content(self, file_name, page_size=10000, prefetch=4, filter_string=None):
+        """
+        Reads the contents of a file page by page, fetching the following pages concurrently while a page is consumed.
+        The pages are planned from the number of lines reported with the first page,
+        and at most prefetch pages are fetched ahead of the page being consumed, which bounds memory use.
+
+        :param file_name: Name of file.
+        :type file_name: string
+        :param page_size: Number of lines per page.
+        :type page_size: int, optional
+        :param prefetch: Number of pages fetched concurrently ahead of the page being consumed.
+        :type prefetch: int, optional
+        :param filter_string: Used to apply a filter string
+        :type filter_string: string, optional
+
+        :return: A generator that returns pages in order, as returned by get_file_content, with headers and lines
+        :rtype: Generator
+        """
+        def fetch(offset):
+            return self.get_file_content(file_name, offset=offset, limit=page_size, filter_string=filter_string)[
+                "getFileContent"
+            ]
 
-    def _get_file(self, file_name):
+        page = fetch(0)
+        yield page
+        if len(page["lines"]) < page_size:
+            return
+
+        offsets = iter(range(page_size, page["totalLinesCount"], page_size))
+        executor = ThreadPoolExecutor(max_workers=max(prefetch, 1))
+        pages = deque()
+        try:
+            for offset in offsets:
+                pages.append(executor.submit(fetch, offset))
+                if len(pages) >= prefetch:
+                    break
+            while pages:
+                page = pages.popleft().result()
+                offset = next(offsets, None)
+                if offset is not None:
+                    pages.append(executor.submit(fetch, offset))
+                yield page
+                if len(page["lines"]) < page_size:  # The file shrank since the first page was read
+                    return
+        finally:
+            for future in pages:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def _get_file(self, file_name, **kwargs):
         """
         Get specific file on repository
 
@@ -655,8 +1205,9 @@ class HumioClient(BaseHumioClient):
         """
         endpoint = "dataspaces/{}/files/{}".format(self.repository, file_name)
         headers = {"Authorization": "Bearer {}".format(self.user_token)}  # Not using default headers as files are sent
-        return self.webcaller.call_rest("get", endpoint, headers=headers)
+        return self.webcaller.call_rest("get", endpoint, headers=headers, **kwargs)
 
+    @SingleFlight.coalesced
     def get_file(self, file_name, encoding=None):
         """
         Get specific file on repository
@@ -674,6 +1225,57 @@ class HumioClient(BaseHumioClient):
         else:
             return raw_data.decode("utf-8")
 
+    def download_file(self, file_name, dest, chunk_size=1024 * 1024, checksum=None, hash_algorithm="sha256",
+                      progress_callback=None):
+        """
+        Download a file from the repository to disk, streaming it a chunk at a time,
+        so memory use does not grow with the size of the file.
+        The file is written next to its destination and only moved into place once fully downloaded and verified.
+
+        :param file_name: Name of file to download.
+        :type file_name: string
+        :param dest: Path to write the file to.
+        :type dest: string
+        :param chunk_size: Number of bytes read from the connection at a time.
+        :type chunk_size: int, optional
+        :param checksum: Expected hex digest of the file. A HumioChecksumException is raised if the file does not match.
+        :type checksum: string, optional
+        :param hash_algorithm: Name of the hashlib algorithm the digest is computed with.
+        :type hash_algorithm: string, optional
+        :param progress_callback: Called with the number of bytes received so far, and the size of the file if known.
+        :type progress_callback: Function, optional
+
+        :return: Hex digest of the downloaded file
+        :rtype: str
+        """
+        response = self._get_file(file_name, stream=True)
+        content_length = response.headers.get("Content-Length")
+        total = int(content_length) if content_length is not None else None
+        digest = hashlib.new(hash_algorithm)
+        received = 0
+
+        part = dest + ".part"
+        try:
+            with open(part, "wb") as f:
+                for chunk in WebStreamer(response).iter_chunks(chunk_size):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    received += len(chunk)
+                    if progress_callback is not None:
+                        progress_callback(received, total)
+            if checksum is not None and digest.hexdigest() != checksum.lower():
+                raise HumioChecksumException(
+                    "Checksum of {} is {}, expected {}".format(file_name, digest.hexdigest(), checksum)
+                )
+            os.replace(part, dest)
+        except BaseException:
+            if os.path.exists(part):
+                os.remove(part)
+            raise
+        finally:
+            response.close()
+        return digest.hexdigest()
+
     def _delete_file(self, file_name):
         """
         Delete an existing file.
@@ -686,11 +1288,8 @@ class HumioClient(BaseHumioClient):
         """
 
         headers = self._default_user_headers
-        request = {
-            "query": "mutation($fileName : String!, $repo : String!){removeFile(fileName: $fileName, name: $repo){ __typename}}",
-            "variables": {"fileName": file_name, "repo": self.repository},
-        }
-        return self.webcaller.call_graphql(headers=headers, data=json.dumps(request))
+        request = GraphQL.DELETE_FILE.request({"fileName": file_name, "repo": self.repository})
+        return self.webcaller.call_graphql(headers=headers, data=self.serializer.dumps(request))
 
     def delete_file(self, file_name):
         """
@@ -704,7 +1303,7 @@ class HumioClient(BaseHumioClient):
         """
 
         resp = self._delete_file(file_name)
-        return resp.json()["data"]
+        return self.webcaller.parse_json(resp)["data"]
 
     def _update_file_contents(self, file_name, file_headers, changed_rows, column_changes=[], offset=0, limit=200):
         """
@@ -733,14 +1332,11 @@ class HumioClient(BaseHumioClient):
         """
 
         headers = self._default_user_headers
-        request = {
-            "query": "mutation ($fileName: String!, $name: String!, $changedRows: [[String!]!]!, $headers: [String!]!, $columnChanges: [ColumnChange!]!, $limit: Int, $offset: Int) {updateFile(limit: $limit, offset: $offset, fileName: $fileName, name: $name, changedRows: $changedRows, headers: $headers, columnChanges: $columnChanges) {offset, limit, totalLinesCount, headers, lines, nameAndPath {name, path } } }",
-            "variables": {"name": self.repository, "fileName": file_name, "changedRows": changed_rows,
-                          "headers": file_headers,
-                          "columnChanges": column_changes, "offset": offset, "limit": limit}
-        }
+        request = GraphQL.UPDATE_FILE.request({"name": self.repository, "fileName": file_name, "changedRows": changed_rows,
+                                               "headers": file_headers,
+                                               "columnChanges": column_changes, "offset": offset, "limit": limit})
 
-        return self.webcaller.call_graphql(headers=headers, data=json.dumps(request))
+        return self.webcaller.call_graphql(headers=headers, data=self.serializer.dumps(request))
 
     def add_file_contents(self, file_name, file_headers, changed_rows, column_changes=[], offset=0, limit=200):
         """
@@ -769,7 +1365,7 @@ class HumioClient(BaseHumioClient):
         """
 
         resp = self._update_file_contents(file_name, file_headers, changed_rows, column_changes, offset, limit)
-        return resp.json()["data"]
+        return self.webcaller.parse_json(resp)["data"]
 
     def remove_file_contents(self, file_name, offset=0, limit=200):
         """
@@ -790,7 +1386,86 @@ class HumioClient(BaseHumioClient):
 
         resp = self._update_file_contents(file_name, file_headers=[], offset=offset, limit=limit, changed_rows=[],
                                           column_changes=[])
-        return resp.json()["data"]
+        return self.webcaller.parse_json(resp)["data"]
+
+    def _block_digest(self, rows):
+        """
+        :return: Digest identifying the content of a block of rows
+        :rtype: bytes
+        """
+        return hashlib.sha256(self.serializer.dumps(rows)).digest()
+
+    def sync_file(self, file_name, file_headers, local_rows, block_size=200, page_size=10000, concurrency=4):
+        """
+        Makes the content of a file equal to the given rows, sending only the blocks of rows that differ.
+        The remote content is paged through and hashed block by block, and compared with the hashes of the local blocks.
+        Blocks that differ are overwritten through several concurrent updates.
+        Only the last update can change the number of rows of the file, so the updates never shift the rows of one another.
+
+        :param file_name: Name of file
+        :type file_name: string
+        :param file_headers: Headers of the file. If they differ from the remote headers, every row is sent.
+        :type file_headers: list
+        :param local_rows: Desired rows of the file
+        :type local_rows: list(list)
+        :param block_size: Number of rows hashed, compared and sent together
+        :type block_size: int, optional
+        :param page_size: Number of rows of remote content fetched per request, rounded up to whole blocks
+        :type page_size: int, optional
+        :param concurrency: Number of updates in flight at a time
+        :type concurrency: int, optional
+
+        :return: Number of blocks compared, number of blocks sent and number of rows sent
+        :rtype: dict
+        """
+        page_size = -(-page_size // block_size) * block_size
+        remote_digests = []
+        remote_rows = 0
+        remote_headers = None
+        for page in self.iter_file_content(file_name, page_size=page_size):
+            if remote_headers is None:
+                remote_headers = page["headers"]
+            lines = page["lines"]
+            remote_rows += len(lines)
+            for start in range(0, len(lines), block_size):
+                remote_digests.append(self._block_digest(lines[start:start + block_size]))
+
+        rewrite = list(remote_headers or []) != list(file_headers)
+        full_blocks = min(len(local_rows), remote_rows) // block_size
+        windows = []
+        for index in range(full_blocks):
+            start = index * block_size
+            block = local_rows[start:start + block_size]
+            if rewrite or self._block_digest(block) != remote_digests[index]:
+                windows.append((block, start, block_size))
+
+        # Rows beyond the last full block of both sides are replaced in one go, which may change the number of rows
+        tail = full_blocks * block_size
+        has_tail = tail < len(local_rows) or tail < remote_rows
+        # With as many rows on both sides, the tail is a single partial block, hashed like any other block
+        unchanged_tail = (
+            has_tail and not rewrite and len(local_rows) == remote_rows
+            and self._block_digest(local_rows[tail:]) == remote_digests[full_blocks]
+        )
+        if has_tail and not unchanged_tail:
+            windows.append((local_rows[tail:], tail, remote_rows - tail))
+        if rewrite and not windows:
+            # Neither side has rows, so only the headers are sent
+            windows.append(([], 0, 0))
+
+        with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+            futures = [
+                executor.submit(self._update_file_contents, file_name, file_headers, rows, [], offset, limit)
+                for rows, offset, limit in windows
+            ]
+            for future in futures:
+                future.result()
+
+        return {
+            "blocks": full_blocks + has_tail,
+            "changed_blocks": len(windows),
+            "rows_sent": sum(len(rows) for rows, _, _ in windows),
+        }
 
     def _create_saved_query(self, query_name, query_string):
         """
@@ -807,11 +1482,10 @@ class HumioClient(BaseHumioClient):
         """
 
         headers = self._default_user_headers
-        request = {
-            "query": "mutation($input : CreateSavedQueryInput!){createSavedQuery(input: $input){savedQuery{id, name}}}",
-            "variables": {"input": {"name": query_name, "viewName": self.repository, "queryString": query_string}},
-        }
-        return self.webcaller.call_graphql(headers=headers, data=json.dumps(request))
+        request = GraphQL.CREATE_SAVED_QUERY.request(
+            {"input": {"name": query_name, "viewName": self.repository, "queryString": query_string}}
+        )
+        return self.webcaller.call_graphql(headers=headers, data=self.serializer.dumps(request))
 
     def create_saved_query(self, query_name, query_string):
         """
@@ -828,7 +1502,7 @@ class HumioClient(BaseHumioClient):
         """
 
         resp = self._create_saved_query(query_name, query_string)
-        return resp.json()["data"]
+        return self.webcaller.parse_json(resp)["data"]
 
     def _list_saved_queries(self):
         """
@@ -839,14 +1513,10 @@ class HumioClient(BaseHumioClient):
         """
 
         headers = self._default_user_headers
-        request = {
-            "query": "query {{repository(name: {}){{savedQueries {{ id, name, displayName, query {{queryString}} }} }} }}".format(
-                json.dumps(self.repository)
-            ),
-            "variables": None,
-        }
-        return self.webcaller.call_graphql(headers=headers, data=json.dumps(request))
+        request = GraphQL.LIST_SAVED_QUERIES.request({"name": self.repository})
+        return self.webcaller.call_graphql(headers=headers, data=self.serializer.dumps(request))
 
+    @SingleFlight.coalesced
     def list_saved_queries(self):
         """
         List saved queries on repository
@@ -856,7 +1526,7 @@ class HumioClient(BaseHumioClient):
         """
 
         resp = self._list_saved_queries()
-        return resp.json()["data"]["repository"]["savedQueries"]
+        return self.webcaller.parse_json(resp)["data"]["repository"]["savedQueries"]
 
     def _update_saved_query(self, query_id, updated_query_name,  updated_query_string):
         """
@@ -876,11 +1546,10 @@ class HumioClient(BaseHumioClient):
         """
 
         headers = self._default_user_headers
-        request = {
-            "query": "mutation($input : UpdateSavedQueryInput!){updateSavedQuery(input: $input){savedQuery{id, name}}}",
-            "variables": {"input": {"id": query_id, "name": updated_query_name, "viewName": self.repository, "queryString": updated_query_string}},
-        }
-        return self.webcaller.call_graphql(headers=headers, data=json.dumps(request))
+        request = GraphQL.UPDATE_SAVED_QUERY.request(
+            {"input": {"id": query_id, "name": updated_query_name, "viewName": self.repository, "queryString": updated_query_string}}
+        )
+        return self.webcaller.call_graphql(headers=headers, data=self.serializer.dumps(request))
 
     def update_saved_query(self, query_id, updated_query_name,  updated_query_string):
         """
@@ -900,7 +1569,7 @@ class HumioClient(BaseHumioClient):
         """
 
         resp = self._update_saved_query(query_id, updated_query_name, updated_query_string)
-        return resp.json()["data"]
+        return self.webcaller.parse_json(resp)["data"]
 
     def _delete_saved_query(self, query_id):
         """
@@ -914,11 +1583,8 @@ class HumioClient(BaseHumioClient):
         """
 
         headers = self._default_user_headers
-        request = {
-            "query": "mutation($input : DeleteSavedQueryInput!){deleteSavedQuery(input: $input){savedQuery{id, name}}}",
-            "variables": {"input": {"id": query_id, "viewName": self.repository}},
-        }
-        return self.webcaller.call_graphql(headers=headers, data=json.dumps(request))
+        request = GraphQL.DELETE_SAVED_QUERY.request({"input": {"id": query_id, "viewName": self.repository}})
+        return self.webcaller.call_graphql(headers=headers, data=self.serializer.dumps(request))
 
     def delete_saved_query(self, query_id):
         """
@@ -932,7 +1598,144 @@ class HumioClient(BaseHumioClient):
         """
 
         resp = self._delete_saved_query(query_id)
-        return resp.json()["data"]
+        return self.webcaller.parse_json(resp)["data"]
+
+    # bulk operations
+    def _execute_bulk(self, operations, concurrency, batch_size):
+        """
+        Performs many GraphQL operations, sending batches of them concurrently.
+        A failing operation or request does not stop the others, and is reported in its result.
+
+        :param operations: Operations and their variables.
+        :type operations: list(tuple(GraphQLOperation, dict))
+        :param concurrency: Number of requests in flight at a time.
+        :type concurrency: int
+        :param batch_size: Number of operations per request.
+        :type batch_size: int
+
+        :return: Results in the order of the operations
+        :rtype: list(GraphQLResult)
+        """
+        def execute(chunk):
+            batch = self.graphql_batch(max_batch_size=batch_size)
+            for operation, variables in chunk:
+                batch.add(operation, variables)
+            try:
+                return batch.execute()
+            except Exception as e:
+                return [GraphQLResult(None, [], e) for _ in chunk]
+
+        chunks = [operations[i:i + batch_size] for i in range(0, len(operations), batch_size)]
+        with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+            return [result for results in executor.map(execute, chunks) for result in results]
+
+    def create_saved_queries(self, saved_queries, concurrency=4, batch_size=50):
+        """
+        Create many saved queries in the current repository.
+
+        :param saved_queries: Names and query strings of the saved queries, such as the items of a dict
+        :type saved_queries: Iterable(tuple(str, str))
+        :param concurrency: Number of requests in flight at a time
+        :type concurrency: int, optional
+        :param batch_size: Number of saved queries created per request
+        :type batch_size: int, optional
+
+        :return: Result per saved query, in the given order
+        :rtype: list(GraphQLResult)
+        """
+        operations = [
+            (GraphQL.CREATE_SAVED_QUERY,
+             {"input": {"name": name, "viewName": self.repository, "queryString": query_string}})
+            for name, query_string in saved_queries
+        ]
+        return self._execute_bulk(operations, concurrency, batch_size)
+
+    def apply_saved_queries(self, desired_state, delete_missing=False, concurrency=4, batch_size=50):
+        """
+        Make the saved queries of the current repository match a desired state.
+        Saved queries are matched by name. Missing ones are created, and those with a different query string updated.
+
+        :param desired_state: Query string of every saved query, by name
+        :type desired_state: dict(str->str)
+        :param delete_missing: Whether saved queries not in the desired state are deleted
+        :type delete_missing: bool, optional
+        :param concurrency: Number of requests in flight at a time
+        :type concurrency: int, optional
+        :param batch_size: Number of saved queries changed per request
+        :type batch_size: int, optional
+
+        :return: Results of the created, updated and deleted saved queries by name, and names of unchanged saved queries
+        :rtype: dict
+        """
+        existing = {saved_query["name"]: saved_query for saved_query in self.list_saved_queries()}
+
+        changes = []
+        unchanged = []
+        for name, query_string in desired_state.items():
+            saved_query = existing.get(name)
+            if saved_query is None:
+                changes.append(("created", name, GraphQL.CREATE_SAVED_QUERY, {
+                    "input": {"name": name, "viewName": self.repository, "queryString": query_string}
+                }))
+            elif (saved_query.get("query") or {}).get("queryString") != query_string:
+                changes.append(("updated", name, GraphQL.UPDATE_SAVED_QUERY, {
+                    "input": {"id": saved_query["id"], "name": name, "viewName": self.repository,
+                              "queryString": query_string}
+                }))
+            else:
+                unchanged.append(name)
+        if delete_missing:
+            for name, saved_query in existing.items():
+                if name not in desired_state:
+                    changes.append(("deleted", name, GraphQL.DELETE_SAVED_QUERY, {
+                        "input": {"id": saved_query["id"], "viewName": self.repository}
+                    }))
+
+        results = self._execute_bulk(
+            [(operation, variables) for _, _, operation, variables in changes], concurrency, batch_size
+        )
+        report = {"created": {}, "updated": {}, "deleted": {}, "unchanged": unchanged}
+        for (change, name, _, _), result in zip(changes, results):
+            report[change][name] = result
+        return report
+
+    def create_files(self, file_names, concurrency=4, batch_size=50):
+        """
+        Create many files.
+
+        :param file_names: Names of files
+        :type file_names: Iterable(str)
+        :param concurrency: Number of requests in flight at a time
+        :type concurrency: int, optional
+        :param batch_size: Number of files created per request
+        :type batch_size: int, optional
+
+        :return: Result per file, in the given order
+        :rtype: list(GraphQLResult)
+        """
+        operations = [
+            (GraphQL.CREATE_FILE, {"fileName": file_name, "repo": self.repository}) for file_name in file_names
+        ]
+        return self._execute_bulk(operations, concurrency, batch_size)
+
+    def delete_files(self, file_names, concurrency=4, batch_size=50):
+        """
+        Delete many files.
+
+        :param file_names: Names of files
+        :type file_names: Iterable(str)
+        :param concurrency: Number of requests in flight at a time
+        :type concurrency: int, optional
+        :param batch_size: Number of files deleted per request
+        :type batch_size: int, optional
+
+        :return: Result per file, in the given order
+        :rtype: list(GraphQLResult)
+        """
+        operations = [
+            (GraphQL.DELETE_FILE, {"fileName": file_name, "repo": self.repository}) for file_name in file_names
+        ]
+        return self._execute_bulk(operations, concurrency, batch_size)
 
 class HumioIngestClient(BaseHumioClient):
     """
@@ -943,16 +1746,27 @@ class HumioIngestClient(BaseHumioClient):
         self,
         ingest_token,
         base_url="http://localhost:3000",
+        webcaller=None,
+        compression=None,
+        compression_threshold=1024,
+        serializer=None,
     ):
         """
         :param ingest_token: Ingest token to access ingest.
         :type ingest_token: string
         :param base_url: Url of Humio instance.
         :type base_url: string
-        """
-        super().__init__(base_url)
+        :param webcaller: WebCaller to make requests through, allows several clients to share one connection pool
+        :type webcaller: WebCaller, optional
+        :param compression: Compression of ingest request bodies, either "gzip" or "zstd". Disabled when None.
+        :type compression: str, optional
+        :param compression_threshold: Size in bytes below which ingest request bodies are sent uncompressed.
+        :type compression_threshold: int, optional
+        :param serializer: Serializer used for request and response bodies, when no webcaller is given.
+        :type serializer: JsonSerializer, optional
+        """
+        super().__init__(base_url, webcaller, compression, compression_threshold, serializer)
         self.ingest_token = ingest_token
-        self.webcaller = WebCaller(self.base_url)
 
     @property
     def _default_ingest_headers(self):
@@ -973,12 +1787,12 @@ class HumioIngestClient(BaseHumioClient):
         :rtype: dict
         """
 
-        return json.dumps(
+        return self.serializer.dumps(
             {
                 "base_url": self.base_url,
                 "ingest_token": self.ingest_token,
             }
-        )
+        ).decode("utf-8")
 
     def _ingest_json_data(self, json_elements=None, **kwargs):
         """
@@ -1001,7 +1815,7 @@ class HumioIngestClient(BaseHumioClient):
         endpoint = "ingest/humio-structured"
 
         return self.webcaller.call_rest(
-            "post", endpoint, data=json.dumps(json_elements), headers=headers, **kwargs
+            "post", endpoint, data=self._encode_ingest_body(json_elements, headers), headers=headers, retry=True, **kwargs
         )
 
     # Wrap method to be pythonic
@@ -1030,16 +1844,45 @@ class HumioIngestClient(BaseHumioClient):
         if messages is None:
             messages = []
 
-        headers = self._default_ingest_headers
-        headers.update(kwargs.pop("headers", {}))
-
-        endpoint = "ingest/humio-unstructured"
-
         obj = self._create_unstructured_data_object(
             messages, parser=parser, fields=fields, tags=tags
         )
 
-        return self.webcaller.call_rest("post", endpoint, data=json.dumps([obj]), headers=headers)
+        return self._ingest_unstructured_data([obj], **kwargs)
 
     # Wrap method to be pythonic
     ingest_messages = WebCaller.response_as_json(_ingest_messages)
+
+    def _ingest_unstructured_data(self, data_objects, **kwargs):
+        """
+        Ingest a list of unstructured data objects in a single request.
+        Each object holds messages sharing the same parser, fields and tags.
+
+        :param data_objects: Objects created by _create_unstructured_data_object.
+        :type data_objects: list(dict)
+
+        :return: Response to web request
+        :rtype: Response Object
+        """
+
+        return self._post_ingest_body("ingest/humio-unstructured", self.serializer.dumps(data_objects), **kwargs)
+
+    def _post_ingest_body(self, endpoint, body, **kwargs):
+        """
+        Post an already serialized ingest payload, compressing it on the way if compression is enabled.
+
+        :param endpoint: Ingest endpoint, either "ingest/humio-structured" or "ingest/humio-unstructured".
+        :type endpoint: str
+        :param body: Serialized ingest payload.
+        :type body: bytes
+
+        :return: Response to web request
+        :rtype: Response Object
+        """
+
+        headers = self._default_ingest_headers
+        headers.update(kwargs.pop("headers", {}))
+
+        return self.webcaller.call_rest(
+            "post", endpoint, data=self._compress_ingest_body(body, headers), headers=headers, retry=True, **kwargs
+        )
@@ -19,4 +19,7 @@ class HumioQueryJobExhaustedException(HumioException):
    pass
 
 class HumioQueryJobExpiredException(HumioException):
+   pass
+
+class HumioChecksumException(HumioException):
    pass
\ No newline at end of file
@@ -0,0 +1,211 @@
+import logging
+import queue
+import threading
+from humiolib.BatchingQueue import BatchingQueue
+from humiolib.HumioClient import HumioIngestClient
+
+# Attributes every LogRecord has, anything else on a record was passed through the extra argument of a log call
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class HumioLoggingHandler(logging.Handler):
+    """
+    A logging handler shipping log records to Humio as structured events.
+
+    Logging calls only put the record on a bounded queue, and never wait on the network.
+    Records are turned into events and sent in batches from a background thread.
+    As a consequence, a record's message is formatted on that thread,
+    so mutable objects passed as arguments to a log call should not be changed after the call.
+    """
+
+    def __init__(
+        self,
+        ingest_token=None,
+        base_url="http://localhost:3000",
+        tags=None,
+        level=logging.NOTSET,
+        client=None,
+        max_batch_size=500,
+        max_linger=1.0,
+        queue_size=10000,
+        block=False,
+        timeout=None,
+        error_callback=None,
+    ):
+        """
+        :param ingest_token: Ingest token to access ingest, when no client is given.
+        :type ingest_token: string, optional
+        :param base_url: Url of Humio instance, when no client is given.
+        :type base_url: string, optional
+        :param tags: Tags to associate with all records.
+        :type tags: dict(string->string), optional
+        :param level: Minimum level of records handled.
+        :type level: int, optional
+        :param client: Client to ingest through. The handler creates and owns a client when None.
+        :type client: HumioIngestClient, optional
+        :param max_batch_size: Maximum number of records sent in one request.
+        :type max_batch_size: int, optional
+        :param max_linger: Maximum number of seconds a record is buffered before it is sent.
+        :type max_linger: float, optional
+        :param queue_size: Maximum number of records waiting to be sent.
+        :type queue_size: int, optional
+        :param block: Whether logging calls wait for room when the queue is full, rather than dropping the record.
+        :type block: bool, optional
+        :param timeout: Maximum number of seconds a blocking logging call waits, before the record is dropped.
+        :type timeout: float, optional
+        :param error_callback: Called with the raised exception and the number of lost records, when a batch fails to be sent.
+        :type error_callback: Function, optional
+        """
+        super().__init__(level)
+        if client is None:
+            if ingest_token is None:
+                raise ValueError("Either an ingest token or a client must be given")
+            client = HumioIngestClient(ingest_token, base_url)
+            self._owns_client = True
+        else:
+            self._owns_client = False
+        self.client = client
+        self.tags = tags
+        self.max_batch_size = max_batch_size
+        self.max_linger = max_linger
+        self.block = block
+        self.timeout = timeout
+        self.error_callback = error_callback
+        self.sent_records = 0
+        self.dropped_records = 0
+        self._closed = False
+        self._counter_lock = threading.Lock()
+        self._queue = BatchingQueue(
+            queue_size,
+            max_linger,
+            new_batch=list,
+            add=list.append,
+            is_full=lambda records: len(records) >= self.max_batch_size,
+            submit=self._send,
+            drop=self._drop,
+            name="humiolib-logging-handler",
+            wake_size=max_batch_size,
+        )
+        self._sender = self._queue.thread.ident
+
+    def handle(self, record):
+        """
+        Enqueue a record, if it passes the filters of the handler.
+        Unlike logging.Handler.handle, no lock is taken, as the queue is thread safe on its own.
+
+        :param record: Record to ship.
+        :type record: logging.LogRecord
+
+        :return: Whether the record passed the filters
+        :rtype: bool
+        """
+        if not self.filter(record):
+            return False
+        # Logging done while sending would feed back into the handler.
+        # The thread of a record is only missing when logging.logThreads is turned off.
+        thread = record.thread if record.thread is not None else threading.get_ident()
+        if thread == self._sender:
+            return True
+        self.emit(record)
+        return True
+
+    def emit(self, record):
+        """
+        Put a record on the queue, dropping it if the queue is full and the handler does not block,
+        or if the handler has been closed
+
+        :param record: Record to ship.
+        :type record: logging.LogRecord
+        """
+        if self._closed:
+            with self._counter_lock:
+                self.dropped_records += 1
+            return
+        try:
+            self._queue.put(record, self.block, self.timeout)
+        except queue.Full:
+            with self._counter_lock:
+                self.dropped_records += 1
+
+    def flush(self):
+        """
+        Block until all records handled so far have been sent to Humio
+        """
+        if self._closed or not self._queue.thread.is_alive():
+            return
+        self._queue.flush()
+
+    def close(self):
+        """
+        Send all queued records and stop the background thread
+        """
+        if not self._closed:
+            self.flush()
+            self._closed = True
+            self._queue.close()
+            if self._owns_client:
+                self.client.close()
+        super().close()
+
+    def _send(self, records):
+        """
+        Sends a batch of records as a single structured ingest request
+        """
+        if not records:
+            return
+        try:
+            data = {"events": [self.to_event(record) for record in records]}
+            if self.tags:
+                data["tags"] = self.tags
+            self.client._ingest_json_data([data])
+            with self._counter_lock:
+                self.sent_records += len(records)
+        except Exception as e:  # The background thread must survive failing requests and faulty formatters alike
+            self._drop(e, len(records))
+        finally:
+            self._queue.task_done(len(records))
+
+    def _drop(self, e, count):
+        """
+        Counts lost records and reports them to the error callback
+        """
+        with self._counter_lock:
+            self.dropped_records += count
+        if self.error_callback is not None:
+            self.error_callback(e, count)
+
+    def to_event(self, record):
+        """
+        Turns a log record into a structured Humio event.
+        Fields passed through the extra argument of the log call are added to the attributes of the event.
+        If the handler has a formatter, the formatted record is sent as the rawstring of the event.
+
+        :param record: Record to convert.
+        :type record: logging.LogRecord
+
+        :return: Event in the shape expected by Humio's structured ingest endpoint
+        :rtype: dict
+        """
+        try:
+            message = record.getMessage()
+        except (TypeError, ValueError):  # Arguments not matching the format string should not lose the record
+            message = str(record.msg)
+        attributes = {
+            "level": record.levelname,
+            "logger": record.name,
+            "message": message,
+            "thread": record.threadName,
+            "module": record.module,
+            "function": record.funcName,
+            "line": record.lineno,
+        }
+        if record.exc_info:
+            attributes["exception"] = logging.Formatter().formatException(record.exc_info)
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                attributes[key] = value if isinstance(value, (str, int, float, bool)) or value is None else str(value)
+
+        event = {"timestamp": int(record.created * 1000), "attributes": attributes}
+        if self.formatter is not None:
+            event["rawstring"] = self.formatter.format(record)
+        return event
@@ -0,0 +1,425 @@
+import os
+import struct
+import threading
+import time
+import zlib
+from humiolib.HumioExceptions import HumioHTTPException
+
+_SEGMENT_SUFFIX = ".spool"
+_ACK_SUFFIX = ".ack"
+_DEAD_LETTER = "dead-letter" + _SEGMENT_SUFFIX
+
+# Every record is prefixed with the length of its payload, a CRC32 of the payload and a flags byte
+_HEADER = struct.Struct(">IIB")
+_ENDPOINT_LENGTH = struct.Struct(">H")
+_OFFSET = struct.Struct(">Q")
+_FLAG_ZLIB = 0x01
+
+
+class IngestSpool():
+    """
+    Persists ingest requests that could not be sent to Humio in segment files on local disk,
+    and replays them in the order they were spooled once Humio can be reached again.
+
+    A segment file is a sequence of records, each holding the ingest endpoint and the serialized request body.
+    Records are prefixed with their length and a checksum, so a record torn by a crash is detected and discarded on replay.
+    How far a segment has been replayed is committed to a small file next to it,
+    which is replaced atomically, so that a restart resumes from the last record known to be sent.
+
+    When the spool outgrows its size cap, the oldest segments are evicted first.
+    Requests that Humio rejects as invalid would be rejected on every replay, so rather than blocking the requests behind them,
+    they are moved to a dead-letter file in the same directory, which uses the record format of the segments.
+    The dead-letter file does not count towards the size cap and is never evicted,
+    so it grows until it is read through dead_letters and removed.
+    """
+
+    def __init__(self, directory, max_bytes=1024 * 1024 * 1024, segment_bytes=16 * 1024 * 1024, compress=True, fsync=False):
+        """
+        :param directory: Directory holding the segment files, created if it does not exist.
+        :type directory: str
+        :param max_bytes: Maximum number of bytes kept on disk, the oldest segments are evicted beyond this.
+        :type max_bytes: int, optional
+        :param segment_bytes: Size in bytes at which a new segment file is started.
+        :type segment_bytes: int, optional
+        :param compress: Whether records are compressed with zlib, which is skipped for records it does not shrink.
+        :type compress: bool, optional
+        :param fsync: Whether every record is flushed to stable storage before it is acknowledged as spooled.
+        :type fsync: bool, optional
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.compress = compress
+        self.fsync = fsync
+        self.spooled_records = 0
+        self.replayed_records = 0
+        self.evicted_bytes = 0
+        self.corrupt_bytes = 0
+        self.dead_letter_records = 0
+        self._lock = threading.Lock()
+        self._drainer = None
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+
+        os.makedirs(directory, exist_ok=True)
+        self._segments = self._recover()
+        self._size = sum(self._segment_size(sequence) for sequence in self._segments)
+        self._next_sequence = self._segments[-1] + 1 if self._segments else 0
+        self._active = None
+        self._active_sequence = None
+
+    @property
+    def dead_letter_path(self):
+        """
+        Path of the file holding requests rejected by Humio.
+        The file is not bounded by max_bytes, and is left for the user to remove once its requests have been dealt with.
+
+        :return: Path of the dead-letter file
+        :rtype: str
+        """
+        return os.path.join(self.directory, _DEAD_LETTER)
+
+    def _path(self, sequence, suffix=_SEGMENT_SUFFIX):
+        return os.path.join(self.directory, "{:012d}{}".format(sequence, suffix))
+
+    def _segment_size(self, sequence):
+        try:
+            return os.path.getsize(self._path(sequence))
+        except OSError:
+            return 0
+
+    def _recover(self):
+        """
+        Finds the segments left behind by an earlier run, removing temporary and orphaned files.
+        Segments are never appended to after a restart, so a torn tail only affects the replay of that one segment.
+
+        :return: Sequence numbers of the segments in the order they were written
+        :rtype: list(int)
+        """
+        segments = []
+        acks = set()
+        for name in os.listdir(self.directory):
+            stem, suffix = os.path.splitext(name)
+            if not stem.isdigit():
+                continue
+            if suffix == _SEGMENT_SUFFIX:
+                segments.append(int(stem))
+            elif suffix == _ACK_SUFFIX:
+                acks.add(int(stem))
+            elif suffix == ".tmp":
+                os.remove(os.path.join(self.directory, name))
+
+        for sequence in acks.difference(segments):
+            os.remove(self._path(sequence, _ACK_SUFFIX))
+        return sorted(segments)
+
+    @property
+    def size(self):
+        """
+        :return: Number of bytes held in segment files
+        :rtype: int
+        """
+        with self._lock:
+            return self._size
+
+    def __len__(self):
+        """
+        :return: Number of segment files waiting to be replayed
+        :rtype: int
+        """
+        with self._lock:
+            return len(self._segments)
+
+    def append(self, endpoint, body):
+        """
+        Spool an ingest request
+
+        :param endpoint: Ingest endpoint the request is posted to.
+        :type endpoint: str
+        :param body: Serialized, uncompressed request body.
+        :type body: bytes
+        """
+        record = self._encode_record(endpoint, body)
+        with self._lock:
+            if self._active is None or self._active.tell() + len(record) > self.segment_bytes:
+                self._rotate()
+            self._active.write(record)
+            self._active.flush()
+            if self.fsync:
+                os.fsync(self._active.fileno())
+            self._size += len(record)
+            self.spooled_records += 1
+            self._evict()
+        self._wakeup.set()
+
+    def _encode_record(self, endpoint, body):
+        endpoint = endpoint.encode("utf-8")
+        payload = _ENDPOINT_LENGTH.pack(len(endpoint)) + endpoint + body
+        flags = 0
+        if self.compress:
+            compressed = zlib.compress(payload, 1)
+            if len(compressed) < len(payload):
+                payload, flags = compressed, _FLAG_ZLIB
+        return _HEADER.pack(len(payload), zlib.crc32(payload), flags) + payload
+
+    def _dead_letter(self, endpoint, body):
+        """
+        Appends a rejected request to the dead-letter file. Must be called with the lock held.
+        """
+        with open(self.dead_letter_path, "ab") as f:
+            f.write(self._encode_record(endpoint, body))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self.dead_letter_records += 1
+
+    def dead_letters(self):
+        """
+        Reads the requests moved to the dead-letter file, so that they can be inspected, fixed or sent again by hand
+
+        :return: A generator yielding the endpoint and body of every rejected request
+        :rtype: Generator
+        """
+        if not os.path.exists(self.dead_letter_path):
+            return
+        for endpoint, body, _ in self._read_file(self.dead_letter_path, 0):
+            yield endpoint, body
+
+    @staticmethod
+    def _is_rejected(e):
+        """
+        :return: Whether a request failed because Humio will never accept it, rather than because of a transient failure
+        :rtype: bool
+        """
+        return (
+            isinstance(e, HumioHTTPException) and e.status_code is not None
+            and 400 <= e.status_code < 500 and e.status_code not in (408, 429)
+        )
+
+    def _rotate(self):
+        """
+        Seals the active segment and starts a new one. Must be called with the lock held.
+        """
+        if self._active is not None:
+            self._active.close()
+        self._active_sequence = self._next_sequence
+        self._next_sequence += 1
+        self._active = open(self._path(self._active_sequence), "ab")
+        self._segments.append(self._active_sequence)
+
+    def _evict(self):
+        """
+        Removes the oldest segments until the spool fits its size cap, never evicting the segment being written.
+        Must be called with the lock held.
+        """
+        while self._size > self.max_bytes and len(self._segments) > 1:
+            sequence = self._segments.pop(0)
+            size = self._segment_size(sequence)
+            self._remove(sequence)
+            self._size -= size
+            self.evicted_bytes += size
+
+    def _remove(self, sequence):
+        for suffix in (_SEGMENT_SUFFIX, _ACK_SUFFIX):
+            try:
+                os.remove(self._path(sequence, suffix))
+            except FileNotFoundError:
+                pass
+
+    def _read_offset(self, sequence):
+        try:
+            with open(self._path(sequence, _ACK_SUFFIX), "rb") as f:
+                return _OFFSET.unpack(f.read(_OFFSET.size))[0]
+        except (OSError, struct.error):
+            return 0
+
+    def _commit_offset(self, sequence, offset):
+        """
+        Records how far a segment has been replayed, replacing the previous offset atomically
+        """
+        tmp = self._path(sequence, ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(_OFFSET.pack(offset))
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, self._path(sequence, _ACK_SUFFIX))
+
+    def _next_segment(self):
+        """
+        :return: Sequence number of the oldest segment, sealing the active segment if it is the only one left
+        :rtype: int
+        """
+        with self._lock:
+            if not self._segments:
+                return None
+            sequence = self._segments[0]
+            if sequence == self._active_sequence:
+                if self._active.tell() == 0:
+                    return None
+                self._active.close()
+                self._active = None
+                self._active_sequence = None
+            return sequence
+
+    def _read_records(self, sequence, offset):
+        """
+        Reads the records of a sealed segment, starting at an offset.
+        Reading stops at the first incomplete or corrupt record, which can only be the result of a crash while writing.
+
+        :return: A generator yielding the endpoint, body and end offset of every record
+        :rtype: Generator
+        """
+        return self._read_file(self._path(sequence), offset)
+
+    def _read_file(self, path, offset):
+        with open(path, "rb") as f:
+            f.seek(offset)
+            while True:
+                start = f.tell()
+                header = f.read(_HEADER.size)
+                if not header:
+                    return
+                if len(header) < _HEADER.size:
+                    break
+                length, checksum, flags = _HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    break
+                if flags & _FLAG_ZLIB:
+                    payload = zlib.decompress(payload)
+                (endpoint_length,) = _ENDPOINT_LENGTH.unpack_from(payload)
+                endpoint = payload[_ENDPOINT_LENGTH.size:_ENDPOINT_LENGTH.size + endpoint_length].decode("utf-8")
+                yield endpoint, payload[_ENDPOINT_LENGTH.size + endpoint_length:], f.tell()
+            with self._lock:
+                self.corrupt_bytes += os.fstat(f.fileno()).st_size - start
+
+    def replay(self, send, max_bytes_per_second=None, error_callback=None):
+        """
+        Replays spooled requests in the order they were spooled, until the spool is empty or a request fails.
+        Requests rejected by Humio with a client error are moved to the dead-letter file instead, and the replay continues.
+        A segment is deleted once all its records have been sent.
+
+        :param send: Function sending a request, given the endpoint and body. Raising stops the replay.
+        :type send: Function
+        :param max_bytes_per_second: Upper bound on the number of body bytes replayed per second.
+        :type max_bytes_per_second: int, optional
+        :param error_callback: Called with the raised exception, when a request is moved to the dead-letter file.
+        :type error_callback: Function, optional
+
+        :return: Number of requests replayed
+        :rtype: int
+        """
+        replayed = 0
+        replayed_bytes = 0
+        started = time.monotonic()
+        while not self._stop.is_set():
+            sequence = self._next_segment()
+            if sequence is None:
+                return replayed
+
+            records = self._read_records(sequence, self._read_offset(sequence))
+            try:
+                for endpoint, body, offset in records:
+                    if self._stop.is_set():
+                        return replayed
+                    rejection = None
+                    try:
+                        send(endpoint, body)
+                    except Exception as e:
+                        if not self._is_rejected(e):
+                            raise
+                        rejection = e
+                    with self._lock:
+                        if sequence not in self._segments:  # Evicted while being replayed
+                            break
+                        if rejection is not None:
+                            self._dead_letter(endpoint, body)
+                        self._commit_offset(sequence, offset)
+                        if rejection is None:
+                            self.replayed_records += 1
+                    if rejection is not None:
+                        if error_callback is not None:
+                            error_callback(rejection)
+                        continue
+                    replayed += 1
+
+                    if max_bytes_per_second:
+                        replayed_bytes += len(body)
+                        ahead = replayed_bytes / max_bytes_per_second - (time.monotonic() - started)
+                        if ahead > 0 and self._stop.wait(ahead):
+                            return replayed
+            except FileNotFoundError:  # Evicted before being opened
+                pass
+            finally:
+                records.close()
+
+            with self._lock:
+                if sequence in self._segments:
+                    self._segments.remove(sequence)
+                    self._size -= self._segment_size(sequence)
+                    self._remove(sequence)
+        return replayed
+
+    def start_drainer(self, send, max_bytes_per_second=None, retry_interval=5.0, error_callback=None):
+        """
+        Start a background thread replaying the spool whenever requests are spooled,
+        retrying at an interval while Humio cannot be reached.
+
+        :param send: Function sending a request, given the endpoint and body.
+        :type send: Function
+        :param max_bytes_per_second: Upper bound on the number of body bytes replayed per second.
+        :type max_bytes_per_second: int, optional
+        :param retry_interval: Seconds waited before replaying again after a request failed.
+        :type retry_interval: float, optional
+        :param error_callback: Called with the raised exception, when a replayed request fails or is moved to the dead-letter file.
+        :type error_callback: Function, optional
+        """
+        if self._drainer is not None:
+            raise RuntimeError("Drainer is already running")
+
+        def drain():
+            while not self._stop.is_set():
+                self._wakeup.clear()
+                try:
+                    self.replay(send, max_bytes_per_second, error_callback)
+                except Exception as e:
+                    if error_callback is not None:
+                        error_callback(e)
+                    self._stop.wait(retry_interval)
+                    continue
+                self._wakeup.wait(retry_interval)
+
+        self._stop.clear()
+        self._wakeup.set()
+        self._drainer = threading.Thread(target=drain, name="humiolib-spool-drainer", daemon=True)
+        self._drainer.start()
+
+    def stop_drainer(self):
+        """
+        Stop the background drainer, waiting for the request being replayed to finish
+        """
+        if self._drainer is None:
+            return
+        self._stop.set()
+        self._wakeup.set()
+        self._drainer.join()
+        self._drainer = None
+        self._stop.clear()
+
+    def close(self):
+        """
+        Stop the drainer and close the segment being written. Spooled requests are kept on disk for the next run.
+        """
+        self.stop_drainer()
+        with self._lock:
+            if self._active is not None:
+                self._active.close()
+                self._active = None
+                self._active_sequence = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,137 @@
+import json
+import re
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional, faster backend
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # ujson is an optional, faster backend
+    ujson = None
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+
+class JsonSerializer():
+    """
+    Encodes and decodes JSON with the fastest backend available.
+    orjson is preferred, then ujson, falling back to the json module of the standard library.
+
+    Backends differ in how they decode integers beyond 64 bits: orjson turns them into floats, losing precision,
+    where the json module keeps them as integers. Use the "json" backend if such integers must survive a round trip.
+    """
+    backends = ("orjson", "ujson", "json")
+
+    def __init__(self, backend=None):
+        """
+        :param backend: Name of backend to use, one of "orjson", "ujson" or "json". The fastest installed backend is used when None.
+        :type backend: str, optional
+        """
+        if backend is None:
+            backend = "orjson" if orjson is not None else "ujson" if ujson is not None else "json"
+        if backend not in self.backends:
+            raise ValueError("Unsupported JSON backend '{}', use one of {}".format(backend, self.backends))
+        if (backend == "orjson" and orjson is None) or (backend == "ujson" and ujson is None):
+            raise ValueError("JSON backend '{}' is not installed".format(backend))
+        self.backend = backend
+
+    def dumps(self, obj):
+        """
+        Encode a python object as a JSON document
+
+        :param obj: Object to encode.
+        :type obj: object
+
+        :return: UTF-8 encoded JSON document
+        :rtype: bytes
+        """
+        # The faster backends reject some objects the json module encodes, such as integers beyond 64 bits
+        # and strings holding lone surrogates, so those objects are encoded by the json module instead, as they always were.
+        # Its output is kept ASCII, escaping anything else, as lone surrogates cannot be encoded as UTF-8.
+        if self.backend == "orjson":
+            try:
+                return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+            except TypeError:
+                pass
+        elif self.backend == "ujson":
+            try:
+                return ujson.dumps(obj, ensure_ascii=False).encode("utf-8")
+            except (TypeError, OverflowError, UnicodeEncodeError):
+                pass
+        return json.dumps(obj).encode("utf-8")
+
+    def loads(self, data):
+        """
+        Decode a single JSON document.
+        With the orjson backend, integers beyond 64 bits are decoded as floats.
+
+        :param data: JSON document.
+        :type data: Union[bytes, str]
+
+        :return: Decoded python object
+        :rtype: object
+        """
+        if self.backend == "orjson":
+            return orjson.loads(data)
+        if self.backend == "ujson":
+            return ujson.loads(data)
+        return json.loads(data)
+
+    def loads_ndjson(self, data, end=None):
+        """
+        Decode newline delimited JSON documents.
+        Lines are parsed directly from the given buffer where the backend allows it,
+        rather than first being copied out into separate bytes objects.
+
+        :param data: Buffer holding newline delimited JSON.
+        :type data: Union[bytes, bytearray]
+        :param end: Index in the buffer at which parsing stops, the whole buffer is parsed when None.
+        :type end: int, optional
+
+        :return: Decoded python objects, one per non-empty line
+        :rtype: list
+        """
+        if end is None:
+            end = len(data)
+        if self.backend == "orjson":
+            return self._loads_ndjson_views(data, end)
+        if self.backend == "ujson":
+            return [ujson.loads(line) for line in data[:end].split(b"\n") if line.strip()]
+        return self._loads_ndjson_raw_decode(data, end)
+
+    @staticmethod
+    def _loads_ndjson_views(data, end):
+        """
+        Parses each line through a memoryview slice of the buffer, which orjson accepts without copying
+        """
+        events = []
+        with memoryview(data) as view:
+            start = 0
+            while start < end:
+                newline = data.find(b"\n", start, end)
+                if newline == -1:
+                    newline = end
+                if newline > start:
+                    events.append(orjson.loads(view[start:newline]))
+                start = newline + 1
+        return events
+
+    @staticmethod
+    def _loads_ndjson_raw_decode(data, end):
+        """
+        Decodes the buffer to text once and parses the documents one after another from that text,
+        as the standard library cannot parse from a slice of a buffer
+        """
+        with memoryview(data) as view:
+            text = str(view[:end], "utf-8")
+        events = []
+        index = _WHITESPACE.match(text, 0).end()
+        end = len(text)
+        while index < end:
+            event, index = _DECODER.raw_decode(text, index)
+            events.append(event)
+            index = _WHITESPACE.match(text, index).end()
+        return events
@@ -0,0 +1,66 @@
+import binascii
+import os
+
+
+class MultipartFileStream():
+    """
+    Request body uploading a file as multipart/form-data, read from disk a chunk at a time as it is sent.
+    The body has a known length, so it is sent with a Content-Length header rather than chunked,
+    and only a single chunk of the file is held in memory at any time.
+    """
+
+    def __init__(self, filepath, field_name="file", chunk_size=1024 * 1024, progress_callback=None):
+        """
+        :param filepath: Path to file.
+        :type filepath: str
+        :param field_name: Name of the form field holding the file.
+        :type field_name: str, optional
+        :param chunk_size: Number of bytes of the file read at a time.
+        :type chunk_size: int, optional
+        :param progress_callback: Called with the number of bytes of the file sent so far and the size of the file,
+        after every chunk.
+        :type progress_callback: Function, optional
+        """
+        self.filepath = filepath
+        self.chunk_size = chunk_size
+        self.progress_callback = progress_callback
+        self.file_size = os.path.getsize(filepath)
+        self.bytes_sent = 0
+
+        boundary = binascii.hexlify(os.urandom(16)).decode("ascii")
+        self.content_type = "multipart/form-data; boundary={}".format(boundary)
+        self._preamble = (
+            '--{}\r\nContent-Disposition: form-data; name="{}"; filename="{}"\r\n\r\n'.format(
+                boundary, field_name, os.path.basename(filepath)
+            ).encode("utf-8")
+        )
+        self._epilogue = "\r\n--{}--\r\n".format(boundary).encode("ascii")
+        self._parts = None
+
+    def __len__(self):
+        return len(self._preamble) + self.file_size + len(self._epilogue)
+
+    def __iter__(self):
+        yield self._preamble
+        with open(self.filepath, "rb") as f:
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                self.bytes_sent += len(chunk)
+                if self.progress_callback is not None:
+                    self.progress_callback(self.bytes_sent, self.file_size)
+                yield chunk
+        yield self._epilogue
+
+    def read(self, size=-1):
+        """
+        Reads the next part of the body, used by the http layer to send it.
+        At most one chunk of the file is returned per call, regardless of size.
+
+        :return: Next part of the body, empty once it has been fully read
+        :rtype: bytes
+        """
+        if self._parts is None:
+            self._parts = iter(self)
+        return next(self._parts, b"")
@@ -0,0 +1,184 @@
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from humiolib.HumioExceptions import HumioException
+
+_DONE = object()
+
+_TIME_UNITS = {
+    "ms": 1,
+    "millis": 1,
+    "s": 1000,
+    "sec": 1000,
+    "secs": 1000,
+    "second": 1000,
+    "seconds": 1000,
+    "m": 60 * 1000,
+    "min": 60 * 1000,
+    "mins": 60 * 1000,
+    "minute": 60 * 1000,
+    "minutes": 60 * 1000,
+    "h": 60 * 60 * 1000,
+    "hour": 60 * 60 * 1000,
+    "hours": 60 * 60 * 1000,
+    "d": 24 * 60 * 60 * 1000,
+    "day": 24 * 60 * 60 * 1000,
+    "days": 24 * 60 * 60 * 1000,
+    "w": 7 * 24 * 60 * 60 * 1000,
+    "week": 7 * 24 * 60 * 60 * 1000,
+    "weeks": 7 * 24 * 60 * 60 * 1000,
+    "y": 365 * 24 * 60 * 60 * 1000,
+    "year": 365 * 24 * 60 * 60 * 1000,
+    "years": 365 * 24 * 60 * 60 * 1000,
+}
+
+_RELATIVE_TIME = re.compile(r"^\s*(\d+)\s*([a-z]+)\s*$")
+
+
+def to_epoch_millis(value, now=None):
+    """
+    Converts a query time to milliseconds since epoch.
+
+    :param value: Milliseconds since epoch, "now", or a relative time such as "24hours" or "7d".
+    :type value: Union[int, str]
+    :param now: Time relative times are measured from, in milliseconds since epoch. Current time is used when None.
+    :type now: int, optional
+
+    :return: Milliseconds since epoch
+    :rtype: int
+    """
+    if now is None:
+        now = int(time.time() * 1000)
+    if isinstance(value, int):
+        return value
+    if value == "now":
+        return now
+
+    match = _RELATIVE_TIME.match(value.lower())
+    if match is None or match.group(2) not in _TIME_UNITS:
+        raise ValueError("Cannot interpret '{}' as a query time".format(value))
+    return now - int(match.group(1)) * _TIME_UNITS[match.group(2)]
+
+
+def split_time_range(start, end, slices):
+    """
+    Splits a time range into adjacent sub-ranges of equal length
+
+    :param start: Start of range in milliseconds since epoch, inclusive.
+    :type start: int
+    :param end: End of range in milliseconds since epoch, exclusive.
+    :type end: int
+    :param slices: Number of sub-ranges.
+    :type slices: int
+
+    :return: Sub-ranges in time order
+    :rtype: list(tuple(int, int))
+    """
+    if end <= start:
+        raise ValueError("End of time range must be after its start")
+    slices = max(1, min(slices, end - start))
+    boundaries = [start + (end - start) * i // slices for i in range(slices + 1)]
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+class ParallelQuery():
+    """
+    Runs one static queryjob per time slice on a pool of worker threads and merges their results.
+
+    Every slice buffers at most a bounded number of polled segments, so memory stays bounded
+    no matter how large the result is. When results are merged in time order, slices are emitted one after another,
+    while later slices are prefetched in the background.
+
+    Aggregates would be computed per slice, so a query found to be an aggregate raises,
+    before any of its results are returned.
+    """
+
+    def __init__(self, create_queryjob, time_ranges, workers=4, ordered=True, max_buffered_segments=16):
+        """
+        :param create_queryjob: Function creating a static queryjob for a time range, given start and end.
+        :type create_queryjob: Function
+        :param time_ranges: Time ranges to query, in time order.
+        :type time_ranges: list(tuple(int, int))
+        :param workers: Number of queryjobs polled concurrently.
+        :type workers: int, optional
+        :param ordered: Whether results are returned in the order of the time ranges.
+        :type ordered: bool, optional
+        :param max_buffered_segments: Maximum number of polled segments buffered per slice.
+        :type max_buffered_segments: int, optional
+        """
+        self.create_queryjob = create_queryjob
+        self.time_ranges = time_ranges
+        self.workers = workers
+        self.ordered = ordered
+        self.max_buffered_segments = max_buffered_segments
+        self._cancelled = threading.Event()
+
+    def __iter__(self):
+        if self.ordered:
+            queues = [queue.Queue(self.max_buffered_segments) for _ in self.time_ranges]
+        else:
+            shared = queue.Queue(self.max_buffered_segments * self.workers)
+            queues = [shared] * len(self.time_ranges)
+
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            for time_range, results in zip(self.time_ranges, queues):
+                executor.submit(self._run_slice, time_range, results)
+
+            if self.ordered:
+                for results in queues:
+                    yield from self._drain(results, 1)
+            else:
+                yield from self._drain(shared, len(self.time_ranges))
+        finally:
+            self._cancelled.set()
+            executor.shutdown(wait=True)
+
+    def _drain(self, results, slices):
+        """
+        Yields events from a queue until the given number of slices have finished
+        """
+        finished = 0
+        while finished < slices:
+            item = results.get()
+            if item is _DONE:
+                finished += 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield from item
+
+    def _run_slice(self, time_range, results):
+        """
+        Runs on a worker thread, polling the queryjob of a single time slice until it is done
+        """
+        if self._cancelled.is_set():
+            return
+        try:
+            queryjob = self.create_queryjob(*time_range)
+            for poll_result in queryjob.poll_until_done():
+                if poll_result.metadata.get("isAggregate"):
+                    raise HumioException("Aggregate queries cannot be split into time slices, run them as a single queryjob instead")
+                if poll_result.events and not self._put(results, poll_result.events):
+                    return
+        except Exception as e:
+            self._put(results, e)
+            return
+        self._put(results, _DONE)
+
+    def _put(self, results, item):
+        """
+        Puts an item on a result queue, giving up if the consumer has stopped reading results
+
+        :return: Whether the item was put on the queue
+        :rtype: bool
+        """
+        while not self._cancelled.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
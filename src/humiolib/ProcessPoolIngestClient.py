@@ -0,0 +1,340 @@
+import itertools
+import multiprocessing
+import os
+import threading
+from humiolib.HumioClient import HumioIngestClient
+from humiolib.HumioExceptions import HumioException
+from humiolib.JsonSerializer import JsonSerializer
+
+_MESSAGES = "messages"
+_EVENTS = "events"
+
+
+def _ingest_chunk(client, kind, chunk, options):
+    """
+    Turns a chunk of newline delimited bytes into an ingest request and sends it
+
+    :return: Number of events ingested
+    :rtype: int
+    """
+    if kind == _MESSAGES:
+        messages = [line for line in chunk.decode("utf-8").split("\n") if line]
+        if messages:
+            client._ingest_unstructured_data([
+                client._create_unstructured_data_object(messages, **options)
+            ])
+        return len(messages)
+
+    events = client.serializer.loads_ndjson(chunk)
+    if events:
+        data = {"events": events}
+        if options.get("tags"):
+            data["tags"] = options["tags"]
+        client._ingest_json_data([data])
+    return len(events)
+
+
+def _worker_main(connection, ingest_token, base_url, compression, compression_threshold, serializer_backend):
+    """
+    Entry point of a worker process.
+    Chunks are received and sent one at a time, so acknowledgements go back to the parent in the order chunks were handed off.
+    """
+    client = HumioIngestClient(
+        ingest_token,
+        base_url,
+        compression=compression,
+        compression_threshold=compression_threshold,
+        serializer=JsonSerializer(serializer_backend),
+    )
+    try:
+        while True:
+            header = connection.recv()
+            if header is None:
+                return
+            sequence, kind, options = header
+            chunk = connection.recv_bytes()
+            try:
+                result = (sequence, _ingest_chunk(client, kind, chunk, options), None)
+            except Exception as e:
+                # Exceptions are not sent as is, as not all of them can be pickled
+                result = (sequence, 0, "{}: {}".format(type(e).__name__, getattr(e, "message", e)))
+            connection.send(result)
+    finally:
+        client.close()
+
+
+class _Shard():
+    """
+    Parent side of a worker process, tracking chunks that have been handed off but not yet acknowledged
+    """
+    def __init__(self, index, max_in_flight):
+        self.index = index
+        self.connection = None
+        self.process = None
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+        self.sequence = itertools.count()
+        self.acknowledged = -1
+        self.handed_off = -1
+        self.pending = 0
+        self.send_lock = threading.Lock()
+        self.idle = threading.Condition()
+        self.receiver = None
+        self.exited = False
+
+
+class ProcessPoolIngestClient():
+    """
+    Ingests pre-chunked, newline delimited data through a pool of worker processes,
+    so that decoding, serialization and compression of request bodies scale with the number of cores.
+
+    Each worker holds its own pooled connection and serializer.
+    Chunks are handed to a worker as raw bytes over a pipe, and every worker acknowledges its chunks in order.
+    When a worker has too many unacknowledged chunks, handing it further chunks blocks, which applies backpressure to the caller.
+    If a worker process dies, its unacknowledged chunks are reported as failed, and a new worker is started for the next chunk.
+    """
+
+    def __init__(
+        self,
+        ingest_token,
+        base_url="http://localhost:3000",
+        processes=None,
+        max_in_flight=4,
+        compression=None,
+        compression_threshold=1024,
+        serializer_backend=None,
+        error_callback=None,
+        start_method="spawn",
+    ):
+        """
+        :param ingest_token: Ingest token to access ingest.
+        :type ingest_token: string
+        :param base_url: Url of Humio instance.
+        :type base_url: string
+        :param processes: Number of worker processes, defaults to the number of cores.
+        :type processes: int, optional
+        :param max_in_flight: Maximum number of unacknowledged chunks per worker.
+        :type max_in_flight: int, optional
+        :param compression: Compression of ingest request bodies, either "gzip" or "zstd". Disabled when None.
+        :type compression: str, optional
+        :param compression_threshold: Size in bytes below which ingest request bodies are sent uncompressed.
+        :type compression_threshold: int, optional
+        :param serializer_backend: JSON backend used by the workers, the fastest installed backend is used when None.
+        :type serializer_backend: str, optional
+        :param error_callback: Called with the exception, the shard and sequence number, when a chunk fails to be ingested.
+        :type error_callback: Function, optional
+        :param start_method: Multiprocessing start method of the worker processes.
+        :type start_method: str, optional
+        """
+        self.error_callback = error_callback
+        self.sent_events = 0
+        self.failed_chunks = 0
+        self.restarted_workers = 0
+        self._closed = False
+        self._counter_lock = threading.Lock()
+        self._round_robin = itertools.count()
+
+        if compression not in (None,) + HumioIngestClient.compression_algorithms:
+            raise ValueError("Unsupported compression '{}', use one of {}".format(
+                compression, HumioIngestClient.compression_algorithms))
+        JsonSerializer(serializer_backend)  # Fail early on a backend that is not installed
+
+        self._context = multiprocessing.get_context(start_method)
+        self._worker_args = (ingest_token, base_url, compression, compression_threshold, serializer_backend)
+        self._shards = []
+        for index in range(processes or os.cpu_count() or 1):
+            shard = _Shard(index, max_in_flight)
+            self._start_worker(shard)
+            self._shards.append(shard)
+
+    def _start_worker(self, shard):
+        """
+        Starts the worker process of a shard, and the thread receiving its acknowledgements
+        """
+        parent_connection, child_connection = self._context.Pipe()
+        shard.process = self._context.Process(
+            target=_worker_main,
+            args=(child_connection,) + self._worker_args,
+            name="humiolib-ingest-worker-{}".format(shard.index),
+            daemon=True,
+        )
+        shard.process.start()
+        child_connection.close()
+        shard.connection = parent_connection
+        shard.exited = False
+        shard.receiver = threading.Thread(
+            target=self._receive, args=(shard,), name="humiolib-ingest-acks-{}".format(shard.index), daemon=True
+        )
+        shard.receiver.start()
+
+    @property
+    def processes(self):
+        """
+        :return: Number of worker processes
+        :rtype: int
+        """
+        return len(self._shards)
+
+    def ingest_messages(self, chunk, parser=None, fields=None, tags=None, shard=None):
+        """
+        Hand off a chunk of unstructured messages, one message per line
+
+        :param chunk: Newline delimited messages.
+        :type chunk: bytes
+        :param parser:  Name of parser to use on messages.
+        :type parser: string, optional
+        :param fields:  Fields that should be added to events after parsing.
+        :type fields: dict(string->string), optional
+        :param tags:  Tags to associate with the messages.
+        :type tags: dict(string->string), optional
+        :param shard: Worker to ingest through, chunks are spread round robin when None.
+        :type shard: int, optional
+
+        :return: Shard and sequence number the chunk is acknowledged under
+        :rtype: tuple(int, int)
+        """
+        return self._hand_off(_MESSAGES, chunk, {"parser": parser, "fields": fields, "tags": tags}, shard)
+
+    def ingest_events(self, chunk, tags=None, shard=None):
+        """
+        Hand off a chunk of structured events, one JSON encoded event per line.
+        Structure of events is discussed in: https://docs.humio.com/reference/api/ingest/#structured-data
+
+        :param chunk: Newline delimited JSON events.
+        :type chunk: bytes
+        :param tags:  Tags to associate with the events.
+        :type tags: dict(string->string), optional
+        :param shard: Worker to ingest through, chunks are spread round robin when None.
+        :type shard: int, optional
+
+        :return: Shard and sequence number the chunk is acknowledged under
+        :rtype: tuple(int, int)
+        """
+        return self._hand_off(_EVENTS, chunk, {"tags": tags}, shard)
+
+    def acknowledged(self, shard):
+        """
+        :param shard: Index of worker.
+        :type shard: int
+
+        :return: Sequence number up to which all chunks handed to the worker have been processed, -1 if none have
+        :rtype: int
+        """
+        return self._shards[shard].acknowledged
+
+    def _hand_off(self, kind, chunk, options, shard):
+        if self._closed:
+            raise HumioException("Cannot ingest through a closed client")
+        if shard is None:
+            shard = next(self._round_robin) % len(self._shards)
+        shard = self._shards[shard]
+
+        shard.in_flight.acquire()
+        with shard.send_lock:
+            if shard.exited:
+                self._restart_worker(shard)
+            with shard.idle:
+                shard.pending += 1
+                sequence = next(shard.sequence)
+                shard.handed_off = sequence
+            try:
+                shard.connection.send((sequence, kind, options))
+                shard.connection.send_bytes(chunk)
+            except OSError:
+                # The worker died, its receiver reports the chunk as failed once it notices
+                pass
+        return shard.index, sequence
+
+    def _restart_worker(self, shard):
+        """
+        Replaces the dead worker process of a shard. Must be called with the send lock of the shard held.
+        """
+        shard.receiver.join()
+        shard.process.join()
+        shard.connection.close()
+        self._start_worker(shard)
+        with self._counter_lock:
+            self.restarted_workers += 1
+
+    def _receive(self, shard):
+        """
+        Runs on a thread per worker, receiving the worker's acknowledgements
+        """
+        while True:
+            try:
+                sequence, count, error = shard.connection.recv()
+            except (EOFError, OSError):
+                self._worker_exited(shard)
+                return
+
+            if error is None:
+                with self._counter_lock:
+                    self.sent_events += count
+            else:
+                with self._counter_lock:
+                    self.failed_chunks += 1
+                if self.error_callback is not None:
+                    self.error_callback(HumioException(error), shard.index, sequence)
+
+            with shard.idle:
+                shard.acknowledged = sequence
+                shard.pending -= 1
+                shard.idle.notify_all()
+            shard.in_flight.release()
+
+    def _worker_exited(self, shard):
+        """
+        Fails the chunks a worker had not acknowledged when it exited, releasing their permits
+        """
+        with shard.send_lock:
+            lost = range(shard.acknowledged + 1, shard.handed_off + 1)
+            shard.exited = True
+        if not lost:
+            return
+
+        shard.process.join()
+        with self._counter_lock:
+            self.failed_chunks += len(lost)
+        if self.error_callback is not None:
+            for sequence in lost:
+                self.error_callback(
+                    HumioException("Worker process exited with code {}".format(shard.process.exitcode)), shard.index, sequence
+                )
+        with shard.idle:
+            shard.acknowledged = lost[-1]
+            shard.pending -= len(lost)
+            shard.idle.notify_all()
+        for _ in lost:
+            shard.in_flight.release()
+
+    def flush(self):
+        """
+        Block until all chunks handed off so far have been acknowledged
+        """
+        for shard in self._shards:
+            with shard.idle:
+                shard.idle.wait_for(lambda: shard.pending == 0)
+
+    def close(self):
+        """
+        Wait for all chunks to be acknowledged and stop the worker processes
+        """
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        for shard in self._shards:
+            with shard.send_lock:
+                try:
+                    shard.connection.send(None)
+                except OSError:  # The worker already exited
+                    pass
+        for shard in self._shards:
+            shard.process.join()
+            shard.receiver.join()
+            shard.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,303 @@
+import abc
+import hashlib
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+_EXPIRY = struct.Struct(">d")
+_SUFFIX = ".cache"
+
+
+class CacheStats():
+    """
+    Counters describing how a query cache is used
+    """
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+
+    def record(self, counter, count=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + count)
+
+    def as_dict(self):
+        """
+        :return: Snapshot of the counters
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypasses": self.bypasses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class QueryCache(abc.ABC):
+    """
+    Base class for caches of query results.
+    Results are stored as serialized bytes, so every hit returns fresh objects, and sizes are known exactly.
+    """
+    def __init__(self, max_bytes, ttl):
+        """
+        :param max_bytes: Maximum number of bytes of results kept, least recently used results are evicted beyond this.
+        :type max_bytes: int
+        :param ttl: Number of seconds a result is kept.
+        :type ttl: float
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_cacheable(start, end, is_live):
+        """
+        Only static queries over an absolute time range give the same result every time they are run
+
+        :return: Whether results of a query can be cached
+        :rtype: bool
+        """
+        return not is_live and isinstance(start, int) and isinstance(end, int)
+
+    @staticmethod
+    def key(serializer, kind, base_url, repository, user_token, query_string, start, end, arguments=None,
+            timezone_offset_minutes=None, raw_data=None):
+        """
+        Results are only shared between clients of the same Humio instance, repository and user token,
+        as other tokens may not be allowed to see them. The token is part of the key as a digest only.
+
+        :return: Key identifying the results of a query
+        :rtype: str
+        """
+        return serializer.dumps([
+            kind,
+            base_url,
+            repository,
+            hashlib.sha256(user_token.encode("utf-8")).hexdigest() if user_token else None,
+            query_string,
+            start,
+            end,
+            sorted(arguments.items()) if arguments else None,
+            timezone_offset_minutes,
+            sorted(raw_data.items()) if raw_data else None,
+        ]).decode("utf-8")
+
+    @abc.abstractmethod
+    def get(self, key):
+        """
+        :param key: Key of result.
+        :type key: str
+
+        :return: The cached result, or None if it is not cached or has expired
+        :rtype: bytes
+        """
+
+    @abc.abstractmethod
+    def set(self, key, value):
+        """
+        :param key: Key of result.
+        :type key: str
+        :param value: Serialized result. Results larger than the cache are not stored.
+        :type value: bytes
+        """
+
+    @abc.abstractmethod
+    def clear(self):
+        """
+        Remove all cached results
+        """
+
+
+class MemoryQueryCache(QueryCache):
+    """
+    Keeps query results in memory, evicting the least recently used results when full
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl=300.0):
+        """
+        :param max_bytes: Maximum number of bytes of results kept, least recently used results are evicted beyond this.
+        :type max_bytes: int, optional
+        :param ttl: Number of seconds a result is kept.
+        :type ttl: float, optional
+        """
+        super().__init__(max_bytes, ttl)
+        self._entries = OrderedDict()
+        self._size = 0
+
+    @property
+    def size(self):
+        """
+        :return: Number of bytes of results kept
+        :rtype: int
+        """
+        with self._lock:
+            return self._size
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._remove(key)
+                self.stats.record("expirations")
+                entry = None
+            if entry is None:
+                self.stats.record("misses")
+                return None
+            self._entries.move_to_end(key)
+            self.stats.record("hits")
+            return entry[1]
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._size += len(value)
+            self.stats.record("stores")
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.stats.record("evictions")
+
+    def _remove(self, key):
+        _, value = self._entries.pop(key)
+        self._size -= len(value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+class DiskQueryCache(QueryCache):
+    """
+    Keeps query results in files in a directory, so that they survive restarts and can be shared between processes.
+    The least recently used results are evicted when full, as told by the modification time of their files.
+    """
+    def __init__(self, directory, max_bytes=1024 * 1024 * 1024, ttl=3600.0):
+        """
+        :param directory: Directory holding the cached results, created if it does not exist.
+        :type directory: str
+        :param max_bytes: Maximum number of bytes of results kept, least recently used results are evicted beyond this.
+        :type max_bytes: int, optional
+        :param ttl: Number of seconds a result is kept.
+        :type ttl: float, optional
+        """
+        super().__init__(max_bytes, ttl)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(size for _, _, size in self._files())
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + _SUFFIX)
+
+    def _files(self):
+        """
+        :return: Path, modification time and size of every cached result
+        :rtype: list(tuple(str, float, int))
+        """
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(_SUFFIX):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((entry.path, stat.st_mtime, stat.st_size))
+        return files
+
+    @property
+    def size(self):
+        """
+        :return: Number of bytes of results kept
+        :rtype: int
+        """
+        with self._lock:
+            return self._size
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.stats.record("misses")
+            return None
+
+        (expiry,) = _EXPIRY.unpack_from(data)
+        if expiry <= time.time():
+            self._unlink(path)
+            self.stats.record("expirations")
+            self.stats.record("misses")
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        self.stats.record("hits")
+        return data[_EXPIRY.size:]
+
+    def set(self, key, value):
+        if len(value) + _EXPIRY.size > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp = "{}.{}.tmp".format(path, threading.get_ident())
+        with open(tmp, "wb") as f:
+            f.write(_EXPIRY.pack(time.time() + self.ttl))
+            f.write(value)
+        with self._lock:
+            self._size -= self._unlink(path, locked=True)
+            os.replace(tmp, path)
+            self._size += len(value) + _EXPIRY.size
+            self.stats.record("stores")
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """
+        Removes the least recently used results until the cache fits its size cap. Must be called with the lock held.
+        """
+        files = sorted(self._files(), key=lambda file: file[1])
+        self._size = sum(size for _, _, size in files)
+        for path, _, size in files:
+            if self._size <= self.max_bytes:
+                break
+            self._unlink(path, locked=True)
+            self._size -= size
+            self.stats.record("evictions")
+
+    def _unlink(self, path, locked=False):
+        """
+        :return: Number of bytes freed
+        :rtype: int
+        """
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return 0
+        if not locked:
+            with self._lock:
+                self._size -= size
+        return size
+
+    def clear(self):
+        with self._lock:
+            for path, _, _ in self._files():
+                self._unlink(path, locked=True)
+            self._size = 0
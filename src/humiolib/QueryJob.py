@@ -2,13 +2,18 @@ import requests
 import time
 from humiolib.HumioExceptions import HumioQueryJobExhaustedException, HumioHTTPException, HumioQueryJobExpiredException
 from humiolib.WebCaller import WebCaller
+from humiolib.CompactEvents import CompactEvents
+from humiolib.DeltaTracker import DeltaTracker
 
 class PollResult():
     """
     Result of polling segments of queryjob results.
     We choose to return these clusters of data, rather than just a list of events,
     as the metadata returned changes between polls.
+    Events are a list of dictionaries, or CompactEvents for queryjobs created with compact_events.
     """
+    __slots__ = ("events", "metadata")
+
     def __init__(self, events, metadata):
         self.events = events
         self.metadata = metadata
@@ -20,13 +25,15 @@ class BaseQueryJob():
     This class and its children manage access to queryjobs created on a Humio instance,
     they are mainly used for extracting results from queryjobs.
     """
-    def __init__(self, query_id, base_url, repository, user_token):
+    def __init__(self, query_id, base_url, repository, user_token, webcaller=None, compact_events=False):
         """
         Parameters:
         query_id (string): Id of queryjob
         base_url (string): Url of Humio instance
         repository (string): Repository being queried
         user_token (string): Token used to access resource
+        webcaller (WebCaller): WebCaller to poll through, a new one is created if not given
+        compact_events (bool): Whether polled events are stored as CompactEvents rather than a list of dictionaries
         """
         self.query_id = query_id
         self.segment_is_done = False
@@ -37,7 +44,8 @@ class BaseQueryJob():
         self.base_url = base_url
         self.repository = repository
         self.user_token = user_token
-        self.webcaller = WebCaller(self.base_url)
+        self.webcaller = webcaller if webcaller is not None else WebCaller(self.base_url)
+        self.compact_events = compact_events
 
     @property
     def _default_user_headers(self):
@@ -51,14 +59,71 @@ class BaseQueryJob():
         }
 
 
+    @property
+    def _link(self):
+        """
+        :return: Endpoint used to access the queryjob
+        :rtype: str
+        """
+        return "dataspaces/{}/queryjobs/{}".format(self.repository, self.query_id)
+
+    def _time_until_next_poll(self):
+        """
+        :return: Number of seconds until the queryjob may be polled again. Always 0 on the first poll to the queryjob.
+        :rtype: float
+        """
+        time_since_last_poll = (time.time() - self.time_at_last_poll) * 1000.0
+        if(time_since_last_poll < self.wait_time_until_next_poll):
+            return (self.wait_time_until_next_poll - time_since_last_poll) / 1000.0
+        return 0
+
     def _wait_till_next_poll(self):
         """
         A potentially blocking operation, that waits until the queryjob may be polled again.
         This will always pass on the first poll to the queryjob.
         """
-        time_since_last_poll = time.time() - self.time_at_last_poll
-        if(time_since_last_poll < self.wait_time_until_next_poll):
-            time.sleep((self.wait_time_until_next_poll - time_since_last_poll) / 1000.0) 
+        wait_time = self._time_until_next_poll()
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+    @staticmethod
+    def _translate_poll_exception(e):
+        """
+        In the case that the queryjob has expired, a custom exception is thrown.
+        The calling code must itself decide how to respond to the error.
+        It has been considered whether this instance should simply restart the queryjob automatically,
+        but that would require the calling code to handle cases where
+        a queryjob restart returns previously received query results.
+
+        :param e: Exception raised while polling.
+        :type e: HumioHTTPException
+
+        :return: Exception to raise in its place
+        :rtype: HumioException
+        """
+        if e.status_code == 404:
+            return HumioQueryJobExpiredException(e.message)
+        return e
+
+    def _handle_segment_response(self, response):
+        """
+        Updates the state of the queryjob from a polled segment
+
+        :param response: Polled segment parsed into python objects.
+        :type response: dict
+
+        :return: A data object that contains events of the polled segment and metadata about the poll
+        :rtype: PollResult
+        """
+        self.wait_time_until_next_poll = response["metaData"]["pollAfter"]
+        self.segment_is_done = response["done"]
+        self.segment_is_cancelled = response["cancelled"]
+        self.time_at_last_poll = time.time()
+
+        events = response["events"]
+        if self.compact_events:
+            events = CompactEvents.consume(events)
+        return PollResult(events, response["metaData"])
 
     def _fetch_next_segment(self, link, headers, **kwargs):
         """
@@ -76,24 +141,11 @@ class BaseQueryJob():
         self._wait_till_next_poll()
         
         try:
-            response =  self.webcaller.call_rest("get", link, headers=headers, **kwargs).json()
+            response = self.webcaller.parse_json(self.webcaller.call_rest("get", link, headers=headers, **kwargs))
         except HumioHTTPException as e:
-            # In the case that the queryjob has expired, a custom exception is thrown.
-            # The calling code must itself decide how to respond to the error.
-            # It has been considered whether this instance should simply restart the queryjob automatically,
-            # but that would require the calling code to handle cases where
-            # a queryjob restart returns previously received query results.
-            if e.status_code == 404:
-                raise HumioQueryJobExpiredException(e.message)
-            else:
-                raise e
+            raise self._translate_poll_exception(e)
 
-        self.wait_time_until_next_poll = response["metaData"]["pollAfter"]
-        self.segment_is_done = response["done"] 
-        self.segment_is_cancelled = response["cancelled"]
-        self.time_at_last_poll = time.time()
-
-        return PollResult(response["events"], response["metaData"])
+        return self._handle_segment_response(response)
 
     def _is_streaming_query(self, metadata):
         """
@@ -114,28 +166,34 @@ class BaseQueryJob():
         :return: A data object that contains events of the polled segment and metadata about the poll
         :rtype: PollResult
         """
-        link = "dataspaces/{}/queryjobs/{}".format(self.repository, self.query_id)
-
         headers = self._default_user_headers
         headers.update(kwargs.pop("headers", {}))
 
-        poll_result = self._fetch_next_segment(link, headers, **kwargs)
+        poll_result = self._fetch_next_segment(self._link, headers, **kwargs)
         while not self.segment_is_done: # In case the segment hasn't been completed, we poll until is is
-            poll_result = self._fetch_next_segment(link, headers, **kwargs)
-    
+            poll_result = self._fetch_next_segment(self._link, headers, **kwargs)
+
+        self._update_more_segments_can_be_polled(poll_result)
+        return poll_result
+
+    def _update_more_segments_can_be_polled(self, poll_result):
+        """
+        Determines from a completed segment whether further segments can be polled
+
+        :param poll_result: Result of the completed segment.
+        :type poll_result: PollResult
+        """
         if self._is_streaming_query(poll_result.metadata):
             self.more_segments_can_be_polled = poll_result.metadata["extraData"]["hasMoreEvents"] == 'true'
         else: # is aggregate query
             self.more_segments_can_be_polled = False
 
-        return poll_result
-
 
 class StaticQueryJob(BaseQueryJob):
     """
     Manages a static queryjob
     """
-    def __init__(self, query_id, base_url, repository, user_token):
+    def __init__(self, query_id, base_url, repository, user_token, webcaller=None, compact_events=False):
         """
         :param query_id: Id of queryjob.
         :type query_id: str
@@ -145,8 +203,42 @@ class StaticQueryJob(BaseQueryJob):
         :type repository: str
         :param user_token: Token used to access resource.
         :type user_token: str
+        :param webcaller: WebCaller to poll through, typically shared with the client that created the queryjob.
+        :type webcaller: WebCaller, optional
+        :param compact_events: Whether polled events are stored as CompactEvents rather than a list of dictionaries.
+        :type compact_events: bool, optional
+        """
+        super().__init__(query_id, base_url, repository, user_token, webcaller, compact_events)
+        self._result_cache = None
+
+    def _store_results_in(self, cache, key):
         """
-        super().__init__(query_id, base_url, repository, user_token)
+        Store the completed segments in a cache, once the queryjob has been fully polled
+
+        :param cache: Cache to store segments in.
+        :type cache: QueryCache
+        :param key: Key of the query results in the cache.
+        :type key: str
+        """
+        self._result_cache = (cache, key, [])
+
+    def _update_more_segments_can_be_polled(self, poll_result):
+        super()._update_more_segments_can_be_polled(poll_result)
+        if self._result_cache is None:
+            return
+
+        cache, key, segments = self._result_cache
+        metadata = dict(poll_result.metadata, pollAfter=0)  # Cached segments can be replayed right away
+        segments.append({
+            "done": True,
+            "cancelled": self.segment_is_cancelled,
+            "events": list(poll_result.events),
+            "metaData": metadata,
+        })
+        if not self.more_segments_can_be_polled:
+            self._result_cache = None
+            if not self.segment_is_cancelled:
+                cache.set(key, self.webcaller.serializer.dumps(segments))
 
     def poll(self, **kwargs):
         """
@@ -173,11 +265,37 @@ class StaticQueryJob(BaseQueryJob):
             yield self.poll(**kwargs)
 
 
+class CachedQueryJob(StaticQueryJob):
+    """
+    Replays the segments of a static queryjob from a query cache, without making any requests to Humio
+    """
+    def __init__(self, segments, base_url, repository, user_token, webcaller=None, compact_events=False):
+        """
+        :param segments: Completed segments of the queryjob, as they were returned by Humio.
+        :type segments: list(dict)
+        :param base_url: Url of Humio instance.
+        :type base_url: str
+        :param repository:  Repository being queried.
+        :type repository: str
+        :param user_token: Token used to access resource.
+        :type user_token: str
+        :param webcaller: WebCaller of the client that created the queryjob.
+        :type webcaller: WebCaller, optional
+        :param compact_events: Whether replayed events are stored as CompactEvents rather than a list of dictionaries.
+        :type compact_events: bool, optional
+        """
+        super().__init__(None, base_url, repository, user_token, webcaller, compact_events)
+        self._segments = iter(segments)
+
+    def _fetch_next_segment(self, link, headers, **kwargs):
+        return self._handle_segment_response(next(self._segments))
+
+
 class LiveQueryJob(BaseQueryJob):
     """
     Manages a live queryjob
     """
-    def __init__(self, query_id, base_url, repository, user_token):
+    def __init__(self, query_id, base_url, repository, user_token, webcaller=None, compact_events=False):
         """
         :param query_id: Id of queryjob.
         :type query_id: str
@@ -187,9 +305,30 @@ class LiveQueryJob(BaseQueryJob):
         :type repository: str
         :param user_token: Token used to access resource.
         :type user_token: str
+        :param webcaller: WebCaller to poll through, typically shared with the client that created the queryjob.
+        :type webcaller: WebCaller, optional
+        :param compact_events: Whether polled events are stored as CompactEvents rather than a list of dictionaries.
+        :type compact_events: bool, optional
         """
-        super().__init__(query_id, base_url, repository, user_token)
-    
+        super().__init__(query_id, base_url, repository, user_token, webcaller, compact_events)
+        self.delta_tracker = None
+
+    def poll_delta(self, key_fields=None, **kwargs):
+        """
+        Polls the queryjob, returning only what changed since the previous call rather than the full result.
+        On the first call every row is returned as added.
+
+        :param key_fields: Fields identifying a row, such as the group-by fields of an aggregate. Rows are matched by @id when None.
+        :type key_fields: list(str), optional
+
+        :return: Rows added, changed and removed since the previous call, along with the metadata of the poll
+        :rtype: ResultDelta
+        """
+        if self.delta_tracker is None:
+            self.delta_tracker = DeltaTracker(key_fields)
+        poll_result = self.poll(**kwargs)
+        return self.delta_tracker.update(poll_result.events, poll_result.metadata)
+
     def __del__(self):
         """
         Delete queryjob, when this object is deconstructed.
@@ -198,7 +337,6 @@ class LiveQueryJob(BaseQueryJob):
         """
         try:
             headers = self._default_user_headers
-            endpoint = "dataspaces/{}/queryjobs/{}".format(self.repository, self.query_id)
-            self.webcaller.call_rest("delete", endpoint, headers)
+            self.webcaller.call_rest("delete", self._link, headers)
         except HumioHTTPException: # If the queryjob doesn't exists anymore, we don't want to halt on the exception
             pass 
@@ -0,0 +1,210 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from humiolib.DeltaTracker import DeltaTracker
+from humiolib.QueryJob import LiveQueryJob
+
+
+class _ScheduledQueryJob():
+    """
+    A queryjob owned by the scheduler, with the destinations its results are delivered to
+    """
+    __slots__ = ("queryjob", "callback", "error_callback", "results", "min_interval", "tracker", "headers", "removed")
+
+    def __init__(self, queryjob, callback, error_callback, results, min_interval, tracker):
+        self.queryjob = queryjob
+        self.callback = callback
+        self.error_callback = error_callback
+        self.results = results
+        self.min_interval = min_interval
+        self.tracker = tracker
+        self.headers = queryjob._default_user_headers
+        self.removed = False
+
+
+class QueryJobScheduler():
+    """
+    Polls many queryjobs from a fixed number of threads.
+
+    Queryjobs are kept in a priority queue ordered by the time they may next be polled, as told by Humio's pollAfter hint.
+    A single scheduling thread hands queryjobs that are due to a pool of worker threads, each of which polls once and
+    puts the queryjob back in the queue. Nothing ever sleeps on behalf of a single queryjob,
+    so the number of threads does not grow with the number of queryjobs.
+
+    Completed segments are delivered to a callback, put on a queue, or both.
+    Static queryjobs are dropped from the scheduler once fully polled, live queryjobs are polled until removed.
+    Queryjobs created by the same client share its WebCaller, and with that its connection pool,
+    which should allow at least as many connections as the scheduler has workers.
+    """
+
+    def __init__(self, workers=4):
+        """
+        :param workers: Number of threads polling queryjobs.
+        :type workers: int, optional
+        """
+        self.workers = workers
+        self.polls = 0
+        self._heap = []
+        self._entries = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="humiolib-poller")
+        self._scheduler = threading.Thread(target=self._schedule, name="humiolib-query-scheduler", daemon=True)
+        self._scheduler.start()
+
+    def add(self, queryjob, callback=None, results=None, error_callback=None, min_interval=0.0, delta=False,
+            key_fields=None):
+        """
+        Start polling a queryjob
+
+        :param queryjob: Queryjob to poll.
+        :type queryjob: BaseQueryJob
+        :param callback: Called on a worker thread with the queryjob and the PollResult of every completed segment.
+        :type callback: Function, optional
+        :param results: Queue every completed segment is put on, as a tuple of the queryjob and its PollResult.
+        :type results: queue.Queue, optional
+        :param error_callback: Called with the queryjob and the exception, when polling fails. The queryjob is then removed.
+        If not given, the exception is put on the results queue in place of the PollResult.
+        :type error_callback: Function, optional
+        :param min_interval: Minimum number of seconds between polls of a live queryjob, on top of Humio's pollAfter hint.
+        :type min_interval: float, optional
+        :param delta: Whether a ResultDelta of what changed since the previous segment is delivered in place of the PollResult.
+        Segments that change nothing are then not delivered at all.
+        :type delta: bool, optional
+        :param key_fields: Fields identifying a row when delivering deltas, such as the group-by fields of an aggregate.
+        :type key_fields: list(str), optional
+        """
+        if callback is None and results is None:
+            raise ValueError("Either a callback or a results queue must be given")
+        tracker = DeltaTracker(key_fields) if delta else None
+        entry = _ScheduledQueryJob(queryjob, callback, error_callback, results, min_interval, tracker)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Cannot add queryjobs to a closed scheduler")
+            previous = self._entries.get(id(queryjob))
+            if previous is not None:
+                previous.removed = True
+            self._entries[id(queryjob)] = entry
+            self._push(entry, time.monotonic() + queryjob._time_until_next_poll())
+
+    def remove(self, queryjob):
+        """
+        Stop polling a queryjob. A poll in progress is completed, but its result is not delivered.
+
+        :param queryjob: Queryjob to stop polling.
+        :type queryjob: BaseQueryJob
+        """
+        with self._condition:
+            entry = self._entries.pop(id(queryjob), None)
+            if entry is not None:
+                entry.removed = True
+
+    def __len__(self):
+        """
+        :return: Number of queryjobs being polled
+        :rtype: int
+        """
+        with self._condition:
+            return len(self._entries)
+
+    def _push(self, entry, due):
+        """
+        Puts a queryjob in the priority queue. Must be called with the condition held.
+        """
+        heapq.heappush(self._heap, (due, next(self._sequence), entry))
+        self._condition.notify()
+
+    def _schedule(self):
+        """
+        Runs on the scheduling thread, handing queryjobs to the workers as they become due
+        """
+        with self._condition:
+            while not self._closed:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                due, _, entry = self._heap[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                if not entry.removed:
+                    self._executor.submit(self._poll, entry)
+
+    def _poll(self, entry):
+        """
+        Runs on a worker thread, polling a queryjob once and scheduling its next poll
+        """
+        queryjob = entry.queryjob
+        try:
+            poll_result = queryjob._fetch_next_segment(queryjob._link, entry.headers)
+            if queryjob.segment_is_done:
+                queryjob._update_more_segments_can_be_polled(poll_result)
+        except Exception as e:
+            self.remove(queryjob)
+            if entry.error_callback is not None:
+                entry.error_callback(queryjob, e)
+            elif entry.results is not None:
+                entry.results.put((queryjob, e))
+            return
+        finally:
+            with self._condition:
+                self.polls += 1
+
+        if entry.removed:
+            return
+        try:
+            if queryjob.segment_is_done:
+                result = poll_result
+                if entry.tracker is not None:
+                    result = entry.tracker.update(poll_result.events, poll_result.metadata)
+                if result is poll_result or result:
+                    if entry.callback is not None:
+                        entry.callback(queryjob, result)
+                    if entry.results is not None:
+                        entry.results.put((queryjob, result))
+        finally:
+            self._reschedule(entry)
+
+    def _reschedule(self, entry):
+        """
+        Puts a polled queryjob back in the priority queue, or drops it if it has been fully polled
+        """
+        queryjob = entry.queryjob
+        finished = queryjob.segment_is_done and not queryjob.more_segments_can_be_polled
+        if finished and not isinstance(queryjob, LiveQueryJob):
+            self.remove(queryjob)
+            return
+
+        delay = queryjob._time_until_next_poll()
+        if isinstance(queryjob, LiveQueryJob) and queryjob.segment_is_done:
+            delay = max(delay, entry.min_interval)
+        with self._condition:
+            if not entry.removed and not self._closed:
+                self._push(entry, time.monotonic() + delay)
+
+    def close(self):
+        """
+        Stop polling all queryjobs, waiting for polls in progress to complete
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            for entry in self._entries.values():
+                entry.removed = True
+            self._entries.clear()
+            self._heap.clear()
+            self._condition.notify_all()
+        self._scheduler.join()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
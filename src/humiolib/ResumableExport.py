@@ -0,0 +1,243 @@
+import os
+import time
+from humiolib.HumioExceptions import (
+    HumioConnectionDroppedException,
+    HumioConnectionException,
+    HumioTimeoutException,
+)
+from humiolib.JsonSerializer import JsonSerializer
+
+
+class ExportCheckpoint():
+    """
+    Progress of a resumable export.
+
+    Everything before slice_start has been exported. Within the slice being exported,
+    the ids of the events emitted so far are kept with the number of times they were emitted,
+    so the slice can be queried again after a failure without emitting the same event twice,
+    while identical events, such as rows of a table() without @id, are still all emitted.
+    """
+    def __init__(
+        self, query_string, start, end, slice_start=None, seen_ids=None, last_timestamp=None, exported=0, slice_duration=None
+    ):
+        """
+        :param query_string: Humio query being exported.
+        :type query_string: str
+        :param start: Start of the exported time range, in milliseconds since epoch.
+        :type start: int
+        :param end: End of the exported time range, in milliseconds since epoch.
+        :type end: int
+        :param slice_start: Start of the slice being exported, everything before it has been exported.
+        :type slice_start: int, optional
+        :param seen_ids: Number of times each id was emitted so far within the current slice.
+        :type seen_ids: dict(str->int), optional
+        :param last_timestamp: @timestamp of the last event emitted.
+        :type last_timestamp: int, optional
+        :param exported: Number of events emitted so far.
+        :type exported: int, optional
+        :param slice_duration: Length in milliseconds of the slices the export has adapted to, given their number of events.
+        :type slice_duration: int, optional
+        """
+        self.query_string = query_string
+        self.start = start
+        self.end = end
+        self.slice_start = start if slice_start is None else slice_start
+        self.seen_ids = {} if seen_ids is None else seen_ids
+        self.last_timestamp = last_timestamp
+        self.exported = exported
+        self.slice_duration = slice_duration
+
+    @property
+    def done(self):
+        """
+        :return: Whether the whole time range has been exported
+        :rtype: bool
+        """
+        return self.slice_start >= self.end
+
+    def matches(self, query_string, start, end):
+        """
+        :return: Whether the checkpoint belongs to an export of the given query over the given time range
+        :rtype: bool
+        """
+        return (self.query_string, self.start, self.end) == (query_string, start, end)
+
+    def save(self, path, serializer):
+        """
+        Writes the checkpoint to a file, replacing an earlier checkpoint atomically
+
+        :param path: Path of checkpoint file.
+        :type path: str
+        :param serializer: Serializer used to encode the checkpoint.
+        :type serializer: JsonSerializer
+        """
+        tmp = "{}.tmp".format(path)
+        with open(tmp, "wb") as f:
+            f.write(serializer.dumps({
+                "query_string": self.query_string,
+                "start": self.start,
+                "end": self.end,
+                "slice_start": self.slice_start,
+                "seen_ids": self.seen_ids,
+                "last_timestamp": self.last_timestamp,
+                "exported": self.exported,
+                "slice_duration": self.slice_duration,
+            }))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, serializer):
+        """
+        Reads a checkpoint from a file
+
+        :param path: Path of checkpoint file.
+        :type path: str
+        :param serializer: Serializer used to decode the checkpoint.
+        :type serializer: JsonSerializer
+
+        :return: The stored checkpoint, or None if there is no checkpoint file
+        :rtype: ExportCheckpoint
+        """
+        try:
+            with open(path, "rb") as f:
+                data = serializer.loads(f.read())
+        except FileNotFoundError:
+            return None
+        if isinstance(data["seen_ids"], list):  # Written before occurrences were counted
+            data["seen_ids"] = dict.fromkeys(data["seen_ids"], 1)
+        return cls(**data)
+
+
+class ResumableExport():
+    """
+    Exports the results of a static query through streaming queries, surviving dropped connections.
+
+    The time range is exported in consecutive slices, one streaming query per slice.
+    If the connection drops, only the slice being exported is queried again,
+    and as many copies of every event as were already emitted from it, recognized by their @id, are skipped.
+    Progress can be persisted to a checkpoint file, so an interrupted export can be continued by a later process.
+    Events emitted after the last persisted checkpoint are emitted again when continuing from the file,
+    so consumers of a continued export should tolerate duplicates around the point of interruption.
+
+    The ids of a slice are kept in memory and written with every persisted checkpoint, so the cost of a slice
+    grows with its number of events. Slices holding more than max_slice_events events are therefore followed by shorter slices,
+    and slices holding far fewer events by longer ones, up to slice_duration.
+    """
+    retryable_exceptions = (HumioConnectionDroppedException, HumioConnectionException, HumioTimeoutException)
+
+    def __init__(
+        self,
+        stream_slice,
+        checkpoint,
+        slice_duration=60 * 60 * 1000,
+        checkpoint_path=None,
+        checkpoint_every=10000,
+        max_retries=5,
+        retry_backoff=1.0,
+        serializer=None,
+        max_slice_events=100000,
+    ):
+        """
+        :param stream_slice: Function streaming the query results of a time range as batches of events, given start and end.
+        :type stream_slice: Function
+        :param checkpoint: Progress to start from.
+        :type checkpoint: ExportCheckpoint
+        :param slice_duration: Maximum length of a slice in milliseconds. Bounds the work repeated and the ids kept after a failure.
+        :type slice_duration: int, optional
+        :param checkpoint_path: File to persist the checkpoint to. Progress is only kept in memory when None.
+        :type checkpoint_path: str, optional
+        :param checkpoint_every: Number of events emitted between persisted checkpoints, a checkpoint is also persisted after every slice.
+        :type checkpoint_every: int, optional
+        :param max_retries: Maximum number of consecutive failures of a slice, before the export gives up.
+        :type max_retries: int, optional
+        :param retry_backoff: Seconds waited before the first retry of a slice, doubled for every following retry.
+        :type retry_backoff: float, optional
+        :param serializer: Serializer used for the checkpoint file, and to identify events without an @id.
+        :type serializer: JsonSerializer, optional
+        :param max_slice_events: Number of events in a slice above which the following slices are shortened.
+        :type max_slice_events: int, optional
+        """
+        self.stream_slice = stream_slice
+        self.checkpoint = checkpoint
+        self.slice_duration = slice_duration
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.serializer = serializer if serializer is not None else JsonSerializer()
+        self.max_slice_events = max_slice_events
+        self.retries = 0
+
+    def _event_id(self, event):
+        """
+        :return: Identity of an event, its @id or its encoding if it has none
+        :rtype: str
+        """
+        event_id = event.get("@id")
+        if event_id is None:
+            return self.serializer.dumps(event).decode("utf-8")
+        return event_id
+
+    def _save(self):
+        if self.checkpoint_path is not None:
+            self.checkpoint.save(self.checkpoint_path, self.serializer)
+
+    def __iter__(self):
+        checkpoint = self.checkpoint
+        while not checkpoint.done:
+            duration = checkpoint.slice_duration or self.slice_duration
+            slice_end = min(checkpoint.slice_start + duration, checkpoint.end)
+            failures = 0
+            while True:
+                try:
+                    yield from self._export_slice(checkpoint.slice_start, slice_end)
+                    break
+                except self.retryable_exceptions:
+                    self._save()
+                    if failures >= self.max_retries:
+                        raise
+                    time.sleep(self.retry_backoff * 2 ** failures)
+                    failures += 1
+                    self.retries += 1
+
+            checkpoint.slice_start = slice_end
+            checkpoint.slice_duration = self._next_slice_duration(duration, sum(checkpoint.seen_ids.values()))
+            checkpoint.seen_ids = {}
+            self._save()
+
+    def _next_slice_duration(self, duration, events):
+        """
+        :return: Length of the next slice, aiming for slices of about half of max_slice_events events
+        :rtype: int
+        """
+        if events > self.max_slice_events:
+            return max(1, duration * self.max_slice_events // (2 * events))
+        if events < self.max_slice_events // 4:
+            return min(self.slice_duration, duration * 2)
+        return duration
+
+    def _export_slice(self, slice_start, slice_end):
+        """
+        Streams a single slice, skipping events that were emitted before the slice was last interrupted.
+        The n-th copy of an event is skipped only if at least n copies of it were emitted before.
+        """
+        checkpoint = self.checkpoint
+        occurrences = {}
+        since_save = 0
+        for events in self.stream_slice(slice_start, slice_end):
+            for event in events:
+                event_id = self._event_id(event)
+                occurrence = occurrences[event_id] = occurrences.get(event_id, 0) + 1
+                if occurrence <= checkpoint.seen_ids.get(event_id, 0):
+                    continue
+                checkpoint.seen_ids[event_id] = occurrence
+                checkpoint.last_timestamp = event.get("@timestamp", checkpoint.last_timestamp)
+                checkpoint.exported += 1
+                yield event
+
+                since_save += 1
+                if since_save >= self.checkpoint_every:
+                    self._save()
+                    since_save = 0
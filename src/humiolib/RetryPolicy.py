@@ -0,0 +1,211 @@
+import email.utils
+import random
+import threading
+import time
+
+
+class RetryBudget():
+    """
+    Token bucket limiting how many retries may be made across all threads sharing it.
+    During a larger outage this stops every caller from multiplying the load on Humio with retries.
+    """
+    def __init__(self, max_retries=100, per_seconds=60.0):
+        """
+        :param max_retries: Number of retries that may be made within the time window.
+        :type max_retries: int, optional
+        :param per_seconds: Length of the time window in seconds, over which the budget is refilled.
+        :type per_seconds: float, optional
+        """
+        self.max_retries = max_retries
+        self.per_seconds = per_seconds
+        self._tokens = float(max_retries)
+        self._time_at_last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """
+        Takes a retry from the budget
+
+        :return: Whether the budget allowed a retry
+        :rtype: bool
+        """
+        with self._lock:
+            now = time.monotonic()
+            refill = (now - self._time_at_last_refill) * self.max_retries / self.per_seconds
+            self._tokens = min(self.max_retries, self._tokens + refill)
+            self._time_at_last_refill = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RetryStats():
+    """
+    Counters describing the retries made under a retry policy
+    """
+    def __init__(self):
+        self.retries = 0
+        self.retried_requests = 0
+        self.recovered_requests = 0
+        self.exhausted_requests = 0
+        self.total_delay = 0.0
+        self._lock = threading.Lock()
+
+    def record_retry(self, attempt, delay):
+        with self._lock:
+            self.retries += 1
+            self.total_delay += delay
+            if attempt == 0:
+                self.retried_requests += 1
+
+    def record_recovered(self):
+        with self._lock:
+            self.recovered_requests += 1
+
+    def record_exhausted(self):
+        with self._lock:
+            self.exhausted_requests += 1
+
+    def as_dict(self):
+        """
+        :return: Snapshot of the counters
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                "retries": self.retries,
+                "retried_requests": self.retried_requests,
+                "recovered_requests": self.recovered_requests,
+                "exhausted_requests": self.exhausted_requests,
+                "total_delay": self.total_delay,
+            }
+
+
+class RetryPolicy():
+    """
+    Describes when and how long to wait before a failed request to Humio is retried.
+    Waits grow exponentially with full jitter, unless Humio asks for a specific wait with a Retry-After header.
+
+    Retried requests are resent with the exact same body, so an ingest request whose response was lost
+    may be ingested twice, but no events are dropped on transient failures.
+    For that reason only ingest requests and GET requests are retried, while requests such as GraphQL mutations never are.
+    """
+    def __init__(
+        self,
+        max_retries=3,
+        backoff_factor=0.5,
+        max_backoff=30.0,
+        retry_on_status=(429, 502, 503, 504),
+        status_rules=None,
+        retry_on_connection_errors=True,
+        retry_on_timeouts=True,
+        max_total_time=60.0,
+        budget=None,
+    ):
+        """
+        :param max_retries: Maximum number of retries of a single request.
+        :type max_retries: int, optional
+        :param backoff_factor: Seconds waited before the first retry, doubled for every following retry.
+        :type backoff_factor: float, optional
+        :param max_backoff: Maximum number of seconds waited between two attempts.
+        :type max_backoff: float, optional
+        :param retry_on_status: Http status codes that are retried.
+        :type retry_on_status: tuple(int), optional
+        :param status_rules: Maximum number of retries per http status code, overriding max_retries. A status with 0 is never retried.
+        :type status_rules: dict(int->int), optional
+        :param retry_on_connection_errors: Whether requests failing to connect are retried.
+        :type retry_on_connection_errors: bool, optional
+        :param retry_on_timeouts: Whether requests timing out are retried.
+        :type retry_on_timeouts: bool, optional
+        :param max_total_time: Maximum number of seconds spent on a request including all its retries.
+        :type max_total_time: float, optional
+        :param budget: Budget limiting retries across all threads using this policy.
+        :type budget: RetryBudget, optional
+        """
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.retry_on_status = frozenset(retry_on_status)
+        self.status_rules = status_rules if status_rules is not None else {}
+        self.retry_on_connection_errors = retry_on_connection_errors
+        self.retry_on_timeouts = retry_on_timeouts
+        self.max_total_time = max_total_time
+        self.budget = budget
+        self.stats = RetryStats()
+
+    def _max_retries_for_status(self, status_code):
+        if status_code in self.status_rules:
+            return self.status_rules[status_code]
+        if status_code in self.retry_on_status:
+            return self.max_retries
+        return 0
+
+    def backoff(self, attempt):
+        """
+        :param attempt: Number of retries made so far.
+        :type attempt: int
+
+        :return: Seconds to wait before the next attempt, drawn uniformly up to the exponential backoff
+        :rtype: float
+        """
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
+
+    @staticmethod
+    def parse_retry_after(value):
+        """
+        :param value: Value of a Retry-After header, either seconds or an http date.
+        :type value: str, optional
+
+        :return: Seconds to wait, or None if the header is missing or malformed
+        :rtype: float
+        """
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError, IndexError):
+            return None
+
+    def next_delay(self, attempt, elapsed, status_code=None, retry_after=None, connection_error=False, timeout=False):
+        """
+        Decides whether a failed attempt should be retried.
+
+        :param attempt: Number of retries made so far.
+        :type attempt: int
+        :param elapsed: Seconds spent on the request so far.
+        :type elapsed: float
+        :param status_code: Http status code of the failed attempt.
+        :type status_code: int, optional
+        :param retry_after: Value of the Retry-After header of the failed attempt.
+        :type retry_after: str, optional
+        :param connection_error: Whether the attempt failed to connect.
+        :type connection_error: bool, optional
+        :param timeout: Whether the attempt timed out.
+        :type timeout: bool, optional
+
+        :return: Seconds to wait before retrying, or None if the request should not be retried
+        :rtype: float
+        """
+        if status_code is not None:
+            max_retries = self._max_retries_for_status(status_code)
+        elif (connection_error and self.retry_on_connection_errors) or (timeout and self.retry_on_timeouts):
+            max_retries = self.max_retries
+        else:
+            max_retries = 0
+
+        if attempt >= max_retries:
+            return None
+
+        delay = self.parse_retry_after(retry_after)
+        if delay is None:
+            delay = self.backoff(attempt)
+        if elapsed + delay > self.max_total_time:
+            return None
+        if self.budget is not None and not self.budget.try_acquire():
+            return None
+        return delay
@@ -0,0 +1,303 @@
+import functools
+import threading
+
+
+class _Call():
+    """
+    A call in flight, which identical calls wait for rather than making their own
+    """
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _opened_lazily(open_stream):
+    """
+    Opens a stream when its first batch is read, rather than while the lock of the SingleFlight is held
+    """
+    yield from open_stream()
+
+
+class _SharedStream():
+    """
+    A stream of batches read once from its source, and handed out to any number of independent iterators.
+
+    Whichever iterator runs out of buffered batches reads the next one from the source, while the others keep
+    reading what is buffered. Batches are dropped from the buffer once every iterator has passed them,
+    so memory is bounded by how far the fastest iterator is ahead of the slowest.
+    Iterators can only join while the first batch is still buffered, as they would otherwise miss results.
+    """
+
+    def __init__(self, source, on_closed):
+        """
+        :param source: Iterator of batches.
+        :type source: Iterator
+        :param on_closed: Called once no more iterators may join, without any lock of the stream held.
+        :type on_closed: Function
+        """
+        self._source = source
+        self._on_closed = on_closed
+        self._closed_notified = False
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._buffer = []
+        self._offset = 0
+        self._positions = {}
+        self._iterators = 0
+        self._joinable = True
+        self._exhausted = False
+        self._error = None
+
+    def join(self):
+        """
+        :return: A new iterator over the stream, or None if the stream can no longer be joined
+        :rtype: Generator
+        """
+        with self._lock:
+            if not self._joinable:
+                return None
+            iterator_id = self._iterators
+            self._iterators += 1
+            self._positions[iterator_id] = self._offset
+        return self._iterate(iterator_id)
+
+    def _notify_closed(self):
+        """
+        Tells the owner of the stream that it can no longer be joined. Must be called without the lock held,
+        as the owner takes its own lock, which is held while joining.
+        """
+        if not self._joinable and not self._closed_notified:
+            self._closed_notified = True
+            self._on_closed()
+
+    def _iterate(self, iterator_id):
+        try:
+            while True:
+                batch = self._next(iterator_id)
+                self._notify_closed()
+                if batch is None:
+                    return
+                yield batch
+        finally:
+            self._leave(iterator_id)
+            self._notify_closed()
+
+    def _next(self, iterator_id):
+        """
+        :return: The next batch for an iterator, or None once the stream is exhausted
+        """
+        while True:
+            with self._lock:
+                batch = self._buffered(iterator_id)
+                if batch is not None:
+                    return batch
+                if self._exhausted:
+                    if self._error is not None:
+                        raise self._error
+                    return None
+
+            with self._read_lock:
+                with self._lock:
+                    if self._positions[iterator_id] < self._offset + len(self._buffer) or self._exhausted:
+                        continue  # Another iterator read a batch while we waited
+                try:
+                    batch = next(self._source)
+                except StopIteration:
+                    batch = None
+                except Exception as e:
+                    with self._lock:
+                        self._error = e
+                        batch = None
+                with self._lock:
+                    if batch is None:
+                        self._exhausted = True
+                        self._joinable = False
+                    else:
+                        self._buffer.append(batch)
+
+    def _buffered(self, iterator_id):
+        """
+        Takes the next buffered batch for an iterator, dropping batches every iterator has passed.
+        Must be called with the lock held.
+        """
+        position = self._positions[iterator_id]
+        if position >= self._offset + len(self._buffer):
+            return None
+        batch = self._buffer[position - self._offset]
+        self._positions[iterator_id] = position + 1
+        self._trim()
+        return batch
+
+    def _trim(self):
+        """
+        Must be called with the lock held
+        """
+        if not self._positions:
+            return
+        slowest = min(self._positions.values())
+        if slowest > self._offset:
+            del self._buffer[:slowest - self._offset]
+            self._offset = slowest
+            self._joinable = False
+
+    def _leave(self, iterator_id):
+        close_source = False
+        with self._lock:
+            del self._positions[iterator_id]
+            self._trim()
+            if not self._positions and not self._exhausted:
+                # Nobody is reading the stream anymore, so it is given up
+                self._exhausted = True
+                self._joinable = False
+                self._buffer = []
+                close_source = True
+        if close_source and hasattr(self._source, "close"):
+            with self._read_lock:
+                self._source.close()
+
+
+class SingleFlightStats():
+    """
+    Counters describing how many calls were coalesced
+    """
+    def __init__(self):
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+
+    def record(self, coalesced):
+        with self._lock:
+            self.calls += 1
+            if coalesced:
+                self.coalesced += 1
+            else:
+                self.executions += 1
+
+    def as_dict(self):
+        """
+        :return: Snapshot of the counters
+        :rtype: dict
+        """
+        with self._lock:
+            return {"calls": self.calls, "executions": self.executions, "coalesced": self.coalesced}
+
+
+class SingleFlight():
+    """
+    Coalesces identical calls made concurrently from several threads, so that only one of them makes the request.
+    The others wait for it and receive the same result, or the same exception.
+    Streamed results are read from a single request, and each caller gets an independent iterator over them.
+
+    Only calls in flight at the same time are coalesced, a call made after another completed makes its own request.
+    Coalesced callers share the returned objects, which should therefore not be modified.
+    """
+
+    def __init__(self):
+        self.stats = SingleFlightStats()
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._streams = {}
+
+    def call(self, key, func):
+        """
+        Calls a function, unless an identical call is in flight, in which case its result is waited for
+
+        :param key: Key identifying identical calls.
+        :type key: Hashable
+        :param func: Function making the call.
+        :type func: Function
+
+        :return: Result of the call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        self.stats.record(coalesced=not leader)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stream(self, key, open_stream):
+        """
+        Opens a stream, unless an identical stream is in flight and has not yet been read past its first batch,
+        in which case an independent iterator over that stream is returned
+
+        :param key: Key identifying identical streams.
+        :type key: Hashable
+        :param open_stream: Function returning an iterator of batches.
+        :type open_stream: Function
+
+        :return: A generator that returns the batches of the stream
+        :rtype: Generator
+        """
+        with self._lock:
+            stream = self._streams.get(key)
+            iterator = stream.join() if stream is not None else None
+            if iterator is None:
+                stream = _SharedStream(_opened_lazily(open_stream), lambda: self._forget_stream(key, stream))
+                self._streams[key] = stream
+                iterator = stream.join()
+                self.stats.record(coalesced=False)
+            else:
+                self.stats.record(coalesced=True)
+        return iterator
+
+    def _forget_stream(self, key, stream):
+        with self._lock:
+            if self._streams.get(key) is stream:
+                del self._streams[key]
+
+    @staticmethod
+    def coalesced(func):
+        """
+        Wrapper to coalesce concurrent identical calls of a client method, when the client has a SingleFlight.
+        Calls are identical when they are made with the same arguments, to the same Humio instance, repository and token.
+
+        :param func: Function to be wrapped.
+        :type func: Function
+
+        :return: Result of function, possibly shared with concurrent identical calls
+        """
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if self.single_flight is None:
+                return func(self, *args, **kwargs)
+            key = self.single_flight.key(self, func.__name__, args, kwargs)
+            return self.single_flight.call(key, lambda: func(self, *args, **kwargs))
+
+        return wrapper
+
+    @staticmethod
+    def key(client, method, args, kwargs):
+        """
+        :return: Key identifying a call of a client method
+        :rtype: bytes
+        """
+        return client.serializer.dumps([
+            method,
+            client.base_url,
+            getattr(client, "repository", None),
+            getattr(client, "user_token", None),
+            list(args),
+            sorted(kwargs.items()),
+        ])
@@ -0,0 +1,78 @@
+import threading
+import time
+
+
+class UserDirectory():
+    """
+    Snapshot of the users of a Humio instance, indexed by email and by id, so that looking users up
+    does not download and scan the full user list every time.
+
+    The snapshot is fetched on first use, and fetched again once it is older than the TTL or has been invalidated.
+    Without a TTL, every lookup fetches a new snapshot, while lookups made against one snapshot,
+    as done when deleting many users, still download the user list only once.
+    Threads looking users up while the snapshot is being fetched wait for it, rather than fetching it themselves.
+    """
+
+    def __init__(self, fetch_users, ttl=None):
+        """
+        :param fetch_users: Returns the list of all users.
+        :type fetch_users: Function
+        :param ttl: Number of seconds a snapshot is used for. Lookups always fetch a new snapshot when None.
+        :type ttl: float, optional
+        """
+        self.fetch_users = fetch_users
+        self.ttl = ttl
+        self.refreshes = 0
+        self.hits = 0
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._fetched_at = 0.0
+
+    def snapshot(self, refresh=False):
+        """
+        :param refresh: Whether a new snapshot is fetched, regardless of the age of the current one.
+        :type refresh: bool, optional
+
+        :return: Users by email and users by id
+        :rtype: tuple(dict, dict)
+        """
+        with self._lock:
+            expired = self.ttl is None or time.monotonic() - self._fetched_at >= self.ttl
+            if refresh or self._snapshot is None or expired:
+                users = self.fetch_users()
+                self._snapshot = (
+                    {user["email"]: user for user in users},
+                    {user["userID"]: user for user in users},
+                )
+                self._fetched_at = time.monotonic()
+                self.refreshes += 1
+            else:
+                self.hits += 1
+            return self._snapshot
+
+    def get_by_email(self, email):
+        """
+        :param email: Email of user.
+        :type email: str
+
+        :return: The user, or None if there is no user with the email
+        :rtype: dict
+        """
+        return self.snapshot()[0].get(email)
+
+    def get_by_id(self, user_id):
+        """
+        :param user_id: Id of user.
+        :type user_id: str
+
+        :return: The user, or None if there is no user with the id
+        :rtype: dict
+        """
+        return self.snapshot()[1].get(user_id)
+
+    def invalidate(self):
+        """
+        Discard the snapshot, so that the next lookup fetches a new one
+        """
+        with self._lock:
+            self._snapshot = None
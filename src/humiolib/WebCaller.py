@@ -1,5 +1,7 @@
 import requests
 import functools
+import time
+from humiolib.JsonSerializer import JsonSerializer
 from humiolib.HumioExceptions import HumioConnectionException, HumioHTTPException, HumioTimeoutException, HumioConnectionDroppedException
 
 HTTPError = requests.exceptions.HTTPError
@@ -7,23 +9,124 @@ ConnectionError = requests.exceptions.ConnectionError
 TimeoutError = requests.exceptions.Timeout
 ChunkingError = requests.exceptions.ChunkedEncodingError
 
+
+class _IdleConnectionClosing():
+    """
+    Mixin for urllib3 connection pools, closing a connection taken from the pool
+    if it has sat idle in the pool for longer than the keep-alive timeout.
+    A closed connection is opened again by urllib3 when it is next used.
+    """
+    keepalive_timeout = None
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        idle_since = getattr(conn, "idle_since", None)
+        if idle_since is not None and time.monotonic() - idle_since > self.keepalive_timeout:
+            conn.close()
+        return conn
+
+    def _put_conn(self, conn):
+        if conn is not None:
+            conn.idle_since = time.monotonic()
+        super()._put_conn(conn)
+
+
+class _KeepAliveAdapter(requests.adapters.HTTPAdapter):
+    """
+    Http adapter whose pools close connections that have been idle for longer than the keep-alive timeout,
+    leaving connections that are in use or were used recently alone
+    """
+    def __init__(self, keepalive_timeout, **kwargs):
+        self.keepalive_timeout = keepalive_timeout
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: type(pool_class.__name__, (_IdleConnectionClosing, pool_class), {"keepalive_timeout": self.keepalive_timeout})
+            for scheme, pool_class in self.poolmanager.pool_classes_by_scheme.items()
+        }
+
+
 class WebCaller:
     """
     Object used for abstracting calls to the Humio API
     """
     version_number_humio = "v1"
 
-    def __init__(self, base_url):
+    def __init__(
+        self,
+        base_url,
+        pool_connections=10,
+        pool_maxsize=10,
+        pool_block=False,
+        keepalive_timeout=None,
+        serializer=None,
+        retry_policy=None,
+    ):
         """
+        Every WebCaller owns a pooled http session, so that connections to Humio are kept alive
+        and reused across requests instead of paying for a new TCP and TLS handshake on every call.
+        The session may be shared between threads.
+
         :param base_url: URL of Humio instance.
         :type func: string
+        :param pool_connections: Number of connection pools to cache, one pool is used per host.
+        :type pool_connections: int, optional
+        :param pool_maxsize: Maximum number of connections kept open per host.
+        :type pool_maxsize: int, optional
+        :param pool_block: Whether requests should wait for a free connection, when the pool is exhausted.
+        :type pool_block: bool, optional
+        :param keepalive_timeout: Seconds a connection may sit idle before it is closed rather than reused. Never closed when None.
+        :type keepalive_timeout: float, optional
+        :param serializer: Serializer used for request and response bodies, the fastest installed JSON backend is used when None.
+        :type serializer: JsonSerializer, optional
+        :param retry_policy: Policy for retrying failed requests. Requests are not retried when None.
+        :type retry_policy: RetryPolicy, optional
         """
         self.base_url = base_url
         self.rest_url = "{}/api/{}/".format(self.base_url, self.version_number_humio)
         self.graphql_url = "{}/graphql".format(self.base_url)
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keepalive_timeout = keepalive_timeout
+        self.serializer = serializer if serializer is not None else JsonSerializer()
+        self.retry_policy = retry_policy
+        self.session = self._create_session()
 
+    def _create_session(self):
+        """
+        Creates an http session with a connection pool mounted for both http and https
+
+        :return: A pooled http session
+        :rtype: Session
+        """
+        session = requests.Session()
+        options = dict(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize, pool_block=self.pool_block)
+        if self.keepalive_timeout is None:
+            adapter = requests.adapters.HTTPAdapter(**options)
+        else:
+            # Servers and load balancers close idle connections on their end, so reusing them would only result in a failed request
+            adapter = _KeepAliveAdapter(self.keepalive_timeout, **options)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def close(self):
+        """
+        Closes all pooled connections
+        """
+        self.session.close()
 
-    def call_rest(self, verb, endpoint, headers=None, data=None, files=None, stream=False, **kwargs):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def call_rest(self, verb, endpoint, headers=None, data=None, files=None, stream=False, retry=None, **kwargs):
         """
         Call one of Humio's REST endpoints
 
@@ -39,14 +142,19 @@ class WebCaller:
         :type files: dict, optional
         :param stream: Indicates whether a stream request should be made
         :type stream: bool, optional
+        :param retry: Whether failures may be retried by the retry policy. Only GET requests are retried when None,
+        as other requests may already have been applied by Humio when they fail.
+        :type retry: bool, optional
 
         :return: Response to web request
         :rtype: Response Object
         """
         link = self.rest_url + endpoint
-        return self._make_request(verb, link, headers, data, files, stream, **kwargs)
+        if retry is None:
+            retry = verb.lower() == "get"
+        return self._make_request(verb, link, headers, data, files, stream, retry=retry, **kwargs)
 
-    def call_graphql(self, headers=None, data=None, **kwargs):
+    def call_graphql(self, headers=None, data=None, retry=False, **kwargs):
         """
         Call Humio's GraphQL endpoint
 
@@ -54,13 +162,15 @@ class WebCaller:
         :type headers: dict, optional
         :param data: Post request body for GraphQL
         :type data: dict, optional
+        :param retry: Whether failures may be retried by the retry policy, which is only safe for queries, not mutations.
+        :type retry: bool, optional
 
         :return: Response to web request
         :rtype: Response Object
         """
-        return self._make_request("post", self.graphql_url, headers, data, **kwargs)
+        return self._make_request("post", self.graphql_url, headers, data, retry=retry, **kwargs)
     
-    def _make_request(self, verb, link, headers=None, data=None, files=None, stream=False, **kwargs):
+    def _make_request(self, verb, link, headers=None, data=None, files=None, stream=False, retry=False, **kwargs):
         """
         Make a webrequest.
         By creating custom errors here, we ensure that calling code will not have to depend
@@ -79,28 +189,79 @@ class WebCaller:
         :type files: dict, optional
         :param stream: Indicates whether a stream request should be made
         :type stream: bool, optional
+        :param retry: Whether failures may be retried by the retry policy.
+        :type retry: bool, optional
 
         :return: Response to web request
         :rtype: Response Object
         """
-        try:
-            response = requests.request(
-                verb, link, data=data, headers=headers, stream=stream, files=files, **kwargs
-            )
-            response.raise_for_status()
-        except ConnectionError as e:
-            raise HumioConnectionException(e) 
-        except HTTPError as e:
-            raise HumioHTTPException(e.response.text, e.response.status_code)
-        except TimeoutError as e:
-            raise HumioTimeoutException(e)
-        
-        return response
+        # Only requests that are safe to repeat, and whose body can be sent again unchanged, are retried
+        retryable = retry and self.retry_policy is not None and files is None and (data is None or isinstance(data, (bytes, str)))
+        time_at_first_attempt = time.monotonic()
+        attempt = 0
+
+        while True:
+            try:
+                response = self.session.request(
+                    verb, link, data=data, headers=headers, stream=stream, files=files, **kwargs
+                )
+                response.raise_for_status()
+            except ConnectionError as e:
+                delay = self._retry_delay(retryable, attempt, time_at_first_attempt, connection_error=True)
+                if delay is None:
+                    raise HumioConnectionException(e)
+            except HTTPError as e:
+                delay = self._retry_delay(
+                    retryable, attempt, time_at_first_attempt,
+                    status_code=e.response.status_code, retry_after=e.response.headers.get("Retry-After")
+                )
+                if delay is None:
+                    raise HumioHTTPException(e.response.text, e.response.status_code)
+                e.response.close()
+            except TimeoutError as e:
+                delay = self._retry_delay(retryable, attempt, time_at_first_attempt, timeout=True)
+                if delay is None:
+                    raise HumioTimeoutException(e)
+            else:
+                if attempt > 0:
+                    self.retry_policy.stats.record_recovered()
+                return response
+
+            self.retry_policy.stats.record_retry(attempt, delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def _retry_delay(self, retryable, attempt, time_at_first_attempt, **failure):
+        """
+        Asks the retry policy whether a failed attempt should be retried
+
+        :return: Seconds to wait before retrying, or None if the failure should be raised
+        :rtype: float
+        """
+        if not retryable:
+            return None
+        delay = self.retry_policy.next_delay(attempt, time.monotonic() - time_at_first_attempt, **failure)
+        if delay is None and attempt > 0:
+            self.retry_policy.stats.record_exhausted()
+        return delay
+
+    def parse_json(self, response):
+        """
+        Parse the body of a response with the serializer of this WebCaller
+
+        :param response: Response to web request
+        :type response: Response Object
+
+        :return: Body of response, parsed into python objects from json
+        :rtype: dict
+        """
+        return self.serializer.loads(response.content)
 
     @staticmethod
     def response_as_json(func):
         """
-        Wrapper to take the raw requests responses and turn them into json
+        Wrapper to take the raw requests responses of a client method and turn them into json,
+        using the serializer of the client's WebCaller
 
         :param func: Function to be wrapped.
         :type func: Function
@@ -109,9 +270,9 @@ class WebCaller:
         :rtype: dict
         """
         @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            resp = func(*args, **kwargs)
-            return resp.json()
+        def wrapper(self, *args, **kwargs):
+            resp = func(self, *args, **kwargs)
+            return self.webcaller.parse_json(resp)
 
         return wrapper
 
@@ -126,6 +287,7 @@ class WebStreamer():
         :param connection: Connection object created by http library.
         :type connection: Connection
         """
+        self.response = connection
         self.connection = connection.iter_lines()
     
     def __iter__(self):
@@ -136,4 +298,52 @@ class WebStreamer():
             return next(self.connection)
         # This error occurs during live queries, when data hasn't been streamed in a while
         except ChunkingError:
-            raise HumioConnectionDroppedException("Connection to streaming socket was lost")
\ No newline at end of file
+            raise HumioConnectionDroppedException("Connection to streaming socket was lost")
+
+    def iter_chunks(self, chunk_size=1024 * 1024):
+        """
+        Read the raw body of the stream in chunks
+
+        :param chunk_size: Number of bytes read from the connection at a time.
+        :type chunk_size: int, optional
+
+        :return: A generator that returns chunks of the body
+        :rtype: Generator
+        """
+        try:
+            yield from self.response.iter_content(chunk_size=chunk_size)
+        except (ChunkingError, ConnectionError):
+            raise HumioConnectionDroppedException("Connection to streaming socket was lost")
+
+    def iter_event_batches(self, serializer, chunk_size=1024 * 1024):
+        """
+        Decode the stream as newline delimited JSON.
+        Large raw chunks are read from the connection and all complete lines in a chunk are decoded in one go,
+        rather than splitting the stream into a bytes object per line.
+
+        :param serializer: Serializer used to decode events.
+        :type serializer: JsonSerializer
+        :param chunk_size: Number of bytes read from the connection at a time.
+        :type chunk_size: int, optional
+
+        :return: A generator that returns lists of decoded events, one list per chunk read
+        :rtype: Generator
+        """
+        buffer = bytearray()
+        try:
+            for chunk in self.response.iter_content(chunk_size=chunk_size):
+                buffer += chunk
+                end = buffer.rfind(b"\n")
+                if end == -1:
+                    continue
+                events = serializer.loads_ndjson(buffer, end)
+                del buffer[:end + 1]
+                if events:
+                    yield events
+        # This error occurs during live queries, when data hasn't been streamed in a while,
+        # or when the connection is reset or times out while reading
+        except (ChunkingError, ConnectionError):
+            raise HumioConnectionDroppedException("Connection to streaming socket was lost")
+
+        if buffer.strip():
+            yield serializer.loads_ndjson(buffer)
\ No newline at end of file
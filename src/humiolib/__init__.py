@@ -1,2 +1,4 @@
 __version__ = "0.2.6"
-from humiolib.HumioClient import HumioClient, HumioIngestClient
\ No newline at end of file
+from humiolib.HumioClient import HumioClient, HumioIngestClient
+from humiolib.BufferedIngestClient import BufferedIngestClient
+from humiolib.HumioLoggingHandler import HumioLoggingHandler
@@ -16,9 +16,117 @@ Why does this file exist, and why not put this in __main__?
 """
 import argparse
 import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from humiolib.HumioClient import HumioClient, HumioIngestClient
 from humiolib.HumioExceptions import HumioException
 
+
+class IngestProgress():
+    """
+    Keeps track of batches sent from a file, and the byte offset up to which every batch has been ingested.
+    Batches may complete out of order when several are in flight, so the offset only moves past a batch
+    once all batches before it have been ingested too.
+    """
+    def __init__(self, start_offset, show_progress, interval=1.0):
+        self.committed_offset = start_offset
+        self.lines = 0
+        self.bytes = 0
+        self.error = None
+        self.show_progress = show_progress
+        self.interval = interval
+        self._completed = {}
+        self._next_sequence = 0
+        self._time_at_start = time.monotonic()
+        self._time_at_last_report = 0
+        self._lock = threading.Lock()
+
+    def complete(self, sequence, end_offset, lines, size):
+        with self._lock:
+            self._completed[sequence] = end_offset
+            while self._next_sequence in self._completed:
+                self.committed_offset = self._completed.pop(self._next_sequence)
+                self._next_sequence += 1
+            self.lines += lines
+            self.bytes += size
+            self.report()
+
+    def fail(self, error):
+        with self._lock:
+            if self.error is None:
+                self.error = error
+
+    def report(self, final=False):
+        now = time.monotonic()
+        if not self.show_progress or (not final and now - self._time_at_last_report < self.interval):
+            return
+        self._time_at_last_report = now
+        elapsed = max(now - self._time_at_start, 1e-9)
+        sys.stderr.write("\r[*] {} lines, {:.1f} MB ingested ({:.0f} lines/s, {:.2f} MB/s), offset {}{}".format(
+            self.lines, self.bytes / 1e6, self.lines / elapsed, self.bytes / 1e6 / elapsed, self.committed_offset,
+            "\n" if final else ""
+        ))
+        sys.stderr.flush()
+
+
+def read_batches(source, offset, batch_lines, batch_bytes):
+    """
+    Reads non-empty lines from a binary file in batches bounded by line count and bytes
+
+    :return: A generator of batches as tuples of the lines and the byte offset after the batch
+    :rtype: Generator
+    """
+    batch = []
+    size = 0
+    for raw_line in source:
+        offset += len(raw_line)
+        line = raw_line.decode("utf-8", errors="replace").strip()
+        if line:
+            batch.append(line)
+            size += len(raw_line)
+        if batch and (len(batch) >= batch_lines or size >= batch_bytes):
+            yield batch, offset
+            batch, size = [], 0
+    yield batch, offset
+
+
+def stream_ingest(api, source, offset, batch_lines, batch_bytes, concurrency, show_progress, **ingest_kwargs):
+    """
+    Ingests lines of a file in batches with several requests in flight at once.
+    Reading stops at the first failed batch, after which the batches in flight are awaited.
+
+    :return: Progress of the ingest, holding the first error and the offset to resume from
+    :rtype: IngestProgress
+    """
+    progress = IngestProgress(offset, show_progress)
+    in_flight = threading.BoundedSemaphore(concurrency)
+
+    def send(sequence, lines, end_offset, size):
+        try:
+            if lines:
+                api.ingest_messages(messages=lines, **ingest_kwargs)
+            progress.complete(sequence, end_offset, len(lines), size)
+        except Exception as e:  # Anything raised here would otherwise be lost in the future of the batch
+            progress.fail(e)
+        finally:
+            in_flight.release()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start_of_batch = offset
+        for sequence, (lines, end_offset) in enumerate(read_batches(source, offset, batch_lines, batch_bytes)):
+            in_flight.acquire()
+            if progress.error is not None:
+                in_flight.release()
+                break
+            executor.submit(send, sequence, lines, end_offset, end_offset - start_of_batch)
+            start_of_batch = end_offset
+
+    progress.report(final=True)
+    return progress
+
+
 def command_ingest(client, args):
     api = client
 
@@ -37,18 +145,35 @@ def command_ingest(client, args):
         print("[*] Applying parser '" + args.parser + "'")
 
     if args.file:
-        print("[*] Uploading events from '" + args.file + "'")
-        with open(args.file) as sourceFile:
-            events = list(
-                line.strip() for line in sourceFile.readlines() if line.strip()
+        if args.file == "-":
+            print("[*] Uploading events from stdin")
+            source_file = sys.stdin.buffer
+            # stdin cannot be seeked, so resuming skips over the bytes already ingested
+            skipped = 0
+            while skipped < args.offset:
+                chunk = source_file.read(min(args.offset - skipped, 1024 * 1024))
+                if not chunk:
+                    break
+                skipped += len(chunk)
+        else:
+            print("[*] Uploading events from '" + args.file + "'")
+            source_file = open(args.file, "rb")
+            source_file.seek(args.offset)
+
+        try:
+            progress = stream_ingest(
+                api, source_file, args.offset, args.batch_lines, args.batch_bytes, args.concurrency,
+                not args.no_progress, parser=args.parser, fields=fields, tags=tags
             )
-            try:
-                api.ingest_messages(
-                    messages=events, parser=args.parser, fields=fields, tags=tags
-                )
-                print("[OK]")
-            except HumioException as e:
-                print(e)
+        finally:
+            if source_file is not sys.stdin.buffer:
+                source_file.close()
+
+        if progress.error is not None:
+            print(progress.error)
+            print("[*] Resume with --offset {}".format(progress.committed_offset))
+            return 1
+        print("[OK]")
 
     if args.interactive:
         print("[*] Starting interactive mode")
@@ -108,7 +233,37 @@ ingest_parser.add_argument(
 )
 
 ingest_parser.add_argument(
-    "-f", "--file", default=None, help="Path to file with raw events on each line"
+    "-f", "--file", default=None, help="Path to file with raw events on each line, or - to read from stdin"
+)
+ingest_parser.add_argument(
+    "--batch-lines",
+    default=5000,
+    type=int,
+    help="Maximum number of lines sent in one request (default: 5000)",
+)
+ingest_parser.add_argument(
+    "--batch-bytes",
+    default=4 * 1024 * 1024,
+    type=int,
+    help="Maximum number of bytes of lines sent in one request (default: 4194304)",
+)
+ingest_parser.add_argument(
+    "--concurrency",
+    default=4,
+    type=int,
+    help="Number of requests in flight at once (default: 4)",
+)
+ingest_parser.add_argument(
+    "--offset",
+    default=0,
+    type=int,
+    help="Byte offset in the file to start from, used for resuming after a failure (default: 0)",
+)
+ingest_parser.add_argument(
+    "--no-progress",
+    default=False,
+    action="store_true",
+    help="Do not show progress and throughput while ingesting a file",
 )
 ingest_parser.add_argument(
     "-i",
@@ -134,4 +289,4 @@ def main(args=None):
             user_token=args.user_token
         )
 
-    args.func(client, args)
+    return args.func(client, args)
@@ -0,0 +1,74 @@
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubRequest():
+    """
+    A request received by the stub server
+    """
+    def __init__(self, method, path, headers, body, client_address):
+        self.method = method
+        self.path = path
+        self.headers = headers
+        self.body = body
+        self.client_address = client_address
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    wbufsize = -1
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        request = StubRequest(self.command, self.path, dict(self.headers), body, self.client_address)
+        with self.server.lock:
+            self.server.requests.append(request)
+
+        status, headers, response_body = self.server.respond(request)
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        if "Transfer-Encoding" in headers:
+            self.close_connection = True  # The body is framed by the caller, who may cut it short to simulate a drop
+        else:
+            self.send_header("Content-Length", str(len(response_body)))
+        self.end_headers()
+        self.wfile.write(response_body)
+
+    do_GET = _handle
+    do_POST = _handle
+    do_DELETE = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    Local keep-alive http server that records requests and answers with the responses given by `respond`
+    """
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.lock = threading.Lock()
+        self.requests = []
+        self.respond = lambda request: (200, {"Content-Type": "application/json"}, b"{}")
+
+    @property
+    def base_url(self):
+        return "http://127.0.0.1:{}".format(self.server_address[1])
+
+
+@pytest.fixture
+def stub_server():
+    server = StubServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,102 @@
+import json
+import pytest
+
+pyarrow = pytest.importorskip("pyarrow")
+import pyarrow.parquet  # noqa: E402
+
+from humiolib import HumioClient  # noqa: E402
+from humiolib.ArrowResults import ArrowResults, infer_schema  # noqa: E402
+
+
+def _events(count, start=0):
+    return [{"@timestamp": 1600000000000 + i, "host": "server{}".format(i % 3), "bytes": i, "ratio": i / 2}
+            for i in range(start, start + count)]
+
+
+def test_schema_is_inferred_from_sample():
+    schema = infer_schema([
+        {"@timestamp": 1, "count": 1, "ratio": 1, "ok": True, "name": "a", "mixed": 1},
+        {"@timestamp": 2, "count": 2, "ratio": 0.5, "ok": False, "name": None, "mixed": "b"},
+    ])
+
+    assert schema.names == ["@timestamp", "count", "ratio", "ok", "name", "mixed"]
+    assert schema.field("@timestamp").type == pyarrow.timestamp("ms", tz="UTC")
+    assert schema.field("count").type == pyarrow.int64()
+    assert schema.field("ratio").type == pyarrow.float64()
+    assert schema.field("ok").type == pyarrow.bool_()
+    assert schema.field("name").type == pyarrow.string()
+    assert schema.field("mixed").type == pyarrow.string()
+
+
+def test_record_batches_are_bounded_by_batch_size():
+    results = ArrowResults([_events(700), _events(700, start=700)], batch_size=500, sample_size=100)
+
+    batches = list(results)
+
+    assert [batch.num_rows for batch in batches] == [500, 500, 400]
+    assert results.rows == 1400
+    assert batches[2].column("bytes").to_pylist()[-1] == 1399
+
+
+def test_values_not_fitting_schema_are_coerced():
+    events = [{"bytes": 1, "name": "a"}, {"bytes": "many", "name": {"nested": True}, "late": "x"}]
+    results = ArrowResults([events], sample_size=1, widen_schema=False)
+
+    with pytest.warns(UserWarning, match="late"):
+        table = results.to_table()
+
+    assert table.column("bytes").to_pylist() == [1, None]
+    assert table.column("name")[0].as_py() == "a"
+    assert json.loads(table.column("name")[1].as_py()) == {"nested": True}
+    assert results.conversion_errors == 1
+    assert results.unknown_fields == {"late"}
+
+
+def test_schema_is_widened_with_fields_seen_late(tmp_path):
+    late = [dict(event, status=200, path="/") for event in _events(10, start=10)]
+    results = ArrowResults([_events(10), late], batch_size=10, sample_size=10)
+
+    table = results.to_table()
+
+    assert table.schema.names == ["@timestamp", "host", "bytes", "ratio", "status", "path"]
+    assert table.schema.field("status").type == pyarrow.int64()
+    assert table.column("status").to_pylist() == [None] * 10 + [200] * 10
+    assert results.unknown_fields == set()
+
+    path = str(tmp_path / "results.parquet")
+    with pytest.warns(UserWarning, match="status"):
+        ArrowResults([_events(10), late], batch_size=10, sample_size=10).to_parquet(path)
+    assert pyarrow.parquet.read_table(path).num_rows == 20
+
+
+def test_results_can_only_be_iterated_once():
+    results = ArrowResults([_events(10)])
+    results.to_table()
+
+    with pytest.raises(RuntimeError):
+        results.to_table()
+
+
+def test_to_parquet_and_to_pandas(tmp_path):
+    path = str(tmp_path / "results.parquet")
+
+    assert ArrowResults([_events(1000)], batch_size=256).to_parquet(path) == 1000
+    table = pyarrow.parquet.read_table(path)
+    assert table.num_rows == 1000
+    assert table.column("host").to_pylist()[:3] == ["server0", "server1", "server2"]
+
+    pytest.importorskip("pandas")
+    frame = ArrowResults([_events(10)]).to_pandas()
+    assert list(frame.columns) == ["@timestamp", "host", "bytes", "ratio"]
+    assert frame["bytes"].sum() == 45
+
+
+def test_streaming_query_arrow(stub_server):
+    lines = b"".join(json.dumps(event).encode() + b"\n" for event in _events(50))
+    stub_server.respond = lambda request: (200, {}, lines)
+    client = HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url)
+
+    table = client.streaming_query_arrow("*", start="1h", batch_size=20).to_table()
+
+    assert table.num_rows == 50
+    assert table.column("host").to_pylist()[:2] == ["server0", "server1"]
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from humiolib.AsyncHumioClient import AsyncHumioClient, AsyncHumioIngestClient
+from humiolib.AsyncQueryJob import AsyncStaticQueryJob
+from humiolib.AsyncWebCaller import AsyncWebCaller, AsyncWebStreamer
+from humiolib.HumioExceptions import HumioHTTPException, HumioQueryJobExhaustedException, HumioTimeoutException
+
+
+def segment(events, done=True, has_more_events="false"):
+    return json.dumps({
+        "done": done,
+        "cancelled": False,
+        "events": events,
+        "metaData": {"pollAfter": 0, "isAggregate": False, "extraData": {"hasMoreEvents": has_more_events}},
+    }).encode()
+
+
+def test_streaming_query(stub_server):
+    stub_server.respond = lambda request: (200, {}, b'{"a": 1}\n{"a": 2}\n{"a": 3}\n')
+
+    async def run():
+        async with AsyncHumioClient("sandbox", "token", base_url=stub_server.base_url) as client:
+            return [event async for event in client.streaming_query("a=*")]
+
+    assert asyncio.run(run()) == [{"a": 1}, {"a": 2}, {"a": 3}]
+    assert stub_server.requests[0].headers["Accept"] == "application/x-ndjson"
+
+
+def test_poll_until_done_static_queryjob(stub_server):
+    segments = [segment([], done=False), segment([{"a": 1}], has_more_events="true"), segment([{"a": 2}])]
+
+    def respond(request):
+        if request.method == "POST":
+            return 200, {}, b'{"id": "queryjob-id"}'
+        return 200, {}, segments.pop(0)
+    stub_server.respond = respond
+
+    async def run():
+        async with AsyncHumioClient("sandbox", "token", base_url=stub_server.base_url) as client:
+            queryjob = await client.create_queryjob("a=*")
+            assert isinstance(queryjob, AsyncStaticQueryJob)
+            events = []
+            async for poll_result in queryjob.poll_until_done():
+                events.extend(poll_result.events)
+            with pytest.raises(HumioQueryJobExhaustedException):
+                await queryjob.poll()
+            return events
+
+    assert asyncio.run(run()) == [{"a": 1}, {"a": 2}]
+
+
+def test_concurrent_ingest(stub_server):
+    async def run():
+        async with AsyncHumioIngestClient("token", base_url=stub_server.base_url) as client:
+            return await asyncio.gather(*(client.ingest_messages(["message {}".format(i)]) for i in range(20)))
+
+    assert asyncio.run(run()) == [{}] * 20
+    assert len(stub_server.requests) == 20
+
+
+def test_http_errors_are_raised_as_humio_exceptions(stub_server):
+    stub_server.respond = lambda request: (400, {}, b"bad query")
+
+    async def run():
+        async with AsyncHumioClient("sandbox", "token", base_url=stub_server.base_url) as client:
+            await client.create_queryjob("timechart(func=nowork)")
+
+    with pytest.raises(HumioHTTPException) as e:
+        asyncio.run(run())
+    assert e.value.status_code == 400
+
+
+def test_requests_have_no_total_timeout(stub_server):
+    async def run():
+        async with AsyncWebCaller(stub_server.base_url, connect_timeout=5) as webcaller:
+            return webcaller.session.timeout
+
+    timeout = asyncio.run(run())
+    assert timeout.total is None
+    assert timeout.sock_connect == 5
+
+
+def test_stalled_streams_raise_humio_timeout_exception():
+    class StalledContent():
+        async def iter_chunked(self, chunk_size):
+            yield b'{"a": 1}\n'
+            raise asyncio.TimeoutError()
+
+    class StalledResponse():
+        content = StalledContent()
+        released = False
+
+        def release(self):
+            self.released = True
+
+    response = StalledResponse()
+
+    async def run():
+        events = []
+        with pytest.raises(HumioTimeoutException):
+            async for line in AsyncWebStreamer(response):
+                events.append(line)
+        return events
+
+    assert asyncio.run(run()) == [b'{"a": 1}']
+    assert response.released
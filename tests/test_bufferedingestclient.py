@@ -0,0 +1,90 @@
+import json
+import pytest
+from humiolib import BufferedIngestClient
+from humiolib.HumioExceptions import HumioHTTPException
+
+
+def test_events_sharing_tags_are_merged_into_one_request(stub_server):
+    with BufferedIngestClient("token", base_url=stub_server.base_url, max_linger=60) as client:
+        for i in range(10):
+            client.add_event({"timestamp": i, "attributes": {"i": i}}, tags={"host": "server1"})
+        for i in range(5):
+            client.add_event({"timestamp": i}, tags={"host": "server2"})
+
+    assert len(stub_server.requests) == 1
+    request = stub_server.requests[0]
+    assert request.path == "/api/v1/ingest/humio-structured"
+    payload = json.loads(request.body)
+    assert [obj["tags"] for obj in payload] == [{"host": "server1"}, {"host": "server2"}]
+    assert [len(obj["events"]) for obj in payload] == [10, 5]
+    assert client.sent_events == 15
+
+
+def test_messages_are_grouped_by_parser_fields_and_tags(stub_server):
+    with BufferedIngestClient("token", base_url=stub_server.base_url, max_linger=60) as client:
+        client.add_message("a", parser="kv")
+        client.add_message("b", parser="kv")
+        client.add_message("c", parser="json", tags={"host": "server1"})
+
+    payload = json.loads(stub_server.requests[0].body)
+    assert stub_server.requests[0].path == "/api/v1/ingest/humio-unstructured"
+    assert payload == [
+        {"messages": ["a", "b"], "type": "kv"},
+        {"messages": ["c"], "type": "json", "tags": {"host": "server1"}},
+    ]
+
+
+def test_batches_are_split_by_max_batch_size(stub_server):
+    with BufferedIngestClient("token", base_url=stub_server.base_url, max_batch_size=4, max_linger=60) as client:
+        for i in range(10):
+            client.add_message(str(i))
+        client.flush()
+        assert client.sent_events == 10
+
+    assert sorted(len(json.loads(r.body)[0]["messages"]) for r in stub_server.requests) == [2, 4, 4]
+
+
+def test_failed_batches_are_reported_to_error_callback(stub_server):
+    stub_server.respond = lambda request: (503, {}, b"unavailable")
+    errors = []
+    with BufferedIngestClient("token", base_url=stub_server.base_url,
+                              error_callback=lambda e, count: errors.append((e, count))) as client:
+        client.add_message("lost")
+
+    assert client.dropped_events == 1
+    assert isinstance(errors[0][0], HumioHTTPException)
+    assert errors[0][1] == 1
+
+
+def test_events_that_cannot_be_sent_raise_without_stopping_the_client(stub_server):
+    with BufferedIngestClient("token", base_url=stub_server.base_url, max_linger=60) as client:
+        with pytest.raises(TypeError):
+            client.add_event({"timestamp": 0, "attributes": {"x": {1, 2}}})
+        with pytest.raises(TypeError):
+            client.add_event({"timestamp": 0}, tags={"host": ["server1"]})
+        with pytest.raises(TypeError):
+            client.add_message("message", fields={"raw": b"bytes"})
+        for i in range(3):
+            client.add_event({"timestamp": i})
+        client.flush()
+        assert client.sent_events == 3
+
+    assert [len(obj["events"]) for obj in json.loads(stub_server.requests[0].body)] == [3]
+
+
+def test_unexpected_errors_while_sending_are_reported_to_error_callback(stub_server):
+    errors = []
+    client = BufferedIngestClient("token", base_url=stub_server.base_url, max_linger=60,
+                                  error_callback=lambda e, count: errors.append((e, count)))
+
+    def post_ingest_body(endpoint, body):
+        raise RuntimeError("connection pool is broken")
+    client._post_ingest_body = post_ingest_body
+
+    client.add_event({"timestamp": 0})
+    client.add_message("message")
+    client.close()
+
+    assert [(str(e), count) for e, count in errors] == [("connection pool is broken", 1)] * 2
+    assert client.dropped_events == 2
+    assert client.sent_events == 0
@@ -0,0 +1,107 @@
+import json
+import re
+import threading
+from humiolib import HumioClient
+from humiolib.HumioExceptions import HumioHTTPException
+
+
+def _client(stub_server):
+    return HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url)
+
+
+def _serve_saved_queries(stub_server, saved_queries, failing_requests=()):
+    """
+    Serves saved queries held in memory, applying merged create, update and delete mutations to them
+    """
+    lock = threading.Lock()
+
+    def respond(request):
+        body = json.loads(request.body)
+        query, variables = body["query"], body["variables"]
+        if query.startswith("query"):
+            return 200, {}, json.dumps({"data": {"repository": {"savedQueries": list(saved_queries.values())}}}).encode()
+
+        if any(item.get("name") in failing_requests for item in variables.values()):
+            return 500, {}, b"Internal error"
+        data = {}
+        errors = []
+        with lock:
+            for alias, field, index in re.findall(r"(op(?:\d+)): (\w+)\(input: \$input_(\d+)\)", query):
+                item = variables["input_" + index]
+                if field == "createSavedQuery":
+                    if item["name"] in [saved_query["name"] for saved_query in saved_queries.values()]:
+                        data[alias] = None
+                        errors.append({"message": "Name taken", "path": [alias]})
+                        continue
+                    saved_id = "id-" + item["name"]
+                    saved_queries[saved_id] = {"id": saved_id, "name": item["name"],
+                                               "query": {"queryString": item["queryString"]}}
+                elif field == "updateSavedQuery":
+                    saved_id = item["id"]
+                    saved_queries[saved_id]["query"]["queryString"] = item["queryString"]
+                else:
+                    saved_id = item["id"]
+                    del saved_queries[saved_id]
+                data[alias] = {"savedQuery": {"id": saved_id}}
+        return 200, {}, json.dumps({"data": data, "errors": errors}).encode()
+
+    stub_server.respond = respond
+
+
+def test_create_saved_queries_reports_every_item_without_failing_fast(stub_server):
+    saved_queries = {"id-q7": {"id": "id-q7", "name": "q7", "query": {"queryString": "*"}}}
+    _serve_saved_queries(stub_server, saved_queries, failing_requests={"q60"})
+    client = _client(stub_server)
+
+    results = client.create_saved_queries([("q{}".format(i), "count()") for i in range(120)],
+                                          concurrency=2, batch_size=50)
+
+    assert len(stub_server.requests) == 3
+    assert len(results) == 120
+    assert results[0].data == {"savedQuery": {"id": "id-q0"}}
+    assert results[7].errors[0]["message"] == "Name taken"
+    assert all(isinstance(result.exception, HumioHTTPException) for result in results[50:100])
+    assert [i for i, result in enumerate(results) if result.ok] == [i for i in range(120) if i != 7 and not 50 <= i < 100]
+    assert len(saved_queries) == 70
+
+
+def test_apply_saved_queries_diffs_against_existing_state(stub_server):
+    saved_queries = {
+        "id-a": {"id": "id-a", "name": "a", "query": {"queryString": "count()"}},
+        "id-b": {"id": "id-b", "name": "b", "query": {"queryString": "old"}},
+        "id-c": {"id": "id-c", "name": "c", "query": {"queryString": "*"}},
+    }
+    _serve_saved_queries(stub_server, saved_queries)
+    client = _client(stub_server)
+
+    report = client.apply_saved_queries({"a": "count()", "b": "new", "d": "groupby(host)"}, delete_missing=True)
+
+    assert report["unchanged"] == ["a"]
+    assert list(report["created"]) == ["d"] and list(report["updated"]) == ["b"] and list(report["deleted"]) == ["c"]
+    assert all(result.ok for change in ("created", "updated", "deleted") for result in report[change].values())
+    assert {saved_query["name"]: saved_query["query"]["queryString"] for saved_query in saved_queries.values()} == {
+        "a": "count()", "b": "new", "d": "groupby(host)"
+    }
+    assert len(stub_server.requests) == 2
+
+
+def test_delete_files_returns_result_per_file(stub_server):
+    def respond(request):
+        body = json.loads(request.body)
+        data = {}
+        errors = []
+        for alias, index in re.findall(r"(op(\d+)): removeFile", body["query"]):
+            if body["variables"]["fileName_" + index] == "missing.csv":
+                data[alias] = None
+                errors.append({"message": "Not found", "path": [alias]})
+            else:
+                data[alias] = {"__typename": "BooleanResultType"}
+        return 200, {}, json.dumps({"data": data, "errors": errors}).encode()
+
+    stub_server.respond = respond
+    client = _client(stub_server)
+
+    results = client.delete_files(["a.csv", "missing.csv", "b.csv"])
+
+    assert [result.ok for result in results] == [True, False, True]
+    assert len(stub_server.requests) == 1
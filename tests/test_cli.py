@@ -0,0 +1,60 @@
+import json
+from humiolib import cli
+from humiolib.HumioClient import HumioIngestClient
+
+
+def ingested_messages(stub_server):
+    return [message for request in stub_server.requests for message in json.loads(request.body)[0]["messages"]]
+
+
+def test_ingest_file_in_batches(stub_server, tmp_path):
+    path = tmp_path / "events.log"
+    path.write_text("".join("event {}\n".format(i) for i in range(25)) + "\n")
+
+    cli.main(["--host", stub_server.base_url, "-t", "token", "ingest", "-f", str(path),
+              "--batch-lines", "10", "--concurrency", "2", "--no-progress"])
+
+    assert len(stub_server.requests) == 3
+    assert sorted(ingested_messages(stub_server), key=lambda m: int(m.split()[1])) == \
+        ["event {}".format(i) for i in range(25)]
+
+
+def test_ingest_file_from_offset(stub_server, tmp_path):
+    path = tmp_path / "events.log"
+    path.write_bytes(b"first\nsecond\nthird\n")
+
+    cli.main(["--host", stub_server.base_url, "-t", "token", "ingest", "-f", str(path),
+              "--offset", str(len(b"first\n")), "--no-progress"])
+
+    assert ingested_messages(stub_server) == ["second", "third"]
+
+
+def test_failed_ingest_reports_offset_to_resume_from(stub_server, tmp_path, capsys):
+    path = tmp_path / "events.log"
+    path.write_bytes(b"first\nsecond\nthird\n")
+    responses = [(200, {}, b"{}"), (503, {}, b"unavailable")]
+    stub_server.respond = lambda request: responses.pop(0) if responses else (200, {}, b"{}")
+
+    status = cli.main(["--host", stub_server.base_url, "-t", "token", "ingest", "-f", str(path),
+                       "--batch-lines", "1", "--concurrency", "1", "--no-progress"])
+
+    assert status == 1
+    assert "Resume with --offset {}".format(len(b"first\n")) in capsys.readouterr().out
+
+
+def test_unexpected_errors_fail_the_ingest(stub_server, tmp_path, capsys, monkeypatch):
+    path = tmp_path / "events.log"
+    path.write_bytes(b"first\nsecond\n")
+
+    def ingest_messages(self, messages=None, **kwargs):
+        if messages == ["second"]:
+            raise RuntimeError("unexpected")
+
+    monkeypatch.setattr(HumioIngestClient, "ingest_messages", ingest_messages)
+    status = cli.main(["--host", stub_server.base_url, "-t", "token", "ingest", "-f", str(path),
+                       "--batch-lines", "1", "--concurrency", "1", "--no-progress"])
+
+    output = capsys.readouterr().out
+    assert status == 1
+    assert "[OK]" not in output
+    assert "Resume with --offset {}".format(len(b"first\n")) in output
@@ -0,0 +1,76 @@
+import json
+import pytest
+from humiolib import HumioClient
+from humiolib.CompactEvents import CompactEvents
+from humiolib.QueryJob import PollResult
+
+events = [
+    {"host": "server1", "_count": "10"},
+    {"host": "server2", "_count": "20"},
+    {"@timestamp": 1, "@rawstring": "raw"},
+]
+
+
+def test_events_are_materialized_as_dictionaries():
+    compact = CompactEvents(events)
+
+    assert len(compact) == 3
+    assert compact[1] == {"host": "server2", "_count": "20"}
+    assert compact[-1] == {"@timestamp": 1, "@rawstring": "raw"}
+    assert compact[:2] == events[:2]
+    assert list(compact) == events
+    assert compact == events
+    assert events[0] in compact
+
+
+def test_events_sharing_field_names_share_one_key_table():
+    compact = CompactEvents(events)
+
+    assert compact.key_tables == [("host", "_count"), ("@timestamp", "@rawstring")]
+    assert compact.row(1) == (("host", "_count"), ("server2", "20"))
+    assert compact.row(0)[0] is compact.row(1)[0]
+
+
+def test_materialized_events_are_copies():
+    compact = CompactEvents(events)
+    compact[0]["host"] = "changed"
+
+    assert compact[0]["host"] == "server1"
+
+
+def test_poll_result_has_no_instance_dictionary():
+    with pytest.raises(AttributeError):
+        PollResult([], {}).extra = True
+
+
+def test_queryjob_polls_into_compact_events(stub_server):
+    segment = {
+        "done": True,
+        "cancelled": False,
+        "events": events[:2],
+        "metaData": {"pollAfter": 0, "isAggregate": True, "extraData": {}},
+    }
+
+    def respond(request):
+        if request.method == "POST":
+            return 200, {}, b'{"id": "query-id"}'
+        return 200, {}, json.dumps(segment).encode()
+
+    stub_server.respond = respond
+    client = HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url)
+    queryjob = client.create_queryjob("groupby(host)", compact_events=True)
+
+    poll_result = queryjob.poll()
+
+    assert isinstance(poll_result.events, CompactEvents)
+    assert list(poll_result.events) == events[:2]
+
+
+def test_consume_empties_the_list():
+    events = [{"host": "a", "_count": "1"}, {"host": "b", "_count": "2"}]
+    expected = [dict(event) for event in events]
+
+    compact = CompactEvents.consume(events)
+
+    assert events == []
+    assert compact == expected
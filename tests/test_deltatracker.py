@@ -0,0 +1,122 @@
+import json
+import queue
+from humiolib import HumioClient
+from humiolib.DeltaTracker import DeltaTracker
+from humiolib.QueryJobScheduler import QueryJobScheduler
+
+
+def test_first_update_adds_every_row():
+    tracker = DeltaTracker(key_fields=["host"])
+    delta = tracker.update([{"host": "a", "_count": "1"}, {"host": "b", "_count": "2"}])
+
+    assert delta.added == [{"host": "a", "_count": "1"}, {"host": "b", "_count": "2"}]
+    assert delta.changed == [] and delta.removed == []
+
+
+def test_rows_are_matched_by_key_fields():
+    tracker = DeltaTracker(key_fields=["host", "service"])
+    tracker.update([
+        {"host": "a", "service": "web", "_count": "1"},
+        {"host": "a", "service": "db", "_count": "1"},
+        {"host": "b", "service": "web", "_count": "1"},
+    ])
+
+    delta = tracker.update([
+        {"host": "a", "service": "web", "_count": "2"},
+        {"host": "b", "service": "web", "_count": "1"},
+        {"host": "c", "service": "web", "_count": "1"},
+    ])
+
+    assert delta.added == [{"host": "c", "service": "web", "_count": "1"}]
+    assert delta.changed == [({"host": "a", "service": "web", "_count": "1"}, {"host": "a", "service": "web", "_count": "2"})]
+    assert delta.removed == [{"host": "a", "service": "db", "_count": "1"}]
+
+
+def test_unchanged_results_give_empty_delta():
+    tracker = DeltaTracker()
+    events = [{"@id": "1", "@rawstring": "a"}, {"@id": "2", "@rawstring": "b"}]
+    tracker.update(events)
+
+    assert not tracker.update([dict(event) for event in events])
+    assert not tracker.update(list(reversed(events)))
+    assert tracker.unchanged_polls == 2
+    assert tracker.changed_polls == 1
+
+
+def test_rows_without_id_or_key_are_matched_by_content():
+    tracker = DeltaTracker()
+    tracker.update([{"_count": "1"}])
+
+    delta = tracker.update([{"_count": "2"}])
+
+    assert delta.added == [{"_count": "2"}]
+    assert delta.removed == [{"_count": "1"}]
+
+
+def test_live_queryjob_poll_delta(stub_server):
+    results = iter([[{"host": "a", "_count": "1"}], [{"host": "a", "_count": "1"}], [{"host": "a", "_count": "5"}]])
+
+    def respond(request):
+        if request.method == "POST":
+            return 200, {}, b'{"id": "live"}'
+        if request.method == "DELETE":
+            return 204, {}, b""
+        return 200, {}, json.dumps({
+            "done": True, "cancelled": False, "events": next(results),
+            "metaData": {"pollAfter": 0, "isAggregate": True, "extraData": {}},
+        }).encode()
+
+    stub_server.respond = respond
+    client = HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url)
+    queryjob = client.create_queryjob("groupby(host)", is_live=True)
+
+    assert queryjob.poll_delta(key_fields=["host"]).added == [{"host": "a", "_count": "1"}]
+    assert not queryjob.poll_delta()
+    delta = queryjob.poll_delta()
+    assert delta.changed == [({"host": "a", "_count": "1"}, {"host": "a", "_count": "5"})]
+    assert delta.metadata["isAggregate"]
+
+
+def test_scheduler_only_delivers_changes(stub_server):
+    polls = {"count": 0}
+
+    def respond(request):
+        if request.method == "POST":
+            return 200, {}, b'{"id": "live"}'
+        if request.method == "DELETE":
+            return 204, {}, b""
+        polls["count"] += 1
+        count = "1" if polls["count"] < 5 else "2"
+        return 200, {}, json.dumps({
+            "done": True, "cancelled": False, "events": [{"host": "a", "_count": count}],
+            "metaData": {"pollAfter": 10, "isAggregate": True, "extraData": {}},
+        }).encode()
+
+    stub_server.respond = respond
+    client = HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url)
+    results = queue.Queue()
+
+    with QueryJobScheduler(workers=1) as scheduler:
+        scheduler.add(client.create_queryjob("groupby(host)", is_live=True), results=results,
+                      delta=True, key_fields=["host"])
+        first = results.get(timeout=5)[1]
+        second = results.get(timeout=5)[1]
+
+    assert first.added == [{"host": "a", "_count": "1"}]
+    assert second.changed == [({"host": "a", "_count": "1"}, {"host": "a", "_count": "2"})]
+    assert polls["count"] >= 5
+
+
+def test_rows_sharing_a_key_are_all_tracked():
+    tracker = DeltaTracker()
+    delta = tracker.update([{"_count": "1"}, {"_count": "1"}, {"_count": "2"}])
+    assert len(delta.added) == 3
+
+    delta = tracker.update([{"_count": "1"}, {"_count": "2"}])
+    assert delta.added == [] and delta.changed == []
+    assert delta.removed == [{"_count": "1"}]
+
+    tracker = DeltaTracker(key_fields=["host"])
+    tracker.update([{"host": "a", "service": "web"}, {"host": "a", "service": "db"}])
+    delta = tracker.update([{"host": "a", "service": "web"}, {"host": "a", "service": "queue"}])
+    assert delta.changed == [({"host": "a", "service": "db"}, {"host": "a", "service": "queue"})]
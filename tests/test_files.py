@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import pytest
+from humiolib import HumioClient
+from humiolib.HumioExceptions import HumioChecksumException
+
+
+def _client(stub_server):
+    return HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url)
+
+
+def _serve_file_content(stub_server, lines, delay=0.0):
+    """
+    Answers getFileContent queries with the requested page of the given lines, tracking concurrent requests
+    """
+    state = {"active": 0, "max_active": 0}
+    lock = threading.Lock()
+
+    def respond(request):
+        variables = json.loads(request.body)["variables"]
+        offset, limit = variables["offset"], variables["limit"]
+        with lock:
+            state["active"] += 1
+            state["max_active"] = max(state["max_active"], state["active"])
+        time.sleep(delay)
+        with lock:
+            state["active"] -= 1
+        content = {
+            "totalLinesCount": len(lines),
+            "limit": limit,
+            "offset": offset,
+            "headers": ["key", "value"],
+            "lines": lines[offset:offset + limit],
+        }
+        return 200, {}, json.dumps({"data": {"getFileContent": content}}).encode()
+
+    stub_server.respond = respond
+    return state
+
+
+def test_iter_file_content_returns_pages_in_order(stub_server):
+    lines = [[str(i), "value {}".format(i)] for i in range(1050)]
+    _serve_file_content(stub_server, lines)
+    client = _client(stub_server)
+
+    pages = list(client.iter_file_content("lookup.csv", page_size=100, prefetch=3))
+
+    assert [page["offset"] for page in pages] == list(range(0, 1050, 100))
+    assert [line for page in pages for line in page["lines"]] == lines
+    assert pages[0]["headers"] == ["key", "value"]
+    assert len(stub_server.requests) == 11
+
+
+def test_iter_file_content_prefetches_pages_concurrently(stub_server):
+    lines = [[str(i), "value"] for i in range(1000)]
+    state = _serve_file_content(stub_server, lines, delay=0.1)
+    client = _client(stub_server)
+
+    started = time.time()
+    pages = list(client.iter_file_content("lookup.csv", page_size=100, prefetch=4))
+
+    assert len(pages) == 10
+    assert state["max_active"] == 4
+    assert time.time() - started < 0.8
+
+
+def test_iter_file_content_stops_fetching_when_closed(stub_server):
+    lines = [[str(i), "value"] for i in range(1000)]
+    _serve_file_content(stub_server, lines)
+    client = _client(stub_server)
+
+    pages = client.iter_file_content("lookup.csv", page_size=100, prefetch=2)
+    next(pages)
+    next(pages)
+    pages.close()
+
+    assert len(stub_server.requests) <= 4
+
+
+def test_upload_file_streams_multipart_body(stub_server, tmp_path):
+    path = tmp_path / "lookup.csv"
+    content = b"key,value\n" + b"".join(b"%d,value\n" % i for i in range(100000))
+    path.write_bytes(content)
+    progress = []
+    client = _client(stub_server)
+
+    client.upload_file(str(path), progress_callback=lambda sent, total: progress.append((sent, total)), chunk_size=65536)
+
+    request = stub_server.requests[0]
+    boundary = request.headers["Content-Type"].split("boundary=")[1]
+    assert request.path == "/api/v1/dataspaces/sandbox/files"
+    assert int(request.headers["Content-Length"]) == len(request.body)
+    assert b'name="file"; filename="lookup.csv"' in request.body
+    assert request.body.endswith(b"\r\n--" + boundary.encode() + b"--\r\n")
+    assert request.body.split(b"\r\n\r\n", 1)[1][:-len(boundary) - 8] == content
+    assert progress[-1] == (len(content), len(content))
+    assert len(progress) == -(-len(content) // 65536)
+
+
+def test_download_file_streams_to_disk_and_verifies_checksum(stub_server, tmp_path):
+    content = bytes(range(256)) * 10000
+    stub_server.respond = lambda request: (200, {}, content)
+    client = _client(stub_server)
+    dest = str(tmp_path / "lookup.csv")
+    progress = []
+
+    digest = client.download_file("lookup.csv", dest, chunk_size=65536, checksum=hashlib.sha256(content).hexdigest(),
+                                  progress_callback=lambda received, total: progress.append((received, total)))
+
+    assert open(dest, "rb").read() == content
+    assert digest == hashlib.sha256(content).hexdigest()
+    assert progress[-1] == (len(content), len(content))
+    assert stub_server.requests[0].path == "/api/v1/dataspaces/sandbox/files/lookup.csv"
+
+
+def test_download_file_with_wrong_checksum_leaves_nothing_behind(stub_server, tmp_path):
+    stub_server.respond = lambda request: (200, {}, b"key,value\n")
+    client = _client(stub_server)
+    dest = str(tmp_path / "lookup.csv")
+
+    with pytest.raises(HumioChecksumException):
+        client.download_file("lookup.csv", dest, checksum="0" * 64)
+
+    assert os.listdir(str(tmp_path)) == []
+
+
+def _serve_file(stub_server, headers, rows):
+    """
+    Serves a file held in memory, applying updateFile mutations to it
+    """
+    updates = []
+    lock = threading.Lock()
+
+    def respond(request):
+        body = json.loads(request.body)
+        with lock:
+            if "updateFile" in body["query"]:
+                variables = body["variables"]
+                offset, limit = variables["offset"], variables["limit"]
+                rows[offset:offset + limit] = variables["changedRows"]
+                headers[:] = variables["headers"]
+                updates.append((offset, limit, len(variables["changedRows"])))
+                return 200, {}, b'{"data": {"updateFile": {}}}'
+            offset, limit = body["variables"]["offset"], body["variables"]["limit"]
+            content = {"totalLinesCount": len(rows), "limit": limit, "offset": offset, "headers": headers,
+                       "lines": rows[offset:offset + limit]}
+            return 200, {}, json.dumps({"data": {"getFileContent": content}}).encode()
+
+    stub_server.respond = respond
+    return updates
+
+
+def test_sync_file_sends_only_changed_blocks(stub_server):
+    remote = [[str(i), "value {}".format(i)] for i in range(1000)]
+    local = [list(row) for row in remote] + [[str(i), "new"] for i in range(1000, 1030)]
+    local[250][1] = "changed"
+    local[730][1] = "changed"
+    updates = _serve_file(stub_server, ["key", "value"], remote)
+    client = _client(stub_server)
+
+    result = client.sync_file("lookup.csv", ["key", "value"], local, block_size=100, page_size=300)
+
+    assert remote == local
+    assert sorted(updates) == [(200, 100, 100), (700, 100, 100), (1000, 0, 30)]
+    assert result == {"blocks": 11, "changed_blocks": 3, "rows_sent": 230}
+
+
+def test_sync_file_truncates_and_rewrites_on_new_headers(stub_server):
+    remote = [[str(i), "value"] for i in range(450)]
+    headers = ["key", "value"]
+    local = [[str(i), "value", "extra"] for i in range(120)]
+    updates = _serve_file(stub_server, headers, remote)
+    client = _client(stub_server)
+
+    client.sync_file("lookup.csv", ["key", "value", "extra"], local, block_size=100)
+
+    assert remote == local
+    assert headers == ["key", "value", "extra"]
+    assert sorted(updates) == [(0, 100, 100), (100, 350, 20)]
+
+
+def test_sync_file_without_changes_sends_nothing(stub_server):
+    remote = [[str(i), "value"] for i in range(500)]
+    updates = _serve_file(stub_server, ["key", "value"], remote)
+    client = _client(stub_server)
+
+    result = client.sync_file("lookup.csv", ["key", "value"], [list(row) for row in remote], block_size=100)
+
+    assert updates == []
+    assert result["changed_blocks"] == 0
+
+
+def test_sync_file_skips_unchanged_partial_tail(stub_server):
+    remote = [[str(i), "value"] for i in range(530)]
+    updates = _serve_file(stub_server, ["key", "value"], remote)
+    client = _client(stub_server)
+
+    result = client.sync_file("lookup.csv", ["key", "value"], [list(row) for row in remote], block_size=100)
+
+    assert updates == []
+    assert result == {"blocks": 6, "changed_blocks": 0, "rows_sent": 0}
+
+    local = [list(row) for row in remote]
+    local[520][1] = "changed"
+    client.sync_file("lookup.csv", ["key", "value"], local, block_size=100)
+
+    assert remote == local
+    assert updates == [(500, 30, 30)]
+
+
+def test_sync_file_sends_new_headers_of_empty_file(stub_server):
+    headers = ["key", "value"]
+    updates = _serve_file(stub_server, headers, [])
+    client = _client(stub_server)
+
+    result = client.sync_file("lookup.csv", ["key", "value", "extra"], [], block_size=100)
+
+    assert headers == ["key", "value", "extra"]
+    assert updates == [(0, 0, 0)]
+    assert result == {"blocks": 0, "changed_blocks": 1, "rows_sent": 0}
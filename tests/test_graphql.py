@@ -0,0 +1,125 @@
+import json
+import re
+from humiolib import HumioClient
+from humiolib import GraphQL
+from humiolib.GraphQL import GraphQLOperation
+
+
+def _client(stub_server):
+    return HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url)
+
+
+def _serve_aliased(stub_server, failing_names=()):
+    """
+    Answers merged documents with the input variable of every aliased operation, failing those with the given names
+    """
+    def respond(request):
+        body = json.loads(request.body)
+        data = {}
+        errors = []
+        for alias, index in re.findall(r"(op(\d+)): \w+", body["query"]):
+            name = body["variables"]["input_" + index]["name"]
+            if name in failing_names:
+                data[alias] = None
+                errors.append({"message": "Duplicate name", "path": [alias]})
+            else:
+                data[alias] = {"savedQuery": {"id": "id-" + name, "name": name}}
+        return 200, {}, json.dumps({"data": data, "errors": errors}).encode()
+
+    stub_server.respond = respond
+
+
+def test_operations_are_compiled_once():
+    operation = GraphQLOperation("mutation", {"fileName": "String!", "repo": "String!"},
+                                 "newFile(fileName: $fileName, name: $repo){nameAndPath { name, path}}")
+
+    assert operation.document == ("mutation($fileName: String!, $repo: String!)"
+                                  "{newFile(fileName: $fileName, name: $repo){nameAndPath { name, path}}}")
+    assert operation.aliased(3, {"fileName": "a.csv", "repo": "sandbox"}) == (
+        "op3: newFile(fileName: $fileName_3, name: $repo_3){nameAndPath { name, path}}",
+        "$fileName_3: String!, $repo_3: String!",
+        {"fileName_3": "a.csv", "repo_3": "sandbox"},
+    )
+    assert GraphQL.LIST_ORGANIZATIONS.document == "query{organizations{id, name, description}}"
+
+
+def test_batch_merges_operations_into_aliased_documents(stub_server):
+    _serve_aliased(stub_server, failing_names={"q3"})
+    batch = _client(stub_server).graphql_batch(max_batch_size=500)
+    for i in range(2000):
+        batch.add(GraphQL.CREATE_SAVED_QUERY, {"input": {"name": "q{}".format(i), "viewName": "sandbox", "queryString": "*"}})
+
+    results = batch.execute()
+
+    assert len(stub_server.requests) == batch.requests == 4
+    assert len(results) == 2000 and len(batch) == 0
+    assert results[1999].data == {"savedQuery": {"id": "id-q1999", "name": "q1999"}}
+    assert not results[3].ok and results[3].errors[0]["message"] == "Duplicate name"
+    assert all(result.ok for i, result in enumerate(results) if i != 3)
+
+    first = json.loads(stub_server.requests[0].body)
+    assert first["query"].startswith("mutation($input_0: CreateSavedQueryInput!, $input_1: CreateSavedQueryInput!")
+    assert "op499: createSavedQuery(input: $input_499)" in first["query"]
+
+
+def test_queries_and_mutations_are_sent_separately(stub_server):
+    def respond(request):
+        query = json.loads(request.body)["query"]
+        if query.startswith("query"):
+            return 200, {}, b'{"data": {"op1": {"files": []}}}'
+        return 200, {}, b'{"data": {"op0": {"__typename": "BooleanResultType"}}}'
+
+    stub_server.respond = respond
+    batch = _client(stub_server).graphql_batch()
+    batch.add(GraphQL.DELETE_FILE, {"fileName": "a.csv", "repo": "sandbox"})
+    batch.add(GraphQL.LIST_FILES, {"name": "sandbox"})
+
+    results = batch.execute()
+
+    assert [json.loads(r.body)["query"].split("(")[0] for r in stub_server.requests] == ["query", "mutation"]
+    assert results[0].data == {"__typename": "BooleanResultType"}
+    assert results[1].data == {"files": []}
+
+
+def test_document_wide_errors_fail_every_operation(stub_server):
+    stub_server.respond = lambda request: (200, {}, b'{"errors": [{"message": "Syntax error"}]}')
+    batch = _client(stub_server).graphql_batch()
+    batch.add(GraphQL.LIST_FILES, {"name": "a"})
+    batch.add(GraphQL.LIST_FILES, {"name": "b"})
+
+    results = batch.execute()
+
+    assert [result.errors for result in results] == [[{"message": "Syntax error"}]] * 2
+
+
+def test_array_mode_sends_batched_requests(stub_server):
+    def respond(request):
+        body = json.loads(request.body)
+        return 200, {}, json.dumps([
+            {"data": {"searchDomain": {"name": item["variables"]["name"]}}} for item in body
+        ]).encode()
+
+    stub_server.respond = respond
+    batch = _client(stub_server).graphql_batch(max_batch_size=2, mode="array")
+    for name in ["a", "b", "c"]:
+        batch.add(GraphQL.LIST_FILES, {"name": name})
+
+    results = batch.execute()
+
+    assert len(stub_server.requests) == 2
+    assert [result.data for result in results] == [{"name": "a"}, {"name": "b"}, {"name": "c"}]
+    assert json.loads(stub_server.requests[0].body)[0]["query"] == GraphQL.LIST_FILES.document
+
+
+def test_array_mode_fails_every_operation_on_unbatched_response(stub_server):
+    responses = [b'{"errors": [{"message": "Batching not supported"}]}', b'[{"data": {}}]']
+    stub_server.respond = lambda request: (200, {}, responses.pop(0))
+    batch = _client(stub_server).graphql_batch(max_batch_size=2, mode="array")
+    for name in ["a", "b", "c", "d"]:
+        batch.add(GraphQL.LIST_FILES, {"name": name})
+
+    results = batch.execute()
+
+    assert [result.data for result in results] == [None] * 4
+    assert results[0].errors == results[1].errors == [{"message": "Batching not supported"}]
+    assert results[2].errors == results[3].errors == [{"message": "Expected a list of 2 results in response to a batched request"}]
@@ -1,6 +1,8 @@
 import pytest
 import vcr
 import os
+import gzip
+import json
 from humiolib import HumioClient, HumioIngestClient
 from humiolib.HumioExceptions import HumioHTTPException
 
@@ -121,3 +123,44 @@ def test_ingest_json_on_ingestclient_success(ingestclient):
     assert response == {}
 
 
+
+# COMPRESSION TESTS
+def test_ingest_body_is_gzip_compressed_above_threshold(stub_server):
+    client = HumioIngestClient(ingest_token="token", base_url=stub_server.base_url, compression="gzip",
+                               compression_threshold=100)
+    messages = ["message number {}".format(i) for i in range(100)]
+    client.ingest_messages(messages)
+    client.ingest_messages(["small"])
+
+    large, small = stub_server.requests
+    assert large.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(large.body))[0]["messages"] == messages
+    assert "Content-Encoding" not in small.headers
+    assert json.loads(small.body)[0]["messages"] == ["small"]
+
+
+def test_ingest_body_is_zstd_compressed(stub_server):
+    zstandard = pytest.importorskip("zstandard")
+    client = HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url,
+                         compression="zstd", compression_threshold=0)
+    data = [{"events": [{"timestamp": 0, "attributes": {"key1": "value1"}}]}]
+    client.ingest_json_data(data)
+
+    request = stub_server.requests[0]
+    assert request.headers["Content-Encoding"] == "zstd"
+    assert json.loads(zstandard.ZstdDecompressor().decompress(request.body)) == data
+
+
+def test_unsupported_compression_fails():
+    with pytest.raises(ValueError):
+        HumioIngestClient(ingest_token="token", compression="lz4")
+
+
+def test_streaming_query_in_batches(stub_server):
+    stub_server.respond = lambda request: (200, {}, b"".join(b'{"i": %d}\n' % i for i in range(10)))
+    client = HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url)
+
+    batches = list(client.streaming_query("i=*", batch_size=4))
+
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert [event["i"] for batch in batches for event in batch] == list(range(10))
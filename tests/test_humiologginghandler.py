@@ -0,0 +1,139 @@
+import json
+import logging
+import threading
+from humiolib.HumioLoggingHandler import HumioLoggingHandler
+from humiolib.HumioExceptions import HumioHTTPException
+
+
+def _logger(handler, name="test_humiologginghandler"):
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    return logger
+
+
+def test_records_are_sent_as_structured_events(stub_server):
+    handler = HumioLoggingHandler("token", base_url=stub_server.base_url, tags={"host": "server1"}, max_linger=60)
+    logger = _logger(handler)
+
+    logger.info("Login attempt %s failed", "alice", extra={"attempts": 3})
+    logger.warning("Disk almost full")
+    handler.close()
+
+    assert len(stub_server.requests) == 1
+    request = stub_server.requests[0]
+    assert request.path == "/api/v1/ingest/humio-structured"
+    payload = json.loads(request.body)
+    assert payload[0]["tags"] == {"host": "server1"}
+    first, second = payload[0]["events"]
+    assert isinstance(first["timestamp"], int)
+    assert first["attributes"]["message"] == "Login attempt alice failed"
+    assert first["attributes"]["level"] == "INFO"
+    assert first["attributes"]["logger"] == "test_humiologginghandler"
+    assert first["attributes"]["attempts"] == 3
+    assert second["attributes"]["level"] == "WARNING"
+    assert handler.sent_records == 2
+
+
+def test_formatted_record_is_sent_as_rawstring(stub_server):
+    handler = HumioLoggingHandler("token", base_url=stub_server.base_url, max_linger=60)
+    handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+    logger = _logger(handler)
+
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Request failed")
+    handler.close()
+
+    event = json.loads(stub_server.requests[0].body)[0]["events"][0]
+    assert event["rawstring"].startswith("ERROR Request failed")
+    assert "ValueError: boom" in event["attributes"]["exception"]
+
+
+def test_records_are_dropped_when_queue_is_full(stub_server):
+    release = threading.Event()
+
+    def respond(request):
+        release.wait(5)
+        return 200, {}, b"{}"
+
+    stub_server.respond = respond
+    handler = HumioLoggingHandler("token", base_url=stub_server.base_url, max_batch_size=1, queue_size=2)
+    logger = _logger(handler)
+
+    for i in range(20):
+        logger.info("message %d", i)
+    assert handler.dropped_records > 0
+    release.set()
+    handler.close()
+
+    assert handler.sent_records + handler.dropped_records == 20
+
+
+def test_failed_batches_are_reported_to_error_callback(stub_server):
+    stub_server.respond = lambda request: (503, {}, b"unavailable")
+    errors = []
+    handler = HumioLoggingHandler("token", base_url=stub_server.base_url,
+                                  error_callback=lambda e, count: errors.append((e, count)))
+    logger = _logger(handler)
+
+    logger.error("lost")
+    handler.close()
+
+    assert handler.dropped_records == 1
+    assert isinstance(errors[0][0], HumioHTTPException)
+    assert errors[0][1] == 1
+
+
+def test_dropped_records_are_counted_across_threads(stub_server):
+    release = threading.Event()
+
+    def respond(request):
+        release.wait(5)
+        return 200, {}, b"{}"
+
+    stub_server.respond = respond
+    handler = HumioLoggingHandler("token", base_url=stub_server.base_url, max_batch_size=1, queue_size=1)
+    logger = _logger(handler, "test_humiologginghandler_threads")
+
+    def log_many():
+        for i in range(2000):
+            logger.info("message %d", i)
+
+    threads = [threading.Thread(target=log_many) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    release.set()
+    handler.close()
+
+    assert handler.sent_records + handler.dropped_records == 16000
+
+
+def test_records_logged_after_close_are_dropped(stub_server):
+    handler = HumioLoggingHandler("token", base_url=stub_server.base_url, block=True, queue_size=1)
+    logger = _logger(handler)
+
+    logger.info("before close")
+    handler.close()
+    logger.info("after close")
+    logger.info("after close, with the queue full")
+
+    assert handler.sent_records == 1
+    assert handler.dropped_records == 2
+
+
+def test_records_logged_while_sending_are_ignored(stub_server):
+    handler = HumioLoggingHandler("token", base_url=stub_server.base_url, max_linger=60)
+    logger = _logger(handler)
+    record = logger.makeRecord(logger.name, logging.INFO, __file__, 0, "from the sending thread", None, None)
+    record.thread = handler._queue.thread.ident
+
+    assert handler.handle(record)
+    handler.close()
+
+    assert handler.sent_records == 0
+    assert handler.dropped_records == 0
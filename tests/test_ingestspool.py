@@ -0,0 +1,174 @@
+import json
+import os
+import time
+import pytest
+from humiolib import BufferedIngestClient
+from humiolib.IngestSpool import IngestSpool
+from humiolib.HumioExceptions import HumioHTTPException
+
+
+def _replay_all(spool):
+    sent = []
+    spool.replay(lambda endpoint, body: sent.append((endpoint, body)))
+    return sent
+
+
+def test_requests_are_replayed_in_order(tmp_path):
+    with IngestSpool(str(tmp_path), segment_bytes=64) as spool:
+        for i in range(10):
+            spool.append("ingest/humio-structured", json.dumps([{"i": i}]).encode())
+        assert len(spool) > 1
+
+        sent = _replay_all(spool)
+
+        assert [json.loads(body)[0]["i"] for _, body in sent] == list(range(10))
+        assert {endpoint for endpoint, _ in sent} == {"ingest/humio-structured"}
+        assert len(spool) == 0 and spool.size == 0
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_failed_replay_resumes_after_last_sent_request(tmp_path):
+    with IngestSpool(str(tmp_path)) as spool:
+        for i in range(5):
+            spool.append("ingest/humio-unstructured", str(i).encode())
+
+        sent = []
+
+        def flaky_send(endpoint, body):
+            if len(sent) == 2:
+                raise ConnectionError()
+            sent.append(body)
+
+        with pytest.raises(ConnectionError):
+            spool.replay(flaky_send)
+
+    # A restarted spool continues where the previous one stopped
+    with IngestSpool(str(tmp_path)) as spool:
+        sent += [body for _, body in _replay_all(spool)]
+    assert sent == [b"0", b"1", b"2", b"3", b"4"]
+
+
+def test_rejected_requests_are_dead_lettered_without_blocking_the_rest(tmp_path):
+    with IngestSpool(str(tmp_path)) as spool:
+        for i in range(5):
+            spool.append("ingest/humio-unstructured", str(i).encode())
+
+        sent = []
+        errors = []
+
+        def send(endpoint, body):
+            if body == b"1":
+                raise HumioHTTPException("Bad request", 400)
+            if body == b"3":
+                raise HumioHTTPException("Payload too large", 413)
+            sent.append(body)
+
+        assert spool.replay(send, error_callback=errors.append) == 3
+
+        assert sent == [b"0", b"2", b"4"]
+        assert [e.status_code for e in errors] == [400, 413]
+        assert spool.dead_letter_records == 2 and spool.replayed_records == 3
+        assert list(spool.dead_letters()) == [("ingest/humio-unstructured", b"1"), ("ingest/humio-unstructured", b"3")]
+        assert len(spool) == 0
+
+    # The dead-letter file is left alone by a restarted spool
+    with IngestSpool(str(tmp_path)) as spool:
+        assert len(spool) == 0
+        assert len(list(spool.dead_letters())) == 2
+
+
+def test_transient_failures_are_not_dead_lettered(tmp_path):
+    with IngestSpool(str(tmp_path)) as spool:
+        spool.append("ingest/humio-unstructured", b"0")
+
+        def send(endpoint, body):
+            raise HumioHTTPException("Too many requests", 429)
+
+        with pytest.raises(HumioHTTPException):
+            spool.replay(send)
+        assert spool.dead_letter_records == 0
+        assert [body for _, body in _replay_all(spool)] == [b"0"]
+
+
+def test_torn_record_is_discarded_on_recovery(tmp_path):
+    with IngestSpool(str(tmp_path), compress=False) as spool:
+        spool.append("ingest/humio-structured", b"complete")
+        spool.append("ingest/humio-structured", b"torn")
+
+    segment = os.path.join(str(tmp_path), os.listdir(str(tmp_path))[0])
+    with open(segment, "r+b") as f:
+        f.truncate(os.path.getsize(segment) - 2)
+
+    with IngestSpool(str(tmp_path)) as spool:
+        assert [body for _, body in _replay_all(spool)] == [b"complete"]
+        assert spool.corrupt_bytes > 0
+
+
+def test_oldest_segments_are_evicted_beyond_size_cap(tmp_path):
+    with IngestSpool(str(tmp_path), max_bytes=300, segment_bytes=100, compress=False) as spool:
+        for i in range(20):
+            spool.append("e", b"%02d" % i + b"x" * 40)
+        assert spool.size <= 300
+        assert spool.evicted_bytes > 0
+
+        bodies = [body[:2] for _, body in _replay_all(spool)]
+    assert bodies[-1] == b"19"
+    assert b"00" not in bodies
+
+
+def test_compression_is_transparent(tmp_path):
+    body = json.dumps([{"messages": ["same message"] * 1000}]).encode()
+    with IngestSpool(str(tmp_path)) as spool:
+        spool.append("ingest/humio-unstructured", body)
+        assert spool.size < len(body) / 10
+        assert _replay_all(spool) == [("ingest/humio-unstructured", body)]
+
+
+def test_buffered_client_spools_while_humio_is_unavailable(stub_server, tmp_path):
+    available = {"value": False}
+    delivered = []
+
+    def respond(request):
+        if not available["value"]:
+            return 503, {}, b"unavailable"
+        delivered.extend(e["timestamp"] for obj in json.loads(request.body) for e in obj["events"])
+        return 200, {}, b"{}"
+
+    stub_server.respond = respond
+
+    spool = IngestSpool(str(tmp_path))
+    with BufferedIngestClient("token", base_url=stub_server.base_url, max_linger=60, spool=spool) as client:
+        client.add_event({"timestamp": 1}, tags={"host": "server1"})
+        client.flush()
+        assert client.spooled_events == 1
+        assert client.dropped_events == 0
+
+        available["value"] = True
+        client.add_event({"timestamp": 2})
+        client.flush()
+
+        deadline = time.monotonic() + 10
+        while len(spool) and time.monotonic() < deadline:
+            time.sleep(0.01)
+    spool.close()
+
+    assert sorted(delivered) == [1, 2]
+    assert len(spool) == 0
+
+
+def test_buffered_client_reports_replay_failures_and_closes_spool(stub_server, tmp_path):
+    stub_server.respond = lambda request: (400, {}, b"invalid")
+    spool = IngestSpool(str(tmp_path))
+    spool.append("ingest/humio-structured", b"[]")
+    errors = []
+
+    client = BufferedIngestClient("token", base_url=stub_server.base_url, spool=spool,
+                                  error_callback=lambda e, count: errors.append((e, count)))
+    deadline = time.monotonic() + 10
+    while not errors and time.monotonic() < deadline:
+        time.sleep(0.01)
+    client.close()
+
+    assert isinstance(errors[0][0], HumioHTTPException) and errors[0][1] is None
+    assert spool.dead_letter_records == 1
+    assert spool._drainer is None and spool._active is None
@@ -0,0 +1,91 @@
+import json
+import pytest
+from humiolib import HumioClient
+from humiolib.JsonSerializer import JsonSerializer, orjson, ujson
+from humiolib.WebCaller import WebStreamer
+
+installed_backends = [backend for backend, module in [("orjson", orjson), ("ujson", ujson), ("json", True)] if module]
+
+events = [{"@timestamp": i, "message": "event number {}".format(i), "unicode": "æøå"} for i in range(100)]
+ndjson = "".join('{{"@timestamp": {}, "message": "event number {}", "unicode": "æøå"}}\n'.format(i, i)
+                 for i in range(100)).encode("utf-8")
+
+
+class ChunkedResponse():
+    def __init__(self, body, size):
+        self.chunks = [body[i:i + size] for i in range(0, len(body), size)]
+
+    def iter_lines(self):
+        return iter([])
+
+    def iter_content(self, chunk_size):
+        return iter(self.chunks)
+
+
+@pytest.mark.parametrize("backend", installed_backends)
+def test_loads_ndjson(backend):
+    serializer = JsonSerializer(backend)
+    assert serializer.loads_ndjson(ndjson) == events
+    assert serializer.loads_ndjson(bytearray(ndjson) + b'{"cut": ', len(ndjson)) == events
+
+
+@pytest.mark.parametrize("backend", installed_backends)
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1024 * 1024])
+def test_stream_is_decoded_across_chunk_boundaries(backend, chunk_size):
+    streamer = WebStreamer(ChunkedResponse(ndjson.rstrip(b"\n"), chunk_size))
+    decoded = [event for batch in streamer.iter_event_batches(JsonSerializer(backend)) for event in batch]
+    assert decoded == events
+
+
+def test_unknown_backend_fails():
+    with pytest.raises(ValueError):
+        JsonSerializer("simplejson")
+
+
+@pytest.mark.parametrize("backend", installed_backends)
+def test_dumps_returns_utf8_bytes(backend):
+    serializer = JsonSerializer(backend)
+    encoded = serializer.dumps(events)
+    assert isinstance(encoded, bytes)
+    assert serializer.loads(encoded) == events
+
+
+def test_client_uses_configured_serializer_for_requests_and_responses(stub_server):
+    class CountingSerializer(JsonSerializer):
+        calls = 0
+
+        def dumps(self, obj):
+            CountingSerializer.calls += 1
+            return super().dumps(obj)
+
+        def loads(self, data):
+            CountingSerializer.calls += 1
+            return super().loads(data)
+
+    stub_server.respond = lambda request: (200, {}, b'{"id": "queryjob-id"}')
+    client = HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url,
+                         serializer=CountingSerializer("json"))
+
+    queryjob = client.create_queryjob("timechart()")
+
+    assert queryjob.webcaller.serializer is client.serializer
+    assert json.loads(stub_server.requests[0].body) == {"queryString": "timechart()"}
+    assert CountingSerializer.calls == 2
+
+
+@pytest.mark.parametrize("backend", installed_backends)
+@pytest.mark.parametrize("obj", [{1: "a", "b": {2: 3}}, {"big": 2 ** 70}, [-2 ** 70]])
+def test_dumps_accepts_what_the_json_module_accepts(backend, obj):
+    assert json.loads(JsonSerializer(backend).dumps(obj)) == json.loads(json.dumps(obj))
+
+
+@pytest.mark.parametrize("backend", installed_backends)
+def test_dumps_still_rejects_unencodable_objects(backend):
+    with pytest.raises(TypeError):
+        JsonSerializer(backend).dumps({"x": {1, 2}})
+
+
+@pytest.mark.parametrize("backend", installed_backends)
+def test_dumps_accepts_lone_surrogates(backend):
+    obj = {"message": "broken \udc80 surrogate", "text": "hé"}
+    assert json.loads(JsonSerializer(backend).dumps(obj)) == obj
@@ -0,0 +1,84 @@
+import json
+import pytest
+from humiolib import HumioClient
+from humiolib.HumioExceptions import HumioException
+from humiolib.ParallelQuery import split_time_range, to_epoch_millis
+
+
+def serve_queryjobs(stub_server, events_per_millisecond=1, is_aggregate=False):
+    """
+    Answers queryjob creation with an id encoding the queried time range,
+    and polls with one event per millisecond of that range
+    """
+    def respond(request):
+        if request.method == "POST":
+            body = json.loads(request.body)
+            return 200, {}, json.dumps({"id": "{}-{}".format(body["start"], body["end"])}).encode()
+        start, end = map(int, request.path.rsplit("/", 1)[1].split("-"))
+        events = [{"@timestamp": t} for t in range(start, end) for _ in range(events_per_millisecond)]
+        return 200, {}, json.dumps({
+            "done": True,
+            "cancelled": False,
+            "events": events,
+            "metaData": {"pollAfter": 0, "isAggregate": is_aggregate, "extraData": {"hasMoreEvents": "false"}},
+        }).encode()
+    stub_server.respond = respond
+
+
+def test_split_time_range():
+    assert split_time_range(0, 10, 3) == [(0, 3), (3, 6), (6, 10)]
+    assert split_time_range(0, 2, 5) == [(0, 1), (1, 2)]
+    with pytest.raises(ValueError):
+        split_time_range(10, 0, 2)
+
+
+def test_to_epoch_millis():
+    now = 1000 * 60 * 60 * 24 * 365
+    assert to_epoch_millis(5, now) == 5
+    assert to_epoch_millis("now", now) == now
+    assert to_epoch_millis("24hours", now) == now - 24 * 60 * 60 * 1000
+    assert to_epoch_millis("7d", now) == now - 7 * 24 * 60 * 60 * 1000
+    with pytest.raises(ValueError):
+        to_epoch_millis("yesterday", now)
+
+
+def test_parallel_query_ordered(stub_server):
+    serve_queryjobs(stub_server)
+    client = HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url)
+
+    events = list(client.parallel_query("", start=0, end=100, slices=7, workers=3))
+
+    assert [event["@timestamp"] for event in events] == list(range(100))
+    assert len([r for r in stub_server.requests if r.method == "POST"]) == 7
+
+
+def test_parallel_query_unordered(stub_server):
+    serve_queryjobs(stub_server)
+    client = HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url)
+
+    events = list(client.parallel_query("", start=0, end=100, slices=5, workers=5, ordered=False))
+
+    assert sorted(event["@timestamp"] for event in events) == list(range(100))
+
+
+def test_parallel_query_stops_when_closed_early(stub_server):
+    serve_queryjobs(stub_server, events_per_millisecond=10)
+    client = HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url)
+
+    results = client.parallel_query("", start=0, end=1000, slices=50, workers=2, max_buffered_segments=1)
+    assert next(results) == {"@timestamp": 0}
+    results.close()
+
+    assert len([r for r in stub_server.requests if r.method == "POST"]) < 50
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_parallel_query_rejects_aggregates(stub_server, ordered):
+    serve_queryjobs(stub_server, is_aggregate=True)
+    client = HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url)
+    events = []
+
+    with pytest.raises(HumioException):
+        for event in client.parallel_query("count()", start=0, end=100, slices=4, workers=2, ordered=ordered):
+            events.append(event)
+    assert events == []
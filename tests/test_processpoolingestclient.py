@@ -0,0 +1,77 @@
+import json
+import time
+import pytest
+from humiolib.ProcessPoolIngestClient import ProcessPoolIngestClient
+
+
+def test_chunks_are_ingested_through_worker_processes(stub_server):
+    with ProcessPoolIngestClient("token", base_url=stub_server.base_url, processes=2) as client:
+        handed_off = [
+            client.ingest_events(b'{"timestamp": 1}\n{"timestamp": 2}\n', tags={"host": "server1"}),
+            client.ingest_messages(b"first message\nsecond message\n", parser="kv"),
+        ]
+        client.flush()
+        assert client.sent_events == 4
+        assert sorted(shard for shard, _ in handed_off) == [0, 1]
+
+    bodies = {request.path: json.loads(request.body) for request in stub_server.requests}
+    assert bodies["/api/v1/ingest/humio-structured"] == [
+        {"events": [{"timestamp": 1}, {"timestamp": 2}], "tags": {"host": "server1"}}
+    ]
+    assert bodies["/api/v1/ingest/humio-unstructured"] == [
+        {"messages": ["first message", "second message"], "type": "kv"}
+    ]
+
+
+def test_chunks_are_acknowledged_in_order_per_shard(stub_server):
+    with ProcessPoolIngestClient("token", base_url=stub_server.base_url, processes=1, max_in_flight=2) as client:
+        for i in range(10):
+            assert client.ingest_messages("message {}\n".format(i).encode()) == (0, i)
+        client.flush()
+        assert client.acknowledged(0) == 9
+
+    messages = [json.loads(request.body)[0]["messages"][0] for request in stub_server.requests]
+    assert messages == ["message {}".format(i) for i in range(10)]
+
+
+def test_failed_chunks_are_reported_to_error_callback(stub_server):
+    stub_server.respond = lambda request: (503, {}, b"unavailable")
+    errors = []
+    with ProcessPoolIngestClient("token", base_url=stub_server.base_url, processes=1,
+                                 error_callback=lambda e, shard, sequence: errors.append((shard, sequence))) as client:
+        client.ingest_events(b'{"timestamp": 1}\n')
+        client.ingest_events(b"not json\n")
+        client.flush()
+
+    assert client.failed_chunks == 2
+    assert errors == [(0, 0), (0, 1)]
+
+
+def test_unsupported_compression_is_rejected():
+    with pytest.raises(ValueError):
+        ProcessPoolIngestClient("token", compression="lz4", processes=1)
+
+
+def test_dead_worker_fails_its_chunks_and_is_restarted(stub_server):
+    def respond(request):
+        time.sleep(0.5)
+        return 200, {}, b"{}"
+
+    stub_server.respond = respond
+    errors = []
+    with ProcessPoolIngestClient("token", base_url=stub_server.base_url, processes=1, max_in_flight=2,
+                                 error_callback=lambda e, shard, sequence: errors.append((str(e), sequence))) as client:
+        client.ingest_messages(b"lost\n")
+        client.ingest_messages(b"lost too\n")
+        time.sleep(0.2)
+        client._shards[0].process.kill()
+        client.flush()
+        assert client.failed_chunks == 2
+        assert [sequence for _, sequence in errors] == [0, 1]
+        assert "exited" in errors[0][0]
+
+        assert client.ingest_messages(b"delivered\n") == (0, 2)
+        client.flush()
+        assert client.acknowledged(0) == 2
+        assert client.sent_events == 1
+        assert client.restarted_workers == 1
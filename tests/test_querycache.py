@@ -0,0 +1,162 @@
+import json
+import os
+import time
+import pytest
+from humiolib import HumioClient
+from humiolib.QueryCache import QueryCache, MemoryQueryCache, DiskQueryCache
+
+
+def _segment(events, has_more=False):
+    return json.dumps({
+        "done": True,
+        "cancelled": False,
+        "events": events,
+        "metaData": {
+            "pollAfter": 300,
+            "isAggregate": False,
+            "extraData": {"hasMoreEvents": "true" if has_more else "false"},
+        },
+    }).encode()
+
+
+def _client(stub_server, cache):
+    return HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url, cache=cache)
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryQueryCache(max_bytes=10)
+    cache.set("a", b"aaaa")
+    cache.set("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"
+
+    cache.set("c", b"cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa" and cache.get("c") == b"cccc"
+    assert cache.size == 8
+    assert cache.stats.as_dict()["evictions"] == 1
+
+    cache.set("d", b"d" * 11)
+    assert cache.get("d") is None
+
+
+def test_memory_cache_expires_results():
+    cache = MemoryQueryCache(ttl=0.05)
+    cache.set("a", b"aaaa")
+    assert cache.get("a") == b"aaaa"
+
+    time.sleep(0.1)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.stats.expirations == 1
+
+
+def test_disk_cache_survives_reopening_and_evicts_oldest(tmp_path):
+    cache = DiskQueryCache(str(tmp_path), max_bytes=60)
+    cache.set("a", b"a" * 20)
+    os.utime(cache._path("a"), (1, 1))
+    cache.set("b", b"b" * 20)
+
+    reopened = DiskQueryCache(str(tmp_path), max_bytes=60)
+    assert reopened.size == 56
+    reopened.set("c", b"c" * 20)
+
+    assert reopened.get("a") is None
+    assert reopened.get("b") == b"b" * 20 and reopened.get("c") == b"c" * 20
+    assert reopened.stats.evictions == 1
+
+
+def test_disk_cache_expires_results(tmp_path):
+    cache = DiskQueryCache(str(tmp_path), ttl=-1)
+    cache.set("a", b"aaaa")
+
+    assert cache.get("a") is None
+    assert cache.size == 0
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_streaming_query_is_served_from_cache(stub_server):
+    events = [{"@id": str(i), "@rawstring": "line {}".format(i)} for i in range(10)]
+    stub_server.respond = lambda request: (200, {}, b"\n".join(json.dumps(event).encode() for event in events))
+    client = _client(stub_server, MemoryQueryCache())
+
+    assert list(client.streaming_query("x", start=1000, end=2000)) == events
+    assert list(client.streaming_query("x", start=1000, end=2000, batch_size=4)) == [events[:4], events[4:8], events[8:]]
+    assert list(client.streaming_query("x", start=1000, end=2000, arguments={"a": "b"})) == events
+
+    assert len(stub_server.requests) == 2
+    assert client.cache.stats.as_dict()["hits"] == 1
+    assert client.cache.stats.as_dict()["misses"] == 2
+
+
+def test_results_are_not_shared_between_tokens_or_instances(stub_server, tmp_path):
+    stub_server.respond = lambda request: (200, {}, b'{"@rawstring": "a"}')
+    cache = DiskQueryCache(str(tmp_path))
+    clients = [
+        HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url, cache=cache),
+        HumioClient(repository="sandbox", user_token="other token", base_url=stub_server.base_url, cache=cache),
+        HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url + "/", cache=cache),
+    ]
+
+    for client in clients + clients:
+        list(client.streaming_query("x", start=1000, end=2000))
+
+    assert len(stub_server.requests) == 3
+    assert cache.stats.hits == 3
+    assert not any(b"other token" in open(os.path.join(str(tmp_path), name), "rb").read() for name in os.listdir(str(tmp_path)))
+
+
+def test_base_cache_cannot_be_instantiated():
+    with pytest.raises(TypeError):
+        QueryCache(1024, 60)
+
+
+def test_relative_and_live_queries_bypass_cache(stub_server):
+    stub_server.respond = lambda request: (200, {}, b'{"@rawstring": "a"}')
+    client = _client(stub_server, MemoryQueryCache())
+
+    list(client.streaming_query("x", start="1h"))
+    list(client.streaming_query("x", start="1h"))
+    list(client.streaming_query("x", start=1000, end=2000, is_live=True))
+
+    assert len(stub_server.requests) == 3
+    assert len(client.cache) == 0
+    assert client.cache.stats.bypasses == 3
+
+
+def test_abandoned_stream_is_not_cached(stub_server):
+    stub_server.respond = lambda request: (200, {}, b'{"@rawstring": "a"}\n{"@rawstring": "b"}')
+    client = _client(stub_server, MemoryQueryCache())
+
+    stream = client.streaming_query("x", start=1000, end=2000)
+    next(stream)
+    stream.close()
+
+    assert len(client.cache) == 0
+
+
+def test_queryjob_segments_are_replayed_from_cache(stub_server, tmp_path):
+    segments = [_segment([{"@rawstring": "a"}], has_more=True), _segment([{"@rawstring": "b"}])]
+
+    def respond(request):
+        if request.method == "POST":
+            return 200, {}, b'{"id": "job"}'
+        polls = sum(1 for r in stub_server.requests if r.method == "GET")
+        return 200, {}, segments[polls - 1]
+
+    stub_server.respond = respond
+    client = _client(stub_server, DiskQueryCache(str(tmp_path)))
+
+    queryjob = client.create_queryjob("x", start=1000, end=2000)
+    first = [result.events for result in queryjob.poll_until_done()]
+    requests = len(stub_server.requests)
+
+    started = time.time()
+    cached = client.create_queryjob("x", start=1000, end=2000, compact_events=True)
+    replayed = [list(result.events) for result in cached.poll_until_done()]
+
+    assert replayed == first == [[{"@rawstring": "a"}], [{"@rawstring": "b"}]]
+    assert len(stub_server.requests) == requests
+    assert time.time() - started < 0.2
+    assert not cached.more_segments_can_be_polled
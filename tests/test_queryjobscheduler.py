@@ -0,0 +1,113 @@
+import json
+import queue
+import threading
+import time
+from humiolib import HumioClient
+from humiolib.HumioExceptions import HumioQueryJobExpiredException
+from humiolib.QueryJobScheduler import QueryJobScheduler
+
+
+def _segment(events, has_more=False, is_aggregate=False, poll_after=0):
+    return json.dumps({
+        "done": True,
+        "cancelled": False,
+        "events": events,
+        "metaData": {
+            "pollAfter": poll_after,
+            "isAggregate": is_aggregate,
+            "extraData": {"hasMoreEvents": "true" if has_more else "false"},
+        },
+    }).encode()
+
+
+def _serve_queryjobs(stub_server, segments):
+    """
+    Answers queryjob creation with an id per query string, and polls with the segments given per id
+    """
+    lock = threading.Lock()
+    polls = {}
+
+    def respond(request):
+        if request.method == "POST":
+            return 200, {}, json.dumps({"id": json.loads(request.body)["queryString"]}).encode()
+        if request.method == "DELETE":
+            return 204, {}, b""
+        query_id = request.path.rsplit("/", 1)[1]
+        if query_id not in segments:
+            return 404, {}, b"Not found"
+        with lock:
+            polls[query_id] = polls.get(query_id, 0) + 1
+            index = min(polls[query_id], len(segments[query_id])) - 1
+        return 200, {}, segments[query_id][index]
+
+    stub_server.respond = respond
+    return polls
+
+
+def _client(stub_server):
+    return HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url)
+
+
+def test_static_queryjob_is_polled_until_exhausted(stub_server):
+    _serve_queryjobs(stub_server, {"static": [
+        _segment([{"n": 1}], has_more=True),
+        _segment([{"n": 2}], has_more=False),
+    ]})
+    results = queue.Queue()
+
+    with QueryJobScheduler(workers=2) as scheduler:
+        queryjob = _client(stub_server).create_queryjob("static")
+        scheduler.add(queryjob, results=results)
+        assert results.get(timeout=5)[1].events == [{"n": 1}]
+        assert results.get(timeout=5)[1].events == [{"n": 2}]
+
+        deadline = time.monotonic() + 5
+        while len(scheduler) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(scheduler) == 0
+
+
+def test_many_live_queryjobs_share_a_fixed_number_of_threads(stub_server):
+    segments = {"live-{}".format(i): [_segment([{"i": i}], is_aggregate=True, poll_after=50)] for i in range(50)}
+    polls = _serve_queryjobs(stub_server, segments)
+    client = _client(stub_server)
+    threads_before = threading.active_count()
+    delivered = []
+
+    with QueryJobScheduler(workers=3) as scheduler:
+        queryjobs = [client.create_queryjob(query_id, is_live=True) for query_id in segments]
+        for queryjob in queryjobs:
+            scheduler.add(queryjob, callback=lambda queryjob, poll_result: delivered.append(queryjob.query_id))
+
+        deadline = time.monotonic() + 10
+        while min(polls.get(query_id, 0) for query_id in segments) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert threading.active_count() - threads_before <= 3 + 1 + 3 * 2
+
+    assert set(delivered) == set(segments)
+    assert min(polls.values()) >= 3
+
+
+def test_poll_after_hint_is_respected(stub_server):
+    polls = _serve_queryjobs(stub_server, {"live": [_segment([], is_aggregate=True, poll_after=300)]})
+
+    with QueryJobScheduler(workers=2) as scheduler:
+        scheduler.add(_client(stub_server).create_queryjob("live", is_live=True), callback=lambda *args: None)
+        time.sleep(0.75)
+
+    assert 2 <= polls["live"] <= 3
+
+
+def test_failing_queryjob_is_removed_and_reported(stub_server):
+    _serve_queryjobs(stub_server, {})
+    errors = []
+
+    with QueryJobScheduler(workers=1) as scheduler:
+        queryjob = _client(stub_server).create_queryjob("expired")
+        done = threading.Event()
+        scheduler.add(queryjob, callback=lambda *args: None,
+                      error_callback=lambda queryjob, e: (errors.append(e), done.set()))
+        assert done.wait(5)
+        assert len(scheduler) == 0
+
+    assert isinstance(errors[0], HumioQueryJobExpiredException)
@@ -0,0 +1,127 @@
+import json
+import pytest
+from humiolib import HumioClient
+from humiolib.HumioExceptions import HumioConnectionDroppedException
+from humiolib.ResumableExport import ExportCheckpoint, ResumableExport
+
+
+def _events(start, end):
+    return [{"@id": str(t), "@timestamp": t} for t in range(start, end)]
+
+
+class FlakyStream():
+    """
+    Streams events of a time range, dropping the connection after a number of events on the first attempts
+    """
+    def __init__(self, drops):
+        self.drops = list(drops)
+        self.calls = []
+
+    def __call__(self, start, end):
+        self.calls.append((start, end))
+        events = _events(start, end)
+        drop_after = self.drops.pop(0) if self.drops else None
+        yield events[:drop_after]
+        if drop_after is not None:
+            raise HumioConnectionDroppedException("Connection to streaming socket was lost")
+
+
+def test_dropped_slice_is_retried_without_duplicates():
+    stream = FlakyStream([3, None, 1])
+    export = ResumableExport(stream, ExportCheckpoint("q", 0, 20), slice_duration=10, retry_backoff=0)
+
+    assert [event["@timestamp"] for event in export] == list(range(20))
+    assert stream.calls == [(0, 10), (0, 10), (10, 20), (10, 20)]
+    assert export.retries == 2
+
+
+def test_identical_events_are_all_exported():
+    rows = [{"host": "server1"}, {"host": "server1"}, {"host": "server2"}, {"host": "server1"}]
+
+    assert list(ResumableExport(lambda start, end: iter([rows]), ExportCheckpoint("q", 0, 10))) == rows
+
+
+def test_identical_events_are_skipped_as_often_as_they_were_emitted_before_a_retry():
+    rows = [{"host": "server1"}, {"host": "server1"}, {"host": "server2"}, {"host": "server1"}]
+    attempts = []
+
+    def stream(start, end):
+        attempts.append(start)
+        yield rows[:2] if len(attempts) == 1 else rows
+        if len(attempts) == 1:
+            raise HumioConnectionDroppedException("Connection to streaming socket was lost")
+
+    assert list(ResumableExport(stream, ExportCheckpoint("q", 0, 10), retry_backoff=0)) == rows
+    assert len(attempts) == 2
+
+
+def test_export_gives_up_after_max_retries():
+    export = ResumableExport(FlakyStream([1] * 10), ExportCheckpoint("q", 0, 10), max_retries=2, retry_backoff=0)
+
+    with pytest.raises(HumioConnectionDroppedException):
+        list(export)
+
+
+def test_export_continues_from_checkpoint_file(tmp_path):
+    path = str(tmp_path / "export.checkpoint")
+    export = ResumableExport(FlakyStream([]), ExportCheckpoint("q", 0, 30), slice_duration=10,
+                             checkpoint_path=path, checkpoint_every=2)
+    emitted = []
+    for event in export:
+        emitted.append(event["@timestamp"])
+        if len(emitted) == 15:
+            break  # The process dies in the middle of the second slice
+
+    checkpoint = ExportCheckpoint.load(path, export.serializer)
+    assert checkpoint.slice_start == 10
+    assert checkpoint.last_timestamp == 13
+    stream = FlakyStream([])
+    emitted += [event["@timestamp"] for event in ResumableExport(stream, checkpoint, slice_duration=10)]
+
+    assert stream.calls == [(10, 20), (20, 30)]
+    assert emitted == list(range(15)) + [14] + list(range(15, 30))
+
+
+def test_slice_lengths_adapt_to_event_count(tmp_path):
+    slices = []
+
+    def stream(start, end):
+        # Ten events per millisecond between 100 and 300, one per millisecond elsewhere
+        events = [{"@id": "{}-{}".format(t, i), "@timestamp": t}
+                  for t in range(start, end) for i in range(10 if 100 <= t < 300 else 1)]
+        slices.append((end - start, len(events)))
+        yield events
+
+    path = str(tmp_path / "export.checkpoint")
+    export = ResumableExport(stream, ExportCheckpoint("q", 0, 1000), slice_duration=200,
+                             checkpoint_path=path, max_slice_events=400)
+
+    assert len(list(export)) == 2800
+    assert [length for length, _ in slices[:7]] == [200, 36, 36, 36, 36, 72, 144]
+    assert max(count for _, count in slices[1:]) <= 400
+    assert ExportCheckpoint.load(path, export.serializer).slice_duration == 200
+
+
+def test_humioclient_resumes_dropped_streaming_query(stub_server, tmp_path):
+    lines = b"".join(json.dumps(event).encode() + b"\n" for event in _events(0, 10))
+    attempts = []
+
+    def respond(request):
+        attempts.append(json.loads(request.body))
+        if len(attempts) == 1:
+            half = lines[:len(lines) // 2]
+            # A chunked response whose final chunk never arrives
+            return 200, {"Transfer-Encoding": "chunked"}, b"%x\r\n%s\r\n" % (len(half), half)
+        return 200, {}, lines
+
+    stub_server.respond = respond
+    client = HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url)
+    path = str(tmp_path / "export.checkpoint")
+
+    events = list(client.resumable_export("*", start=0, end=1000, checkpoint_path=path, retry_backoff=0))
+
+    assert [event["@id"] for event in events] == [str(t) for t in range(10)]
+    assert [(a["start"], a["end"]) for a in attempts] == [(0, 1000), (0, 1000)]
+    assert ExportCheckpoint.load(path, client.serializer).done
+    with pytest.raises(ValueError):
+        list(client.resumable_export("other query", start=0, end=1000, checkpoint_path=path))
@@ -0,0 +1,102 @@
+import pytest
+from humiolib import HumioClient, HumioIngestClient
+from humiolib.HumioExceptions import HumioHTTPException, HumioConnectionException
+from humiolib.RetryPolicy import RetryPolicy, RetryBudget
+from humiolib.WebCaller import WebCaller
+
+
+def failing_times(count, status=503, headers=None):
+    failures = [count]
+
+    def respond(request):
+        if failures[0] > 0:
+            failures[0] -= 1
+            return status, headers or {}, b"unavailable"
+        return 200, {}, b"{}"
+    return respond
+
+
+def test_transient_failures_are_retried_with_identical_body(stub_server):
+    stub_server.respond = failing_times(2)
+    policy = RetryPolicy(backoff_factor=0)
+    client = HumioIngestClient("token", base_url=stub_server.base_url,
+                               webcaller=WebCaller(stub_server.base_url, retry_policy=policy))
+
+    assert client.ingest_messages(["message"]) == {}
+
+    assert len(stub_server.requests) == 3
+    assert len(set(request.body for request in stub_server.requests)) == 1
+    assert policy.stats.as_dict()["retries"] == 2
+    assert policy.stats.as_dict()["recovered_requests"] == 1
+
+
+def test_retries_are_exhausted(stub_server):
+    stub_server.respond = failing_times(10, status=429)
+    policy = RetryPolicy(max_retries=2, backoff_factor=0)
+    webcaller = WebCaller(stub_server.base_url, retry_policy=policy)
+
+    with pytest.raises(HumioHTTPException) as e:
+        webcaller.call_rest("post", "ingest/humio-unstructured", data=b"[]", retry=True)
+
+    assert e.value.status_code == 429
+    assert len(stub_server.requests) == 3
+    assert policy.stats.as_dict()["exhausted_requests"] == 1
+
+
+def test_status_rules_override_retried_statuses(stub_server):
+    stub_server.respond = failing_times(1, status=500)
+    webcaller = WebCaller(stub_server.base_url, retry_policy=RetryPolicy(backoff_factor=0, status_rules={500: 1, 503: 0}))
+    webcaller.call_rest("get", "status")
+    assert len(stub_server.requests) == 2
+
+    stub_server.respond = failing_times(1, status=503)
+    with pytest.raises(HumioHTTPException):
+        webcaller.call_rest("get", "status")
+
+
+def test_retry_after_is_honoured(stub_server):
+    stub_server.respond = failing_times(1, headers={"Retry-After": "0.2"})
+    policy = RetryPolicy(backoff_factor=10)
+    WebCaller(stub_server.base_url, retry_policy=policy).call_rest("get", "status")
+    assert policy.stats.total_delay == pytest.approx(0.2)
+
+
+def test_retry_after_beyond_total_time_is_not_waited_for(stub_server):
+    stub_server.respond = failing_times(1, headers={"Retry-After": "120"})
+    webcaller = WebCaller(stub_server.base_url, retry_policy=RetryPolicy(max_total_time=10))
+    with pytest.raises(HumioHTTPException):
+        webcaller.call_rest("get", "status")
+
+
+def test_shared_budget_limits_retries():
+    budget = RetryBudget(max_retries=2, per_seconds=3600)
+    policy = RetryPolicy(max_retries=10, backoff_factor=0, budget=budget)
+    webcaller = WebCaller("http://127.0.0.1:1", retry_policy=policy)
+
+    with pytest.raises(HumioConnectionException):
+        webcaller.call_rest("get", "status")
+    assert policy.stats.retries == 2
+
+
+def test_requests_that_may_have_been_applied_are_not_retried(stub_server):
+    stub_server.respond = failing_times(1, status=502)
+    webcaller = WebCaller(stub_server.base_url, retry_policy=RetryPolicy(backoff_factor=0))
+    client = HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url, webcaller=webcaller)
+
+    with pytest.raises(HumioHTTPException):
+        client.create_queryjob("count()")
+    stub_server.respond = failing_times(1, status=502)
+    with pytest.raises(HumioHTTPException):
+        client.create_saved_query("errors", "error=true")
+    assert len(stub_server.requests) == 2
+
+    stub_server.respond = failing_times(1, status=502)
+    client.get_status()
+    assert len(stub_server.requests) == 4
+    assert webcaller.retry_policy.stats.retries == 1
+
+
+def test_parse_retry_after():
+    assert RetryPolicy.parse_retry_after("3") == 3
+    assert RetryPolicy.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert RetryPolicy.parse_retry_after("soon") is None
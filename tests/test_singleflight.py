@@ -0,0 +1,137 @@
+import json
+import threading
+import time
+import pytest
+from humiolib import HumioClient
+from humiolib.HumioExceptions import HumioHTTPException
+from humiolib.SingleFlight import SingleFlight
+
+
+def _client(stub_server):
+    return HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url,
+                       single_flight=SingleFlight())
+
+
+def _concurrently(func, threads=10):
+    """
+    Calls a function from several threads released at the same time, returning results or exceptions
+    """
+    barrier = threading.Barrier(threads)
+    results = [None] * threads
+
+    def run(index):
+        barrier.wait()
+        try:
+            results[index] = func()
+        except Exception as e:
+            results[index] = e
+
+    workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return results
+
+
+def _slowly(status, body, delay=0.3):
+    def respond(request):
+        time.sleep(delay)
+        return status, {}, body
+    return respond
+
+
+def test_concurrent_identical_calls_share_one_request(stub_server):
+    stub_server.respond = _slowly(200, b'[{"id": "1", "username": "a@b.c"}]')
+    client = _client(stub_server)
+
+    results = _concurrently(client.get_users)
+
+    assert len(stub_server.requests) == 1
+    assert all(result == [{"id": "1", "username": "a@b.c"}] for result in results)
+    assert client.single_flight.stats.as_dict() == {"calls": 10, "executions": 1, "coalesced": 9}
+
+
+def test_coalesced_callers_receive_the_same_exception(stub_server):
+    stub_server.respond = _slowly(500, b"Internal error")
+    client = _client(stub_server)
+
+    results = _concurrently(client.get_users, threads=4)
+
+    assert len(stub_server.requests) == 1
+    assert all(isinstance(result, HumioHTTPException) for result in results)
+
+
+def test_calls_with_different_arguments_or_after_completion_are_not_coalesced(stub_server):
+    stub_server.respond = lambda request: (200, {}, b'{"data": {"getFileContent": {"lines": []}}}')
+    client = _client(stub_server)
+
+    client.get_file_content("a.csv")
+    client.get_file_content("a.csv")
+    client.get_file_content("b.csv")
+
+    assert len(stub_server.requests) == 3
+    assert client.single_flight.stats.coalesced == 0
+
+
+def test_concurrent_streaming_queries_get_independent_iterators(stub_server):
+    events = [{"@id": str(i)} for i in range(1000)]
+    stub_server.respond = _slowly(200, b"\n".join(json.dumps(event).encode() for event in events))
+    client = _client(stub_server)
+
+    results = _concurrently(lambda: list(client.streaming_query("x", start="1h", chunk_size=1024)), threads=5)
+
+    assert len(stub_server.requests) == 1
+    assert all(result == events for result in results)
+    assert client.single_flight.stats.coalesced == 4
+
+
+def test_live_streaming_queries_are_not_coalesced(stub_server):
+    stub_server.respond = _slowly(200, b'{"@id": "1"}', delay=0.1)
+    client = _client(stub_server)
+
+    _concurrently(lambda: list(client.streaming_query("x", is_live=True)), threads=3)
+
+    assert len(stub_server.requests) == 3
+
+
+def test_shared_stream_is_closed_once_every_iterator_leaves():
+    closed = threading.Event()
+
+    def source():
+        try:
+            for i in range(100):
+                yield [i]
+        finally:
+            closed.set()
+
+    single_flight = SingleFlight()
+    first = single_flight.stream("key", source)
+    second = single_flight.stream("key", source)
+    assert next(first) == [0] and next(second) == [0] and next(first) == [1]
+
+    third = single_flight.stream("key", source)  # A new stream, as every iterator is past the first batch
+    first.close()
+    assert not closed.is_set()
+    second.close()
+
+    assert closed.is_set()
+    assert next(third) == [0]
+    assert single_flight.stats.as_dict() == {"calls": 3, "executions": 2, "coalesced": 1}
+
+
+def test_stream_errors_reach_every_iterator():
+    def source():
+        yield [1]
+        raise ValueError("dropped")
+
+    single_flight = SingleFlight()
+    first = single_flight.stream("key", source)
+    second = single_flight.stream("key", source)
+
+    assert next(first) == [1]
+    with pytest.raises(ValueError):
+        next(first)
+    assert next(second) == [1]
+    with pytest.raises(ValueError):
+        next(second)
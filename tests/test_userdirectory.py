@@ -0,0 +1,81 @@
+import json
+import time
+from humiolib import HumioClient
+
+
+def _serve_users(stub_server, users):
+    def respond(request):
+        if request.method == "GET":
+            return 200, {}, json.dumps(users).encode()
+        if request.method == "DELETE":
+            user_id = request.path.rsplit("/", 1)[1]
+            if user_id == "broken":
+                return 500, {}, b"Internal error"
+            users[:] = [user for user in users if user["userID"] != user_id]
+            return 200, {}, b"{}"
+        body = json.loads(request.body)
+        users.append({"userID": "id-" + body["email"], "email": body["email"]})
+        return 200, {}, json.dumps(users[-1]).encode()
+
+    stub_server.respond = respond
+
+
+def _users(count):
+    return [{"userID": "id-{}".format(i), "email": "user{}@example.com".format(i)} for i in range(count)]
+
+
+def _gets(stub_server):
+    return sum(1 for request in stub_server.requests if request.method == "GET")
+
+
+def test_delete_users_by_email_downloads_user_list_once(stub_server):
+    users = _users(1000) + [{"userID": "broken", "email": "broken@example.com"}]
+    _serve_users(stub_server, users)
+    client = HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url)
+
+    emails = ["user{}@example.com".format(i) for i in range(0, 1000, 2)] + ["missing@example.com", "broken@example.com"]
+    results = client.delete_users_by_email(emails)
+
+    assert _gets(stub_server) == 1
+    assert len(users) == 501
+    assert results["user0@example.com"] == {}
+    assert results["missing@example.com"] is None
+    assert results["broken@example.com"].status_code == 500
+
+
+def test_lookups_are_served_from_snapshot_within_ttl(stub_server):
+    _serve_users(stub_server, _users(10))
+    client = HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url, user_cache_ttl=0.2)
+
+    assert client.get_user_by_email("user3@example.com")["userID"] == "id-3"
+    assert client.get_user_by_email("user4@example.com")["userID"] == "id-4"
+    assert client.user_directory.get_by_id("id-5")["email"] == "user5@example.com"
+    assert _gets(stub_server) == 1
+    assert client.user_directory.hits == 2
+
+    time.sleep(0.25)
+    client.get_user_by_email("user3@example.com")
+    assert _gets(stub_server) == 2
+
+
+def test_create_and_delete_invalidate_snapshot(stub_server):
+    _serve_users(stub_server, _users(3))
+    client = HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url, user_cache_ttl=60)
+
+    assert client.get_user_by_email("new@example.com") is None
+    client.create_user("new@example.com")
+    assert client.get_user_by_email("new@example.com")["userID"] == "id-new@example.com"
+
+    client.delete_user_by_email("new@example.com")
+    assert client.get_user_by_email("new@example.com") is None
+    assert _gets(stub_server) == 3
+
+
+def test_lookups_without_ttl_always_fetch(stub_server):
+    _serve_users(stub_server, _users(3))
+    client = HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url)
+
+    client.get_user_by_email("user1@example.com")
+    client.get_user_by_email("user1@example.com")
+
+    assert _gets(stub_server) == 2
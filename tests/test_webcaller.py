@@ -0,0 +1,64 @@
+import threading
+import time
+from humiolib import HumioClient, HumioIngestClient
+from humiolib.WebCaller import WebCaller
+from humiolib.QueryJob import StaticQueryJob
+
+
+def test_connections_are_reused_between_requests(stub_server):
+    webcaller = WebCaller(stub_server.base_url)
+    for _ in range(5):
+        webcaller.call_rest("get", "status")
+
+    client_addresses = set(request.client_address for request in stub_server.requests)
+    assert len(stub_server.requests) == 5
+    assert len(client_addresses) == 1
+
+
+def test_idle_connections_are_recycled_after_keepalive_timeout(stub_server):
+    webcaller = WebCaller(stub_server.base_url, keepalive_timeout=0.05)
+    webcaller.call_rest("get", "status")
+    webcaller.call_rest("get", "status")
+    time.sleep(0.1)
+    webcaller.call_rest("get", "status")
+
+    client_addresses = [request.client_address for request in stub_server.requests]
+    assert client_addresses[0] == client_addresses[1] != client_addresses[2]
+
+
+def test_connections_in_use_are_not_closed_by_keepalive_timeout(stub_server):
+    release = threading.Event()
+
+    def respond(request):
+        if request.path.endswith("slow"):
+            release.wait(5)
+        return 200, {}, b"{}"
+    stub_server.respond = respond
+    webcaller = WebCaller(stub_server.base_url, keepalive_timeout=0.05)
+    webcaller.call_rest("get", "fast")
+    slow = threading.Thread(target=webcaller.call_rest, args=("get", "slow"))
+    slow.start()
+
+    time.sleep(0.1)
+    webcaller.call_rest("get", "fast")
+    release.set()
+    slow.join()
+    webcaller.call_rest("get", "fast")
+
+    # The slow request kept its connection, which was idle for less than the timeout when it was reused
+    paths = [(request.path, request.client_address) for request in stub_server.requests]
+    slow_address = next(address for path, address in paths if path.endswith("slow"))
+    assert paths[-1][1] == slow_address
+
+
+def test_clients_and_queryjobs_share_webcaller(stub_server):
+    stub_server.respond = lambda request: (200, {}, b'{"id": "queryjob-id"}')
+    webcaller = WebCaller(stub_server.base_url)
+    client = HumioClient(repository="sandbox", user_token="token", base_url=stub_server.base_url, webcaller=webcaller)
+    ingest_client = HumioIngestClient(ingest_token="token", base_url=stub_server.base_url, webcaller=webcaller)
+
+    queryjob = client.create_queryjob("timechart()", is_live=False)
+
+    assert isinstance(queryjob, StaticQueryJob)
+    assert queryjob.webcaller is webcaller
+    assert ingest_client.webcaller is webcaller